@@ -1,5 +1,8 @@
-from flask import session, abort, flash, render_template, abort
+from flask import session, abort, flash, render_template, abort, current_app
 from functools import wraps
+import os
+from cache import user_records
+from db import get_db_connection
 
 ROLE_REDIRECT_MAP = {
     'admin': 'admin',
@@ -14,6 +17,42 @@ ROLE_PERMISSIONS = {
     'superadmin': ['manage_roles']
 }
 
+# Check roles against the users table (through the user cache) rather than
+# the role copied into the session at login, so role changes and deletions
+# apply to existing sessions
+LIVE_ROLE_CHECKS = os.getenv('LIVE_ROLE_CHECKS', 'true').lower() in ('1', 'true', 'yes', 'on')
+
+
+def _load_user(user_id):
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT user_id, username, email, verified, role FROM users WHERE user_id = %s", (user_id,))
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def get_user_record(user_id):
+    """The user's row without the password hash, or None if there is no such user"""
+    return user_records.get(user_id, _load_user)
+
+
+def current_role():
+    """Role of the logged-in user, or None"""
+    role = session.get('role')
+    user_id = session.get('user_id')
+    if not LIVE_ROLE_CHECKS or role is None or user_id is None:
+        return role
+    try:
+        user = get_user_record(user_id)
+    except Exception as e:
+        # Don't lock everyone out while the database is unreachable
+        current_app.logger.error(f"Live role check failed, using session role: {e}")
+        return role
+    return user['role'] if user else None
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -44,7 +83,7 @@ def role_required(*allowed_roles):
                 flash('Unauthorized access.', 'error')
                 return render_template('1_login.html')
 
-            if session['role'] not in allowed_roles:
+            if current_role() not in allowed_roles:
                 abort(403)
 
             return f(*args, **kwargs)
@@ -55,7 +94,7 @@ def permission_required(*required_permissions):
     def decorator(f):
         @wraps(f)
         def wrapper(*args, **kwargs):
-            role = session.get('role')
+            role = current_role()
             if not role:
                 abort(403)
             allowed_permissions = ROLE_PERMISSIONS.get(role, [])
@@ -1,19 +1,22 @@
-import mysql.connector
-import smtplib
+from db import get_db_connection, release_db_connection
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import os
 import random
 from flask import make_response
 import datetime
 from flask import Blueprint, current_app, jsonify, render_template, request, session, redirect, url_for, \
     flash
-from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
 from flask_wtf.csrf import validate_csrf
 from wtforms.validators import ValidationError
 from extensions import limiter
 from flask_limiter.errors import RateLimitExceeded
 from access_control import login_required, permission_required, ROLE_REDIRECT_MAP
+from mailer import get_smtp_pool
+from hashing import password_hasher, HashingBusyError
+from otp_delivery import otp_deliveries, UNKNOWN
+from cache import user_records
 import re
 
 # Import logging functions
@@ -21,29 +24,8 @@ from logging_config import log_security_event, log_application_event, log_databa
 
 bp = Blueprint('accounts', __name__)
 
-# Create an Argon2 hasher instance (customizable parameters)
-ph = PasswordHasher(
-    time_cost=3,  # number of iterations (default: 2)
-    memory_cost=65536,  # memory usage in kibibytes (64 MB)
-    parallelism=4,  # number of threads
-    hash_len=32,  # length of the hash
-    salt_len=16  # length of random salt
-)
-
-
-def get_db_connection():
-    cfg = current_app.config
-    try:
-        conn = mysql.connector.connect(
-            host=cfg['MYSQL_HOST'],
-            user=cfg['MYSQL_USER'],
-            password=cfg['MYSQL_PASSWORD'],
-            database=cfg['MYSQL_DB'],
-        )
-        return conn
-    except Exception as e:
-        log_database_event("connection_failed", details={"error": str(e), "source": "accounts"})
-        raise
+# Argon2 hasher behind the bounded hashing executor (see hashing.py)
+ph = password_hasher
 
 
 # Validation and Security Functions ========================
@@ -231,6 +213,8 @@ def register_user():
         flash("Registration successful! Please login.", "success")
         return redirect(url_for('login'))
 
+    except HashingBusyError:
+        raise  # Answered with 503 by the app-level handler
     except Exception as e:
         log_security_event("registration_error",
                            details={
@@ -249,12 +233,16 @@ def generate_otp():
     otp = random.randint(100000, 999999)
     return otp
 
-# Function to send OTP via email using smtplib
+# Function to send OTP via email over a pooled SMTP session
 def send_otp_email(email, otp):
-    sender_email = "sitsecure.notifications@gmail.com"
-    sender_password = "wurhnkuxldbfnokf"
-    smtp_server = "smtp.gmail.com"
-    smtp_port = 587  # For TLS, change if using another provider
+    sender_email = os.getenv('OTP_SENDER_EMAIL', "sitsecure.notifications@gmail.com")
+    sender_password = os.getenv('OTP_SENDER_PASSWORD')
+    smtp_server = os.getenv('OTP_SMTP_SERVER', "smtp.gmail.com")
+    smtp_port = int(os.getenv('OTP_SMTP_PORT', 587))  # For TLS, change if using another provider
+    # A local sink (benchmarks/loadtest.py) takes plain SMTP without STARTTLS or LOGIN
+    starttls = os.getenv('OTP_SMTP_STARTTLS', 'true').lower() == 'true'
+    if starttls and not sender_password:
+        raise RuntimeError("OTP_SENDER_PASSWORD is not set; OTP emails cannot be sent")
 
     # Create the message
     message = MIMEMultipart()
@@ -274,16 +262,38 @@ def send_otp_email(email, otp):
     # Attach HTML content
     message.attach(MIMEText(html_body, "html"))
 
+    # Reuse an authenticated session instead of STARTTLS + LOGIN per OTP. Errors propagate:
+    # the delivery queue logs them as otp_delivery_failed and the verify page shows the failure
+    get_smtp_pool(smtp_server, smtp_port, sender_email if sender_password else None,
+                  sender_password or None, starttls=starttls).send(message)
+    log_application_event("otp_email_sent", level="debug", details={"smtp_server": smtp_server})
+
+def rehash_if_needed(user_id, stored_hash, password):
+    """Re-hash a just-verified password when the Argon2 parameters have changed.
+
+    Upgrades (or downgrades) stored hashes to the configured ARGON2_* cost
+    without forcing a password reset. Never fails the login: if the hasher is
+    busy or the update fails, the old hash stays and we try again next time.
+    """
+    if not ph.check_needs_rehash(stored_hash):
+        return
     try:
-        # Establish a connection to the SMTP server
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()  # Secure connection using TLS
-        server.login(sender_email, sender_password)  # Log in to the email account
-        server.sendmail(sender_email, email, message.as_string())  # Send email
-        server.close()
-        print("Email sent successfully!")  # For debugging
+        new_hash = ph.hash(password)
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        # Only replace the hash we verified, in case the password changed meanwhile
+        cursor.execute("UPDATE users SET pwd = %s WHERE user_id = %s AND pwd = %s",
+                       (new_hash, user_id, stored_hash))
+        conn.commit()
+        cursor.close()
+        conn.close()
+        log_security_event("password_rehashed", user_id=user_id, request=request)
+    except HashingBusyError:
+        pass
     except Exception as e:
-        print(f"Error sending email: {e}")  # For debugging
+        log_database_event("password_rehash_failed", table="users", user_id=user_id,
+                           details={"error": str(e)})
+
 
 @bp.route("/login", methods=["POST"])
 @limiter.limit("5 per minute")
@@ -342,7 +352,8 @@ def login_user():
             cursor.execute(query, (username,))
             verify_user = cursor.fetchone()
             cursor.close()
-            conn.close()
+            # Don't hold a pooled connection through the Argon2 verify
+            release_db_connection()
 
             if not verify_user:  # if no such user
                 log_security_event("login_user_not_found",
@@ -353,6 +364,7 @@ def login_user():
 
             try:  # Verify password
                 ph.verify(verify_user['pwd'], password)
+                rehash_if_needed(verify_user['user_id'], verify_user['pwd'], password)
 
                 # Password is correct, set up session
                 session.clear()
@@ -388,8 +400,8 @@ def login_user():
                 session['otp'] = otp
                 session['otp_expiry'] = (datetime.datetime.now() + datetime.timedelta(minutes=1)).timestamp()
                 
-                 # Send OTP to user's email
-                send_otp_email(verify_user['email'], otp)
+                # Send OTP to user's email in the background; verify_otp polls the delivery status
+                session['otp_delivery_id'] = otp_deliveries.submit(send_otp_email, verify_user['email'], otp)
 
                 return redirect(url_for('accounts.verify_otp'))
                 
@@ -405,6 +417,8 @@ def login_user():
                 flash("Invalid username or password", "error")
                 return redirect(url_for('login'))
 
+        except HashingBusyError:
+            raise  # Answered with 503 by the app-level handler
         except Exception as e:
             log_security_event("login_error",
                                details={
@@ -448,6 +462,7 @@ def verify_otp():
             session['verified'] = True
             session.pop('otp', None)
             session.pop('otp_expiry', None)
+            session.pop('otp_delivery_id', None)
             flash("Login successful!", "success")
             role = session.get('role')
             default_route = ROLE_REDIRECT_MAP.get(role, 'profile')
@@ -462,6 +477,17 @@ def verify_otp():
     response.headers["Expires"] = "0"
     return response
 
+# OTP email delivery status, polled by verify_otp.js
+@bp.route("/verify_otp/status", methods=["GET"])
+@limiter.limit("60 per minute")
+@login_required
+def otp_delivery_status():
+    delivery_id = session.get('otp_delivery_id')
+    status = otp_deliveries.status(delivery_id) if delivery_id else UNKNOWN
+    response = jsonify({'status': status})
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
 
 @bp.route("/logout")
 def logout():
@@ -549,6 +575,7 @@ def update_role():
             WHERE user_id = %s
         """, (user_role, user_id))
         conn.commit()
+        user_records.invalidate(user_id)
 
         # Log successful role update
         log_security_event("role_update_successful",
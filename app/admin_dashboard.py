@@ -1,62 +1,248 @@
-import mysql.connector
+from db import get_db_connection
 from flask import (
     Blueprint, current_app, request, jsonify
 )
+import base64
 import datetime
+import json
+import re
 from flask_wtf.csrf import validate_csrf
 from wtforms.validators import ValidationError
 from access_control import login_required, permission_required
+from cache import report_details, report_listings
+from reference_data import statuses
 
 bp = Blueprint('admin_dashboard', __name__)
 
-def get_db_connection():
-    cfg = current_app.config
-    return mysql.connector.connect(
-        host=cfg['MYSQL_HOST'],
-        user=cfg['MYSQL_USER'],
-        password=cfg['MYSQL_PASSWORD'],
-        database=cfg['MYSQL_DB'],
-    )
+REPORT_PAGE_SIZE = 7
+MAX_REPORT_PAGE_SIZE = 100
+MAX_SEARCH_LENGTH = 100
 
-def get_statuses():
+# Keyset orderings for the report listing: name -> (direction, sort keys).
+# Every ordering ends in report_id so the keyset is unique. The id/title
+# names match the admin dashboard's sort options.
+REPORT_ORDERINGS = {
+    'newest': ('DESC', ('created_at', 'report_id')),
+    'oldest': ('ASC', ('created_at', 'report_id')),
+    'id-asc': ('ASC', ('report_id',)),
+    'id-desc': ('DESC', ('report_id',)),
+    'desc-asc': ('ASC', ('title', 'report_id')),
+    'desc-desc': ('DESC', ('title', 'report_id')),
+}
+
+CURSOR_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE = 50
+# Shorter words are never indexed (innodb_ft_min_token_size)
+FULLTEXT_MIN_TOKEN_LENGTH = 3
+REPORT_FULLTEXT_COLUMNS = "r.title, r.description"
+
+_SEARCH_TERM_RE = re.compile(r'(-?)(?:"([^"]*)"|(\w+))')
+
+
+def encode_report_cursor(order, report):
+    """Opaque cursor pointing just past the given report row"""
+    values = []
+    for key in REPORT_ORDERINGS[order][1]:
+        value = report[key]
+        if isinstance(value, datetime.datetime):
+            value = value.strftime(CURSOR_DATETIME_FORMAT)
+        values.append(value)
+    raw = json.dumps([order, values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_report_cursor(order, token):
+    """Return the sort-key values stored in a cursor, or None if it is malformed
+    or was issued for a different ordering"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        cursor_order, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        keys = REPORT_ORDERINGS[order][1]
+        if cursor_order != order or len(values) != len(keys):
+            return None
+        decoded = []
+        for key, value in zip(keys, values):
+            if key == 'created_at':
+                value = datetime.datetime.strptime(value, CURSOR_DATETIME_FORMAT)
+            elif key == 'report_id':
+                value = int(value)
+            elif not isinstance(value, str):
+                return None
+            decoded.append(value)
+        return decoded
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+
+def _keyset_condition(keys, direction):
+    """(a > %s OR (a = %s AND (b > %s ...))) for the given sort keys"""
+    op = '<' if direction == 'DESC' else '>'
+    column = f"r.{keys[0]}"
+    if len(keys) == 1:
+        return f"{column} {op} %s"
+    inner = _keyset_condition(keys[1:], direction)
+    return f"({column} {op} %s OR ({column} = %s AND {inner}))"
+
+
+def _keyset_params(values):
+    params = []
+    for value in values[:-1]:
+        params.extend([value, value])
+    params.append(values[-1])
+    return params
+
+
+def to_boolean_query(search):
+    """Translate search box input into a MySQL BOOLEAN MODE expression.
+
+    Words become required prefix matches (+word*), "-word" excludes a word
+    and "quoted text" must appear as a phrase. Any other operator characters
+    are dropped. Returns '' when nothing searchable is left, since a
+    boolean query with no required term matches nothing.
+    """
+    terms = []
+    has_required = False
+    for exclude, phrase, word in _SEARCH_TERM_RE.findall(search):
+        if phrase:
+            words = re.findall(r'\w+', phrase)
+            # A phrase of only unindexed words can never match
+            if not any(len(w) >= FULLTEXT_MIN_TOKEN_LENGTH for w in words):
+                continue
+            term = '"' + ' '.join(words) + '"'
+        elif len(word) >= FULLTEXT_MIN_TOKEN_LENGTH:
+            term = word if exclude else word + '*'
+        else:
+            continue
+        terms.append(('-' if exclude else '+') + term)
+        has_required = has_required or not exclude
+    return ' '.join(terms) if has_required else ''
+
+
+def build_report_listing_query(search=None, category=None, status=None, order='newest', after=None,
+                               limit=REPORT_PAGE_SIZE):
+    """Build the SQL and parameters for one page of the report listing.
+
+    All filtering, searching, ordering and paging happens in SQL, so the
+    cost of a page does not grow with the size of the reports table.
+    """
+    direction, keys = REPORT_ORDERINGS[order]
+    conditions = []
+    params = []
+
+    if search:
+        boolean_query = to_boolean_query(search)
+        if boolean_query:
+            conditions.append(f"MATCH({REPORT_FULLTEXT_COLUMNS}) AGAINST (%s IN BOOLEAN MODE)")
+            params.append(boolean_query)
+        else:
+            # Only words too short for the FULLTEXT index: fall back to a title scan
+            escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            conditions.append("r.title LIKE %s")
+            params.append(f"%{escaped}%")
+    if category:
+        conditions.append("r.category_name = %s")
+        params.append(category)
+    if status:
+        # Resolve the name first so the status_id-leading indexes are usable
+        conditions.append("r.status_id = (SELECT status_id FROM status WHERE name = %s)")
+        params.append(status)
+    if after:
+        conditions.append(_keyset_condition(keys, direction))
+        params.extend(_keyset_params(after))
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    order_by = ", ".join(f"r.{key} {direction}" for key in keys)
+
+    # Anonymous reports and deleted owners are masked in SQL so rows can
+    # be serialised straight to the client
+    query = f"""
+        SELECT r.report_id, r.title, r.description, r.category_name, r.created_at, s.name AS status_name,
+               CASE WHEN r.is_anonymous THEN 'Anonymous' ELSE COALESCE(u.username, '—') END AS username
+        FROM reports r
+        JOIN status s
+          ON r.status_id = s.status_id
+        LEFT JOIN users u
+          ON r.user_id = u.user_id
+        {where}
+        ORDER BY {order_by}
+        LIMIT %s
+    """
+    params.append(limit + 1)
+    return query, params
+
+
+def get_reports_page(search=None, category=None, status=None, order='newest', after=None,
+                     limit=REPORT_PAGE_SIZE):
+    """Fetch one keyset page of the report listing.
+
+    after is the decoded cursor of the last row on the previous page.
+    Returns (reports, next_cursor); next_cursor is None on the last page.
+    """
+    query, params = build_report_listing_query(search=search, category=category, status=status,
+                                               order=order, after=after, limit=limit)
     conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True) 
+    cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("SELECT status_id, name FROM status ORDER BY status_id")
-        statuses = cursor.fetchall()  
-        return statuses
+        cursor.execute(query, params)
+        reports = cursor.fetchall()
     finally:
         cursor.close()
         conn.close()
 
-def get_all_reports():
+    next_cursor = None
+    if len(reports) > limit:
+        reports = reports[:limit]
+        next_cursor = encode_report_cursor(order, reports[-1])
+    return reports, next_cursor
+
+def search_reports(search, category=None, status=None, page=1, limit=SEARCH_PAGE_SIZE):
+    """Relevance-ranked FULLTEXT search over report titles and descriptions.
+
+    Returns (reports, has_more). Each report carries its relevance score.
+    Paging is by offset because relevance is not a stable keyset; the depth
+    is capped at MAX_SEARCH_PAGE pages.
+    """
+    boolean_query = to_boolean_query(search)
+    if not boolean_query:
+        return [], False
+
+    conditions = [f"MATCH({REPORT_FULLTEXT_COLUMNS}) AGAINST (%s IN BOOLEAN MODE)"]
+    params = [boolean_query, boolean_query]
+    if category:
+        conditions.append("r.category_name = %s")
+        params.append(category)
+    if status:
+        conditions.append("r.status_id = (SELECT status_id FROM status WHERE name = %s)")
+        params.append(status)
+    params.extend([limit + 1, (page - 1) * limit])
+
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("""
-            SELECT r.report_id, r.title, r.description, r.category_name, r.is_anonymous, r.created_at, s.name AS status_name, u.username
+        cursor.execute(f"""
+            SELECT r.report_id, r.title, r.description, r.category_name, r.created_at, s.name AS status_name,
+                   CASE WHEN r.is_anonymous THEN 'Anonymous' ELSE COALESCE(u.username, '—') END AS username,
+                   MATCH({REPORT_FULLTEXT_COLUMNS}) AGAINST (%s IN BOOLEAN MODE) AS relevance
             FROM reports r
             JOIN status s
               ON r.status_id = s.status_id
             LEFT JOIN users u
               ON r.user_id = u.user_id
-            ORDER BY r.report_id
-        """)
+            WHERE {' AND '.join(conditions)}
+            ORDER BY relevance DESC, r.report_id DESC
+            LIMIT %s OFFSET %s
+        """, params)
         reports = cursor.fetchall()
-
-        # Override username if anonymous, or supply a placeholder
-        for r in reports:
-            if r['is_anonymous']:
-                r['username'] = 'Anonymous'
-            elif r.get('username') is None:
-                r['username'] = '—'
-
-        return reports
-
     finally:
         cursor.close()
         conn.close()
 
+    has_more = len(reports) > limit
+    return reports[:limit], has_more
+
+
 def get_report_attachments(report_id):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
@@ -93,6 +279,9 @@ def update_status():
     if not report_id or not status_id:
         current_app.logger.warning("Invalid or missing report_id/status_id")
         return jsonify(success=False, error="Invalid input."), 400
+    if not statuses.is_valid_id(status_id):
+        current_app.logger.warning(f"Unknown status_id {status_id}")
+        return jsonify(success=False, error="Invalid status."), 400
 
     try:
         conn = get_db_connection()
@@ -103,6 +292,8 @@ def update_status():
             WHERE report_id = %s
         """, (status_id, datetime.datetime.now(), report_id))
         conn.commit()
+        report_listings.bump()
+        report_details.invalidate(report_id)
         print("Update successful")
         return jsonify(success=True)
     except Exception as e:
@@ -142,6 +333,8 @@ def delete_report(report_id):
 
         cursor.execute("DELETE FROM reports WHERE report_id = %s", (report_id,))
         conn.commit()
+        report_listings.bump()
+        report_details.invalidate(report_id)
 
         return '', 204 
     except Exception as e:
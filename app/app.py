@@ -5,28 +5,52 @@ from datetime import timedelta
 import mysql.connector
 import os
 import re
+import secrets
+import hashlib
 from datetime import datetime
 from flask import make_response
 from report_submission import bp as reports_bp
+from reference_data import CATEGORY_DISPLAY_NAMES, statuses
 from home_dashboard import get_report_by_id, get_report_attachments
-from admin_dashboard import get_statuses, get_all_reports
+from admin_dashboard import get_reports_page, decode_report_cursor, search_reports, \
+    REPORT_ORDERINGS, REPORT_PAGE_SIZE, MAX_REPORT_PAGE_SIZE, MAX_SEARCH_LENGTH, SEARCH_PAGE_SIZE, MAX_SEARCH_PAGE
 from admin_dashboard import bp as admin_bp
 from accounts import bp as accounts_bp
 from admin_settings import admin_settings_bp
 from accounts import get_all_users
 from werkzeug.utils import secure_filename
-from flask_wtf.csrf import CSRFProtect, generate_csrf
+from werkzeug.http import is_resource_modified
+from flask_wtf.csrf import CSRFProtect, generate_csrf, validate_csrf
+from wtforms.validators import ValidationError
 from extensions import limiter
-from access_control import ROLE_PERMISSIONS, ROLE_REDIRECT_MAP, permission_required, login_required, otp_verified_required, role_required
+from access_control import ROLE_PERMISSIONS, ROLE_REDIRECT_MAP, permission_required, login_required, otp_verified_required, role_required, \
+    get_user_record
+from db import pool as db_pool, get_db_connection, get_pool_stats
+from cache import notification_counts, report_listings, report_details, user_records
+from invalidation import invalidation_bus
+from outbox import outbox_stats
+from mailer import smtp_pool_stats
+from otp_delivery import otp_deliveries
+from hashing import password_hasher, HashingBusyError
+import metrics
 
 # Import logging configuration
-from logging_config import setup_graylog_logging, log_security_event, log_application_event, log_database_event
+from logging_config import setup_graylog_logging, log_security_event, log_application_event, log_database_event, \
+    get_logging_stats
 
 app = Flask(__name__)
 
 # Setup Graylog logging early
 setup_graylog_logging(app)
 
+# Registered first so the timer also covers the other before_request hooks
+metrics.init_app(app)
+# Drop cache entries other workers invalidated before any handler reads them
+invalidation_bus.init_app(app)
+otp_deliveries.init_app(app)
+
+# Rate limits stay on outside of load tests (benchmarks/loadtest.py drives every flow from one address)
+app.config['RATELIMIT_ENABLED'] = os.getenv('RATELIMIT_ENABLED', 'true').lower() == 'true'
 limiter.init_app(app)
 
 csrf = CSRFProtect()
@@ -51,12 +75,22 @@ app.config['MYSQL_USER'] = os.getenv('MYSQL_USER', 'x')
 app.config['MYSQL_PASSWORD'] = os.getenv('MYSQL_PASSWORD', 'x')
 app.config['MYSQL_DB'] = os.getenv('MYSQL_DB', 'flask_db')
 
+# Shared connection pool (DB_POOL_SIZE / DB_POOL_TIMEOUT / DB_POOL_RECYCLE / DB_POOL_PING_INTERVAL)
+db_pool.init_app(app)
+
 # Email configuration for notifications
 app.config['SMTP_SERVER'] = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
 app.config['SMTP_PORT'] = int(os.getenv('SMTP_PORT', 587))
 app.config['SENDER_EMAIL'] = os.getenv('SENDER_EMAIL', 'your-app@example.com')
 app.config['SENDER_PASSWORD'] = os.getenv('SENDER_PASSWORD', 'your-app-password')
 app.config['APP_NAME'] = os.getenv('APP_NAME', 'Your App Name')
+# Pooled SMTP sessions (see mailer.py); STARTTLS can be turned off for a local SMTP sink
+app.config['SMTP_STARTTLS'] = os.getenv('SMTP_STARTTLS', 'true').lower() == 'true'
+app.config['SMTP_POOL_SIZE'] = int(os.getenv('SMTP_POOL_SIZE', 4))
+app.config['SMTP_TIMEOUT'] = int(os.getenv('SMTP_TIMEOUT', 30))
+app.config['SMTP_NOOP_INTERVAL'] = int(os.getenv('SMTP_NOOP_INTERVAL', 30))
+app.config['SMTP_SESSION_MAX_AGE'] = int(os.getenv('SMTP_SESSION_MAX_AGE', 300))
+app.config['SMTP_SESSION_MAX_MESSAGES'] = int(os.getenv('SMTP_SESSION_MAX_MESSAGES', 100))
 
 # Log application startup
 log_application_event("application_startup", details={"app_name": app.config['APP_NAME']})
@@ -88,32 +122,10 @@ def inject_csrf_token():
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
 
-def get_db_connection():
-    try:
-        conn = mysql.connector.connect(
-            host=app.config['MYSQL_HOST'],
-            user=app.config['MYSQL_USER'],
-            password=app.config['MYSQL_PASSWORD'],
-            database=app.config['MYSQL_DB']
-        )
-        return conn
-    except Exception as e:
-        app.logger.error(f"Database connection failed: {e}")
-        log_database_event("connection_failed", details={"error": str(e)})
-        raise
-
-
 # Helper function to get user by ID
 def get_user_by_id(user_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute('SELECT * FROM users WHERE user_id = %s', (user_id,))
-        user = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        log_database_event("user_query", table="users", user_id=user_id)
-        return user
+        return get_user_record(user_id)
     except Exception as e:
         app.logger.error(f"Error getting user: {e}")
         log_database_event("user_query_failed", table="users", user_id=user_id, details={"error": str(e)})
@@ -149,8 +161,8 @@ def get_user_reports(user_id):
 
 # Helper function to get user notification count
 def get_unread_notification_count(user_id):
-    """Get count of unread notifications for a user"""
-    try:
+    """Get count of unread notifications for a user (cached; COUNT only on a miss)"""
+    def count_unread(user_id):
         conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute('SELECT COUNT(*) FROM notification WHERE user_id = %s AND is_read = FALSE', (user_id,))
@@ -158,6 +170,9 @@ def get_unread_notification_count(user_id):
         cursor.close()
         conn.close()
         return count
+
+    try:
+        return notification_counts.get(user_id, count_unread)
     except Exception as e:
         app.logger.error(f"Error getting notification count: {e}")
         log_database_event("notification_count_failed", table="notification", user_id=user_id,
@@ -175,6 +190,50 @@ def inject_notification_count():
     return dict(notification_count=0)
 
 
+@app.route('/api/notifications/read', methods=['POST'])
+@login_required
+@otp_verified_required
+def mark_notifications_read():
+    """Mark the given notification ids (or all of them) as read for the current user"""
+    user_id = session.get('user_id')
+    try:
+        validate_csrf(request.headers.get('X-CSRFToken'))
+    except ValidationError:
+        return jsonify({'error': 'Invalid or missing CSRF token'}), 400
+
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if ids is not None and (not isinstance(ids, list) or not all(isinstance(i, int) for i in ids)):
+        return jsonify({'error': 'ids must be a list of integers'}), 400
+    if ids == []:
+        return jsonify({'success': True, 'marked': 0})
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        if ids is not None:
+            placeholders = ', '.join(['%s'] * len(ids))
+            cursor.execute(f'''
+                UPDATE notification SET is_read = TRUE
+                WHERE user_id = %s AND is_read = FALSE AND id IN ({placeholders})
+            ''', (user_id, *ids))
+        else:
+            cursor.execute('UPDATE notification SET is_read = TRUE WHERE user_id = %s AND is_read = FALSE',
+                           (user_id,))
+        marked = cursor.rowcount
+        conn.commit()
+        cursor.close()
+        conn.close()
+    except Exception as e:
+        app.logger.error(f"Error marking notifications read: {e}")
+        log_database_event("notification_mark_read_failed", table="notification", user_id=user_id,
+                           details={"error": str(e)})
+        return jsonify({'error': 'Failed to update notifications'}), 500
+
+    notification_counts.decrement(user_id, marked)
+    return jsonify({'success': True, 'marked': marked})
+
+
 # Helper function to check if path should be logged
 def should_log_request(path):
     """Check if request should be logged (filter out static files and frequent endpoints)"""
@@ -182,7 +241,9 @@ def should_log_request(path):
         '/static/',
         '/favicon.ico',
         '/robots.txt',
-        '/health'  # Remove if you want to log health checks
+        '/health',  # Remove if you want to log health checks
+        '/metrics',  # Scraped every few seconds
+        '/verify_otp/status'  # Polled every second while the OTP email is sent
     ]
 
     for skip_path in skip_paths:
@@ -264,8 +325,7 @@ def add_security_headers(response):
 @role_required('user')
 def index():
     log_application_event("index_accessed", user_id=session.get('user_id'))
-    reports = get_all_reports()
-    response = make_response(render_template('0_index.html', reports=reports))
+    response = make_response(render_template('0_index.html'))
     response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0"
     response.headers["Pragma"] = "no-cache"
     response.headers["Expires"] = "0"
@@ -273,6 +333,30 @@ def index():
 
 
 
+def report_validators(report, variant):
+    """ETag and Last-Modified for a report response.
+
+    The ETag covers the report's updated_at and status plus the viewer's
+    session (the page shows their name and role), so one user's cached copy
+    never validates for another.
+    """
+    modified = report.get('updated_at') or report.get('created_at')
+    fingerprint = '|'.join(str(part) for part in (
+        variant, report['report_id'], report['status_id'], modified.isoformat() if modified else '',
+        session.get('user_id'), session.get('username'), session.get('role')))
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:32], modified
+
+
+def with_report_validators(response, etag, modified):
+    response.set_etag(etag)
+    if modified:
+        response.last_modified = modified
+    # Browsers may keep the response but must revalidate it every time
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
 @app.route('/report/<int:report_id>')
 @login_required
 @otp_verified_required
@@ -284,7 +368,12 @@ def view_report(report_id):
         log_application_event("report_not_found", level="warning", user_id=session.get('user_id'),
                               details={"report_id": report_id})
         return "Report not found", 404
-    return render_template('0_report_detail.html', report=report)
+
+    etag, modified = report_validators(report, 'page')
+    if not is_resource_modified(request.environ, etag=etag, last_modified=modified):
+        return with_report_validators(app.response_class(status=304), etag, modified)
+    return with_report_validators(make_response(render_template('0_report_detail.html', report=report)),
+                                  etag, modified)
 
 @app.route("/report_attachments/<int:report_id>", methods=["GET"])
 @login_required
@@ -300,9 +389,92 @@ def fetch_report_attachments(report_id):
 @role_required('admin')
 def admin():
     log_security_event("admin_dashboard_accessed", user_id=session.get('user_id'), request=request)
-    statuses = get_statuses()
-    reports = get_all_reports()
-    return render_template('7_admin_dashboard.html', statuses=statuses, reports=reports)
+    return render_template('7_admin_dashboard.html', statuses=statuses.all())
+
+
+@app.route('/api/reports')
+@login_required
+@otp_verified_required
+@permission_required('view_all_reports')
+def list_reports():
+    """One keyset-paginated page of the report listing for index.js/admin.js"""
+    search = request.args.get('q', '').strip()
+    category = request.args.get('category', '').strip()
+    status = request.args.get('status', '').strip().lower()
+    order = request.args.get('order', 'newest')
+    cursor_token = request.args.get('cursor', '')
+    limit = request.args.get('limit', REPORT_PAGE_SIZE, type=int)
+
+    if len(search) > MAX_SEARCH_LENGTH:
+        return jsonify({'error': f'Search must be at most {MAX_SEARCH_LENGTH} characters'}), 400
+    if category and category not in CATEGORY_DISPLAY_NAMES.values():
+        return jsonify({'error': 'Invalid category'}), 400
+    if order not in REPORT_ORDERINGS:
+        return jsonify({'error': 'Invalid order'}), 400
+    if not limit or not 1 <= limit <= MAX_REPORT_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {MAX_REPORT_PAGE_SIZE}'}), 400
+
+    after = None
+    if cursor_token:
+        after = decode_report_cursor(order, cursor_token)
+        if after is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    def render_page():
+        reports, next_cursor = get_reports_page(search=search or None, category=category or None,
+                                                status=status or None, order=order, after=after, limit=limit)
+        return app.json.dumps({'reports': reports, 'next_cursor': next_cursor}, separators=(',', ':')).encode()
+
+    # Every user sees the same page for the same arguments, so the serialized
+    # body is shared until the next report write bumps the listing version
+    try:
+        body = report_listings.get_or_compute(
+            ('list', search, category, status, order, cursor_token, limit), render_page)
+    except Exception as e:
+        app.logger.error(f"Report listing error: {str(e)}")
+        log_application_event("report_listing_error", level="error", user_id=session.get('user_id'),
+                              details={"error": str(e), "type": type(e).__name__})
+        return jsonify({'error': 'An error occurred while fetching reports'}), 500
+
+    return app.response_class(body, mimetype='application/json')
+
+
+@app.route('/api/reports/search')
+@login_required
+@otp_verified_required
+@permission_required('view_all_reports')
+def search_reports_api():
+    """Relevance-ranked full-text search over report titles and descriptions"""
+    search = request.args.get('q', '').strip()
+    category = request.args.get('category', '').strip()
+    status = request.args.get('status', '').strip().lower()
+    page = request.args.get('page', 1, type=int)
+    limit = request.args.get('limit', SEARCH_PAGE_SIZE, type=int)
+
+    if not search or len(search) > MAX_SEARCH_LENGTH:
+        return jsonify({'error': f'q must be between 1 and {MAX_SEARCH_LENGTH} characters'}), 400
+    if category and category not in CATEGORY_DISPLAY_NAMES.values():
+        return jsonify({'error': 'Invalid category'}), 400
+    if not page or not 1 <= page <= MAX_SEARCH_PAGE:
+        return jsonify({'error': f'page must be between 1 and {MAX_SEARCH_PAGE}'}), 400
+    if not limit or not 1 <= limit <= MAX_REPORT_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {MAX_REPORT_PAGE_SIZE}'}), 400
+
+    def render_page():
+        reports, has_more = search_reports(search, category=category or None, status=status or None,
+                                           page=page, limit=limit)
+        return app.json.dumps({'reports': reports, 'page': page,
+                               'has_more': has_more and page < MAX_SEARCH_PAGE}, separators=(',', ':')).encode()
+
+    try:
+        body = report_listings.get_or_compute(('search', search, category, status, page, limit), render_page)
+    except Exception as e:
+        app.logger.error(f"Report search error: {str(e)}")
+        log_application_event("report_search_error", level="error", user_id=session.get('user_id'),
+                              details={"error": str(e), "type": type(e).__name__})
+        return jsonify({'error': 'An error occurred while searching reports'}), 500
+
+    return app.response_class(body, mimetype='application/json')
 
 
 @app.route('/profile')
@@ -447,6 +619,10 @@ def update_profile():
         cursor.close()
         conn.close()
 
+        # Listings show the author's username
+        report_listings.bump()
+        user_records.invalidate(user_id)
+
         # Update session data
         session['username'] = username
         session['email'] = email
@@ -533,10 +709,10 @@ def change_password():
                 flash(error_msg, 'error')
             return redirect(url_for('profile'))
 
-        # Get current user data to verify current password
+        # The user cache never holds the hash, so read it here
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
-        cursor.execute('SELECT * FROM users WHERE user_id = %s', (user_id,))
+        cursor.execute('SELECT pwd FROM users WHERE user_id = %s', (user_id,))
         user = cursor.fetchone()
 
         if not user:
@@ -553,6 +729,8 @@ def change_password():
         # Verify current password
         try:
             ph.verify(user['pwd'], current_password)
+        except HashingBusyError:
+            raise
         except VerifyMismatchError:
             log_security_event("password_change_wrong_current_password", user_id=user_id, request=request)
             flash('Current password is incorrect', 'error')
@@ -567,7 +745,8 @@ def change_password():
             conn.close()
             return redirect(url_for('profile'))
 
-        # Hash new password securely
+        # Hash new password securely (always with the configured ARGON2_* parameters,
+        # so an outdated stored hash is replaced here as well)
         new_hashed_password = ph.hash(new_password)
 
         # Update password in database
@@ -579,6 +758,7 @@ def change_password():
         conn.commit()
         cursor.close()
         conn.close()
+        user_records.invalidate(user_id)
 
         flash('Password changed successfully! Please use your new password for future logins.', 'success')
 
@@ -586,6 +766,10 @@ def change_password():
         log_security_event("password_changed_successfully", user_id=user_id, request=request)
         log_database_event("password_updated", table="users", user_id=user_id)
 
+    except HashingBusyError as e:
+        log_application_event("password_hashing_busy", level="warning", user_id=user_id,
+                              details={"reason": e.reason, "endpoint": request.endpoint})
+        flash('The server is busy. Please try changing your password again in a moment.', 'error')
     except Exception as e:
         flash('Error changing password. Please try again.', 'error')
         # Log detailed error
@@ -606,26 +790,19 @@ def get_report_details(report_id):
     log_application_event("api_report_details_accessed", user_id=user_id, details={"report_id": report_id})
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        # Get report details - ensure user owns this report
-        cursor.execute('''
-            SELECT r.*, s.name AS status_name
-            FROM reports r 
-            JOIN status s ON r.status_id = s.status_id
-            WHERE r.report_id = %s AND r.user_id = %s
-        ''', (report_id, user_id))
+        report = get_report_by_id(report_id)
 
-        report = cursor.fetchone()
-        cursor.close()
-        conn.close()
-
-        if not report:
+        # Ensure user owns this report
+        if not report or report['user_id'] != user_id:
             log_application_event("api_report_not_found", level="warning", user_id=user_id,
                                   details={"report_id": report_id})
             return jsonify({'error': 'Report not found'}), 404
 
+        # profile.js reopening the same report's modal revalidates instead of refetching
+        etag, modified = report_validators(report, 'api')
+        if not is_resource_modified(request.environ, etag=etag, last_modified=modified):
+            return with_report_validators(app.response_class(status=304), etag, modified)
+
         # Convert datetime objects to strings for JSON serialization
         if report.get('created_at'):
             report['created_at'] = report['created_at'].strftime('%B %d, %Y at %I:%M %p')
@@ -633,7 +810,7 @@ def get_report_details(report_id):
             report['updated_at'] = report['updated_at'].strftime('%B %d, %Y at %I:%M %p')
 
         log_application_event("api_report_details_success", user_id=user_id, details={"report_id": report_id})
-        return jsonify(report)
+        return with_report_validators(jsonify(report), etag, modified)
     
     except mysql.connector.Error as db_error:
         # Log database errors internally
@@ -708,6 +885,10 @@ def delete_account():
         # Start transaction to ensure data integrity
         cursor.execute('START TRANSACTION')
 
+        # Their cached report details are dropped after the commit
+        cursor.execute('SELECT report_id FROM reports WHERE user_id = %s', (user_id,))
+        report_ids = [row[0] for row in cursor.fetchall()]
+
         # Delete user's report attachments first (if any exist)
         cursor.execute('''
             DELETE FROM report_attachments 
@@ -736,6 +917,12 @@ def delete_account():
         log_security_event("account_deleted_successfully", user_id=user_id, request=request)
         log_database_event("account_deleted", table="users", user_id=user_id)
 
+        notification_counts.invalidate(user_id)
+        report_listings.bump()
+        for report_id in report_ids:
+            report_details.invalidate(report_id)
+        user_records.invalidate(user_id)
+
         # Clear the session
         session.clear()
 
@@ -758,9 +945,18 @@ def delete_account():
         return redirect(url_for('profile'))
 
 
+def monitoring_authorized():
+    # /metrics and the /health details need "Authorization: Bearer <METRICS_TOKEN>"; without a token nobody gets them
+    token = os.getenv('METRICS_TOKEN')
+    return bool(token) and secrets.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}")
+
+
 @app.route('/health')
 def health():
     # Health check endpoint for monitoring
+    db_status = "unhealthy"
+    email_outbox = None
+    details = monitoring_authorized()
     try:
         # Test database connection
         conn = get_db_connection()
@@ -768,20 +964,97 @@ def health():
         cursor.execute('SELECT 1')
         cursor.fetchone()
         cursor.close()
-        conn.close()
         db_status = "healthy"
+        if details:
+            email_outbox = outbox_stats(conn)
+        conn.close()
     except Exception as e:
         # Log the error internally
         app.logger.error(f"Health check database error: {str(e)}")
         log_application_event("health_check_failed", level="error", 
                             details={"error": str(e), "type": type(e).__name__})
-        db_status = "unhealthy"
-        
-    return {
+
+    health_status = {
         "status": "healthy" if db_status == "healthy" else "degraded",
         "database": db_status,
         "timestamp": datetime.now().isoformat()
-    }, 200 if db_status == "healthy" else 503
+    }
+    if details:
+        health_status.update({
+            "database_pool": get_pool_stats(),
+            "notification_count_cache": notification_counts.snapshot(),
+            "report_listing_cache": report_listings.snapshot(),
+            "cache_invalidation": invalidation_bus.stats(),
+            "reference_data": statuses.snapshot(),
+            "user_cache": user_records.snapshot(),
+            "report_detail_cache": report_details.snapshot(),
+            "email_outbox": email_outbox,
+            "smtp_pools": smtp_pool_stats(),
+            "otp_delivery": otp_deliveries.stats(),
+            "password_hashing": password_hasher.stats(),
+            "logging": get_logging_stats(),
+        })
+    return health_status, 200 if db_status == "healthy" else 503
+
+
+# Runtime gauges, refreshed by each process before its metrics snapshot
+db_pool_gauge = metrics.registry.gauge('db_pool_connections', 'Database pool connections by state', ('state',))
+hash_gauge = metrics.registry.gauge('password_hash_calls', 'Argon2 calls running or waiting for a slot', ('state',))
+hash_rejections_gauge = metrics.registry.gauge(
+    'password_hash_rejections', 'Argon2 calls refused since the process started', ('reason',))
+otp_pending_gauge = metrics.registry.gauge('otp_delivery_pending', 'OTP emails queued or sending')
+log_queue_gauge = metrics.registry.gauge('log_queue_records', 'Log records waiting to be shipped to Graylog')
+email_outbox_gauge = metrics.registry.gauge(
+    'email_outbox_jobs', 'Notification emails in the outbox by status', ('status',), mode='local')
+email_outbox_lag_gauge = metrics.registry.gauge(
+    'email_outbox_lag_seconds', 'Age of the oldest pending notification email', mode='local')
+
+
+def collect_runtime_gauges():
+    pool_stats = get_pool_stats()
+    db_pool_gauge.set(pool_stats.get('in_use', 0), state='in_use')
+    db_pool_gauge.set(pool_stats.get('idle', 0), state='idle')
+    db_pool_gauge.set(pool_stats.get('size', 0), state='max')
+
+    hash_stats = password_hasher.stats()
+    hash_gauge.set(hash_stats['running'], state='running')
+    hash_gauge.set(hash_stats['waiting'], state='waiting')
+    hash_rejections_gauge.set(hash_stats['rejected_queue_full'], reason='queue_full')
+    hash_rejections_gauge.set(hash_stats['rejected_timeout'], reason='timeout')
+
+    otp_pending_gauge.set(otp_deliveries.stats()['pending'])
+    logging_stats = get_logging_stats()
+    if logging_stats:
+        log_queue_gauge.set(logging_stats['queued'])
+
+
+metrics.registry.add_collector(collect_runtime_gauges)
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    # Prometheus scrape target; hidden entirely unless METRICS_TOKEN is set
+    if not os.getenv('METRICS_TOKEN'):
+        abort(404)
+    if not monitoring_authorized():
+        abort(401)
+
+    # The outbox is one table shared by every process, so it is read once
+    # per scrape here rather than by every process's collector
+    try:
+        conn = get_db_connection()
+        outbox = outbox_stats(conn)
+        conn.close()
+        for status in ('pending', 'sending', 'failed'):
+            email_outbox_gauge.set(outbox[status], status=status)
+        email_outbox_lag_gauge.set(outbox['lag_seconds'])
+    except Exception as e:
+        app.logger.error(f"Metrics outbox query failed: {str(e)}")
+
+    response = make_response(metrics.registry.render())
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
 
 # Temporary as will change images location in future
@@ -881,6 +1154,18 @@ def forbidden(error):
     return render_template('errors/403.html'), 403
 
 
+@app.errorhandler(HashingBusyError)
+def hashing_busy(error):
+    # Login storm: fail fast instead of queueing more 64 MB Argon2 calls
+    log_application_event("password_hashing_busy", level="warning",
+                          details={"reason": error.reason, "endpoint": request.endpoint})
+    flash("The server is busy right now. Please try again in a few seconds.", "error")
+    template = '1_register.html' if request.endpoint == 'accounts.register_user' else '1_login.html'
+    response = make_response(render_template(template, rate_limited=True, retry_after=error.retry_after), 503)
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
 @app.errorhandler(500)
 def internal_error(error):
     log_application_event("500_error", level="error",
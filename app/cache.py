@@ -0,0 +1,334 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from invalidation import invalidation_bus, key_bucket
+
+
+class CacheStats:
+    """Hit/miss counters shared by the in-process caches"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def snapshot(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class UnreadCountCache:
+    """Per-user unread notification counters kept in front of the COUNT query.
+
+    Writers adjust this process's counters in place (increment on fan-out,
+    decrement on read) instead of forcing a recount; a user with no cached
+    entry is a miss and get() falls back to the COUNT query. Every write is
+    also published per user_id on `channel`, so other worker processes drop
+    that user's counter before their next request and recount it; a fan-out
+    to more than `max_keyed` users drops every counter there instead. Entries
+    expire after `ttl` seconds and the least recently used entries are
+    evicted beyond `max_entries`.
+    """
+
+    def __init__(self, ttl=None, max_entries=None, channel='notification_counts', max_keyed=256):
+        self.ttl = ttl if ttl is not None else int(os.getenv('NOTIFICATION_COUNT_CACHE_TTL', 60))
+        self.max_entries = max_entries or int(os.getenv('NOTIFICATION_COUNT_CACHE_SIZE', 10000))
+        self.channel = channel
+        self.max_keyed = max_keyed
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._by_bucket = {}
+        self._generation = 0
+        self.stats = CacheStats()
+        invalidation_bus.register_keyed(channel, self._drop)
+
+    def get(self, user_id, load):
+        """Return the count, calling load(user_id) for it on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                self.stats.hit()
+                return entry[0]
+            if entry is not None:
+                self._remove(user_id)
+            generation = self._generation
+        self.stats.miss()
+
+        count = load(user_id)
+        with self._lock:
+            # Not cached if a notification was written or read while it counted
+            if generation == self._generation:
+                self._entries[user_id] = (count, time.monotonic() + self.ttl)
+                self._entries.move_to_end(user_id)
+                self._by_bucket.setdefault(key_bucket(self.channel, user_id), set()).add(user_id)
+                while len(self._entries) > self.max_entries:
+                    self._remove(next(iter(self._entries)))
+        return count
+
+    def _remove(self, user_id):
+        del self._entries[user_id]
+        bucket = key_bucket(self.channel, user_id)
+        keys = self._by_bucket.get(bucket)
+        if keys is not None:
+            keys.discard(user_id)
+            if not keys:
+                del self._by_bucket[bucket]
+
+    def _adjust(self, user_id, delta):
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            self._entries[user_id] = (max(0, entry[0] + delta), entry[1])
+
+    def increment(self, user_ids, by=1):
+        """Bump the counters of users that just received a notification.
+        Users without a cached entry are left alone; their next read recounts."""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                self._adjust(user_id, by)
+        if len(user_ids) > self.max_keyed:
+            invalidation_bus.publish(self.channel, local=False)
+        else:
+            for user_id in user_ids:
+                invalidation_bus.publish(self.channel, user_id, local=False)
+
+    def decrement(self, user_id, by=1):
+        with self._lock:
+            self._generation += 1
+            self._adjust(user_id, -by)
+        invalidation_bus.publish(self.channel, user_id, local=False)
+
+    def invalidate(self, user_id):
+        invalidation_bus.publish(self.channel, user_id)  # calls _drop here too
+
+    def _drop(self, buckets):
+        with self._lock:
+            self._generation += 1
+            if buckets is None:
+                self._entries.clear()
+                self._by_bucket.clear()
+                return
+            for bucket in buckets:
+                for user_id in self._by_bucket.pop(bucket, ()):
+                    del self._entries[user_id]
+
+    def snapshot(self):
+        stats = self.stats.snapshot()
+        with self._lock:
+            stats['entries'] = len(self._entries)
+        return stats
+
+
+class VersionedResponseCache:
+    """Serialized response bodies keyed by a data version plus the request's arguments.
+
+    Every write to the underlying data calls bump(), so entries built from
+    older data simply stop matching; nothing has to work out which pages a
+    write affected. Lookups are single-flight: when many requests miss the
+    same key at once (right after a bump, typically), one computes the body
+    and the rest wait up to `wait_timeout` seconds for it instead of all
+    running the query. With a `channel`, bump() is published on the
+    invalidation bus so every worker process drops its entries before its
+    next request; `ttl` is then only a backstop.
+    """
+
+    def __init__(self, ttl=None, max_entries=None, wait_timeout=5.0, channel=None):
+        self.ttl = ttl if ttl is not None else int(os.getenv('REPORT_LISTING_CACHE_TTL', 30))
+        self.max_entries = max_entries or int(os.getenv('REPORT_LISTING_CACHE_SIZE', 500))
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._version = 0
+        self.stats = CacheStats()
+        self.channel = channel
+        if channel:
+            invalidation_bus.register(channel, self._invalidate)
+
+    @property
+    def version(self):
+        return self._version
+
+    def bump(self):
+        if self.channel:
+            invalidation_bus.publish(self.channel)  # calls _invalidate here too
+        else:
+            self._invalidate()
+
+    def _invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def get_or_compute(self, key, compute):
+        """Return the cached body for key, calling compute() on a miss"""
+        while True:
+            with self._lock:
+                versioned_key = (self._version, key)
+                body = self._lookup(versioned_key)
+                if body is not None:
+                    break
+                waiter = self._inflight.get(versioned_key)
+                if waiter is None:
+                    done = self._inflight[versioned_key] = threading.Event()
+                    break
+            # Another request is computing this body; use its result
+            if not waiter.wait(self.wait_timeout):
+                done = None
+                break
+
+        if body is not None:
+            self.stats.hit()
+            return body
+
+        self.stats.miss()
+        if done is None:
+            return compute()  # gave up waiting on a slow computation
+        try:
+            body = compute()
+            with self._lock:
+                # After a bump mid-computation the body may predate the write:
+                # this caller still gets it, but it is not cached
+                if versioned_key[0] == self._version:
+                    self._entries[versioned_key] = (body, time.monotonic() + self.ttl)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            return body
+        finally:
+            with self._lock:
+                self._inflight.pop(versioned_key, None)
+            done.set()
+
+    def snapshot(self):
+        stats = self.stats.snapshot()
+        with self._lock:
+            stats['entries'] = len(self._entries)
+            stats['version'] = self._version
+        return stats
+
+
+class RecordCache:
+    """Database rows by primary key, e.g. users by user_id.
+
+    get() serves a fresh copy of the cached row or loads it; rows that don't
+    exist are not cached, and `exclude` columns (secrets) are never stored.
+    Entries expire after `ttl` seconds and the least recently used are
+    evicted beyond `max_entries`. invalidate(key) is published on `channel`
+    and drops that row in every worker (plus, in other workers, any row
+    sharing its invalidation bucket); invalidate() with no key drops them all.
+    """
+
+    def __init__(self, channel, ttl, max_entries, exclude=()):
+        self.channel = channel
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.exclude = frozenset(exclude)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._by_bucket = {}
+        self._generation = 0
+        self.stats = CacheStats()
+        invalidation_bus.register_keyed(channel, self._drop)
+
+    def get(self, key, load):
+        """Return the row as a new dict, calling load(key) on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.stats.hit()
+                return dict(entry[0])
+            if entry is not None:
+                self._remove(key)
+            generation = self._generation
+        self.stats.miss()
+
+        row = load(key)
+        if row is None:
+            return None
+        row = {column: value for column, value in row.items() if column not in self.exclude}
+        with self._lock:
+            # Not cached if a write was invalidated while it loaded
+            if generation != self._generation:
+                return dict(row)
+            self._entries[key] = (row, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            self._by_bucket.setdefault(key_bucket(self.channel, key), set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+        return dict(row)
+
+    def _remove(self, key):
+        del self._entries[key]
+        bucket = key_bucket(self.channel, key)
+        keys = self._by_bucket.get(bucket)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_bucket[bucket]
+
+    def invalidate(self, key=None):
+        """Call after a write to the row with this key (or, with no key, to any row)"""
+        invalidation_bus.publish(self.channel, key)
+
+    def _drop(self, buckets):
+        with self._lock:
+            self._generation += 1
+            if buckets is None:
+                self._entries.clear()
+                self._by_bucket.clear()
+                return
+            for bucket in buckets:
+                for key in self._by_bucket.pop(bucket, ()):
+                    del self._entries[key]
+
+    def snapshot(self):
+        stats = self.stats.snapshot()
+        with self._lock:
+            stats['entries'] = len(self._entries)
+        return stats
+
+
+notification_counts = UnreadCountCache()
+
+# /api/reports and /api/reports/search pages; bumped by every report write
+report_listings = VersionedResponseCache(channel='report_listings')
+
+# users rows for profile/settings pages and live role checks
+user_records = RecordCache('users', ttl=int(os.getenv('USER_CACHE_TTL', 300)),
+                           max_entries=int(os.getenv('USER_CACHE_SIZE', 10000)), exclude=('pwd',))
+
+# /report/<id> and /api/report/<id> rows; invalidated by every report update or delete
+report_details = RecordCache('report_details', ttl=int(os.getenv('REPORT_DETAIL_CACHE_TTL', 300)),
+                             max_entries=int(os.getenv('REPORT_DETAIL_CACHE_SIZE', 5000)))
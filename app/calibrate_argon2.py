@@ -0,0 +1,102 @@
+"""Pick Argon2 parameters for this host.
+
+Measures verify latency under HASH_MAX_CONCURRENCY simultaneous logins and
+picks the strongest time_cost/memory_cost whose p95 stays within the
+target, keeping concurrency * memory_cost inside the memory budget:
+
+    cd app && python calibrate_argon2.py --target-ms 250 --concurrency 4 --memory-budget-mb 512
+
+Put the printed ARGON2_* lines in .env. Existing hashes keep working and
+are re-hashed with the new parameters the next time each user logs in.
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+
+from hashing import build_hasher
+
+# Candidate memory costs in KiB, strongest first. 19 MiB / t=2 is the OWASP
+# minimum for Argon2id, so nothing below it is offered.
+MEMORY_COSTS_KIB = [262144, 131072, 65536, 47104, 32768, 19456]
+MIN_TIME_COST = {19456: 2}
+MAX_TIME_COST = 10
+
+
+def measure(hasher, concurrency, rounds):
+    """p95 verify latency in ms with `concurrency` threads verifying at once"""
+    hashed = hasher.hash('calibration-password')
+    samples = []
+    lock = threading.Lock()
+    start = threading.Barrier(concurrency)
+
+    def worker():
+        start.wait()
+        for _ in range(rounds):
+            began = time.perf_counter()
+            hasher.verify(hashed, 'calibration-password')
+            elapsed = (time.perf_counter() - began) * 1000
+            with lock:
+                samples.append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    samples.sort()
+    return {
+        'p50_ms': statistics.median(samples),
+        'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    }
+
+
+def calibrate(target_ms, concurrency, memory_budget_kib, parallelism, rounds):
+    best = None
+    for memory_cost in MEMORY_COSTS_KIB:
+        if memory_cost * concurrency > memory_budget_kib:
+            continue
+        for time_cost in range(MIN_TIME_COST.get(memory_cost, 1), MAX_TIME_COST + 1):
+            result = measure(build_hasher(time_cost, memory_cost, parallelism), concurrency, rounds)
+            fits = result['p95_ms'] <= target_ms
+            print(f"  m={memory_cost // 1024:>4} MiB  t={time_cost:<2}  p50={result['p50_ms']:7.1f}ms  "
+                  f"p95={result['p95_ms']:7.1f}ms  {'ok' if fits else 'too slow'}")
+            if not fits:
+                break
+            # Strength ~ memory * passes; prefer more memory on ties
+            strength = memory_cost * time_cost
+            if best is None or strength > best['memory_cost'] * best['time_cost']:
+                best = {'time_cost': time_cost, 'memory_cost': memory_cost, **result}
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target-ms', type=float, default=250, help='p95 verify latency to stay under')
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('HASH_MAX_CONCURRENCY', 4)),
+                        help='simultaneous verifies to measure under (HASH_MAX_CONCURRENCY)')
+    parser.add_argument('--memory-budget-mb', type=int, default=512,
+                        help='RAM per worker process that hashing may use at once')
+    parser.add_argument('--parallelism', type=int, default=int(os.getenv('ARGON2_PARALLELISM', 4)))
+    parser.add_argument('--rounds', type=int, default=5, help='verifies per thread per candidate')
+    args = parser.parse_args()
+
+    print(f"Calibrating for p95 <= {args.target_ms:g}ms at concurrency {args.concurrency}, "
+          f"{args.memory_budget_mb} MiB budget, {os.cpu_count()} CPUs")
+    best = calibrate(args.target_ms, args.concurrency, args.memory_budget_mb * 1024,
+                     args.parallelism, args.rounds)
+    if best is None:
+        raise SystemExit("No candidate met the target; raise --target-ms or --memory-budget-mb, "
+                         "or lower --concurrency")
+
+    capacity = args.concurrency / (best['p50_ms'] / 1000)
+    print(f"\nChosen: p95 {best['p95_ms']:.1f}ms, about {capacity:.0f} logins/sec per worker process\n")
+    print(f"ARGON2_TIME_COST={best['time_cost']}")
+    print(f"ARGON2_MEMORY_COST={best['memory_cost']}")
+    print(f"ARGON2_PARALLELISM={args.parallelism}")
+    print(f"HASH_MAX_CONCURRENCY={args.concurrency}")
+
+
+if __name__ == '__main__':
+    main()
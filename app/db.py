@@ -0,0 +1,376 @@
+import functools
+import os
+import re
+import threading
+import time
+
+import mysql.connector
+from flask import g, has_app_context, has_request_context, request
+from mysql.connector.errors import PoolError
+
+from logging_config import log_database_event
+
+
+class PoolExhaustedError(PoolError):
+    """Raised when no pooled connection frees up within DB_POOL_TIMEOUT"""
+
+
+_LITERALS = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"|\b\d+(?:\.\d+)?\b|%s|%\(\w+\)s")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_statement(statement):
+    """Statement text with literals and placeholders as ? and IN lists collapsed"""
+    if isinstance(statement, bytes):
+        statement = statement.decode('utf-8', 'replace')
+    normalized = _LITERALS.sub('?', statement)
+    normalized = _IN_LISTS.sub('(...)', normalized)
+    return _WHITESPACE.sub(' ', normalized).strip()
+
+
+class RequestQueryStats:
+    """Statements run during one request: totals plus count/time per normalized statement"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = {}
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        entry = self.statements.get(statement)
+        if entry is None:
+            self.statements[statement] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+
+class InstrumentedCursor:
+    """Cursor proxy that times execute()/executemany().
+
+    Each statement is added to the request's RequestQueryStats (on flask.g)
+    and logged as slow_query when it takes longer than DB_SLOW_QUERY_MS.
+    """
+
+    def __init__(self, cursor, slow_seconds):
+        self._cursor = cursor
+        self._slow_seconds = slow_seconds
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._cursor.close()
+
+    def _timed(self, method, operation, params, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(operation, params, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            statement = normalize_statement(operation)
+            stats = g.get('_db_query_stats') if has_app_context() else None
+            if stats is not None:
+                stats.record(statement, elapsed)
+            if elapsed >= self._slow_seconds:
+                log_database_event("slow_query", details={
+                    "statement": statement,
+                    "duration_ms": round(elapsed * 1000, 1),
+                    "rows": self._cursor.rowcount,
+                    "endpoint": request.endpoint if has_request_context() else None,
+                })
+
+    def execute(self, operation, params=(), **kwargs):
+        return self._timed(self._cursor.execute, operation, params, **kwargs)
+
+    def executemany(self, operation, seq_params, **kwargs):
+        return self._timed(self._cursor.executemany, operation, seq_params, **kwargs)
+
+
+class PooledConnection:
+    """Thin proxy over a MySQL connection checked out of the pool.
+
+    Behaves like a normal mysql.connector connection, except that close()
+    hands the connection back to the pool instead of tearing it down, and
+    cursors are wrapped in InstrumentedCursor while DB_QUERY_STATS is on.
+    """
+
+    def __init__(self, pool, cnx, created_at):
+        self._pool = pool
+        self._cnx = cnx
+        self._created_at = created_at
+
+    def _live(self):
+        if self._cnx is None:
+            raise mysql.connector.errors.OperationalError("Connection already returned to the pool")
+        return self._cnx
+
+    def __getattr__(self, name):
+        return getattr(self._live(), name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._live().cursor(*args, **kwargs)
+        cfg = self._pool._app.config
+        if not cfg['DB_QUERY_STATS']:
+            return cursor
+        return InstrumentedCursor(cursor, cfg['DB_SLOW_QUERY_MS'] / 1000)
+
+    def is_connected(self):
+        # True while the handle is checked out; avoids a server ping per call
+        return self._cnx is not None
+
+    def close(self):
+        if self._cnx is not None:
+            cnx, self._cnx = self._cnx, None
+            self._pool._release(cnx, self._created_at)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class RequestConnection(PooledConnection):
+    """Pooled connection bound to the current app context (flask.g).
+
+    Every helper that runs during a request gets this same handle, so close()
+    is a no-op; the connection goes back to the pool in teardown_appcontext.
+    """
+
+    def close(self):
+        pass
+
+    def release(self):
+        PooledConnection.close(self)
+
+
+class ConnectionPool:
+    """Sized, health-checked MySQL connection pool shared by all blueprints.
+
+    Connections are opened lazily up to DB_POOL_SIZE and reused LIFO so the
+    hottest connections stay warm. A connection idle for longer than
+    DB_POOL_PING_INTERVAL seconds is pinged before reuse, and one older than
+    DB_POOL_RECYCLE seconds is replaced. Checkout blocks for at most
+    DB_POOL_TIMEOUT seconds before raising PoolExhaustedError.
+    """
+
+    def __init__(self, app=None):
+        self._app = None
+        self._lock = threading.Lock()
+        self._idle = []
+        self._slots = None
+        self._pid = None
+        self._stats = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('DB_POOL_SIZE', int(os.getenv('DB_POOL_SIZE', 10)))
+        app.config.setdefault('DB_POOL_TIMEOUT', float(os.getenv('DB_POOL_TIMEOUT', 5)))
+        app.config.setdefault('DB_POOL_RECYCLE', int(os.getenv('DB_POOL_RECYCLE', 3600)))
+        app.config.setdefault('DB_POOL_PING_INTERVAL', int(os.getenv('DB_POOL_PING_INTERVAL', 30)))
+        # Off in production unless asked for: timing every statement isn't free
+        query_stats = os.getenv('DB_QUERY_STATS', '').lower()
+        app.config.setdefault('DB_QUERY_STATS', query_stats == 'on' if query_stats else app.debug)
+        app.config.setdefault('DB_SLOW_QUERY_MS', float(os.getenv('DB_SLOW_QUERY_MS', 200)))
+        app.config.setdefault('DB_REPEATED_QUERY_THRESHOLD', int(os.getenv('DB_REPEATED_QUERY_THRESHOLD', 10)))
+        app.extensions['db_pool'] = self
+        app.before_request(self._start_query_stats)
+        app.after_request(self._finish_query_stats)
+        app.teardown_appcontext(self._teardown)
+        self._app = app
+        self._reset()
+
+    def _reset(self):
+        # Called on init and after a fork: sockets inherited from the parent
+        # process must never be shared, so start with an empty pool.
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(self._app.config['DB_POOL_SIZE'])
+        self._pid = os.getpid()
+        self._stats = {
+            'connections_opened': 0,
+            'connections_closed': 0,
+            'checkouts': 0,
+            'in_use': 0,
+            'timeouts': 0,
+            'failures': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+        }
+
+    def _connect(self):
+        cfg = self._app.config
+        cnx = mysql.connector.connect(
+            host=cfg['MYSQL_HOST'],
+            user=cfg['MYSQL_USER'],
+            password=cfg['MYSQL_PASSWORD'],
+            database=cfg['MYSQL_DB'],
+            # Buffer results so helpers sharing the request connection never
+            # trip over another cursor's unread rows
+            buffered=True,
+        )
+        with self._lock:
+            self._stats['connections_opened'] += 1
+        return cnx, time.monotonic()
+
+    def _discard(self, cnx):
+        try:
+            cnx.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._stats['connections_closed'] += 1
+
+    def _take_idle(self):
+        cfg = self._app.config
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                cnx, created_at, last_used = self._idle.pop()
+
+            now = time.monotonic()
+            if now - created_at > cfg['DB_POOL_RECYCLE']:
+                self._discard(cnx)
+                continue
+            if now - last_used > cfg['DB_POOL_PING_INTERVAL']:
+                try:
+                    cnx.ping(reconnect=False)
+                except Exception:
+                    self._discard(cnx)
+                    continue
+            return cnx, created_at
+
+    def get_connection(self, connection_class=PooledConnection):
+        if self._app is None:
+            raise RuntimeError("ConnectionPool.init_app() has not been called")
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self._app.config['DB_POOL_TIMEOUT']):
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise PoolExhaustedError("Failed getting connection; pool exhausted")
+
+        try:
+            cnx, created_at = self._take_idle() or self._connect()
+        except Exception:
+            self._slots.release()
+            with self._lock:
+                self._stats['failures'] += 1
+            raise
+
+        waited = time.monotonic() - started
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['in_use'] += 1
+            self._stats['wait_seconds_total'] += waited
+            self._stats['wait_seconds_max'] = max(self._stats['wait_seconds_max'], waited)
+        return connection_class(self, cnx, created_at)
+
+    def _release(self, cnx, created_at):
+        try:
+            if cnx.in_transaction:
+                cnx.rollback()
+            reusable = True
+        except Exception:
+            reusable = False
+
+        if reusable:
+            with self._lock:
+                self._idle.append((cnx, created_at, time.monotonic()))
+        else:
+            self._discard(cnx)
+
+        with self._lock:
+            self._stats['in_use'] -= 1
+        self._slots.release()
+
+    def _start_query_stats(self):
+        if self._app.config['DB_QUERY_STATS']:
+            g._db_query_stats = RequestQueryStats()
+
+    def _finish_query_stats(self, response):
+        stats = g.pop('_db_query_stats', None)
+        if stats is None:
+            return response
+
+        # The same statement run over and over in one request is usually a
+        # per-row query in a loop (N+1) that a join or executemany would replace
+        threshold = self._app.config['DB_REPEATED_QUERY_THRESHOLD']
+        for statement, (count, seconds) in stats.statements.items():
+            if count > threshold:
+                log_database_event("repeated_query_detected", details={
+                    "statement": statement,
+                    "count": count,
+                    "duration_ms": round(seconds * 1000, 1),
+                    "endpoint": request.endpoint,
+                })
+
+        if self._app.debug:
+            response.headers['X-DB-Queries'] = str(stats.count)
+            response.headers.add('Server-Timing', f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries"')
+        return response
+
+    def _teardown(self, exc=None):
+        conn = g.pop('_db_conn', None)
+        if conn is not None:
+            conn.release()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+        stats['size'] = self._app.config['DB_POOL_SIZE'] if self._app else 0
+        return stats
+
+
+pool = ConnectionPool()
+
+
+def get_db_connection():
+    """Return the request's shared connection, checking one out on first use.
+
+    Inside an app context the connection is cached on flask.g and returned
+    to the pool at teardown, so a request holds at most one connection no
+    matter how many helpers, decorators or context processors need it.
+    Outside an app context a plain pooled connection is returned; close()
+    hands it back.
+    """
+    try:
+        if not has_app_context():
+            return pool.get_connection()
+        conn = g.get('_db_conn')
+        if conn is None:
+            conn = g._db_conn = pool.get_connection(RequestConnection)
+        return conn
+    except PoolExhaustedError:
+        log_database_event("connection_pool_exhausted", details=pool.stats())
+        raise
+    except Exception as e:
+        log_database_event("connection_failed", details={"error": str(e)})
+        raise
+
+
+def release_db_connection():
+    """Hand the request's connection back early, e.g. before slow non-DB work"""
+    if has_app_context():
+        pool._teardown()
+
+
+def get_pool_stats():
+    return pool.stats()
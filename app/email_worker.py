@@ -0,0 +1,161 @@
+"""Email outbox worker.
+
+Delivers the notification emails that submit_report queues in the
+email_outbox table (sql_import/email_outbox.sql). Run one or more of these
+next to the web workers:
+
+    cd app && python email_worker.py
+    cd app && python email_worker.py --once        # drain due emails and exit
+
+Jobs are claimed in batches with SELECT ... FOR UPDATE SKIP LOCKED, so any
+number of workers can run side by side. Each batch is split across a
+bounded pool of sender threads, each sending its share over one pooled SMTP
+session (mailer.py); failures are retried with exponential backoff until
+EMAIL_OUTBOX_MAX_ATTEMPTS, then parked as 'failed'.
+"""
+import argparse
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app
+from db import get_db_connection
+from logging_config import log_application_event
+import outbox
+
+
+class EmailWorker:
+    def __init__(self, flask_app, batch_size, concurrency, poll_interval, lease_seconds,
+                 max_attempts, retry_base, retry_max, metrics_interval, retention_days):
+        self.app = flask_app
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.metrics_interval = metrics_interval
+        self.retention_days = retention_days
+        self._stopping = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='email')
+        self._last_metrics = 0.0
+        self.totals = {'sent': 0, 'retried': 0, 'failed': 0, 'max_delivery_lag_seconds': 0}
+
+    def stop(self, *_):
+        self._stopping.set()
+
+    def _deliver(self, jobs):
+        """Send a chunk of jobs over one pooled SMTP session; returns an error (or None) per job"""
+        with self.app.app_context():
+            return outbox.send_messages([outbox.build_message(job) for job in jobs])
+
+    def run_batch(self):
+        """Claim, send and settle one batch; returns the number of jobs claimed"""
+        with self.app.app_context():
+            conn = get_db_connection()
+            jobs = outbox.claim_batch(conn, self.batch_size, self.lease_seconds)
+            if not jobs:
+                return 0
+
+            # One chunk per sender thread, so each chunk reuses a single session
+            chunks = [jobs[i::self.concurrency] for i in range(min(self.concurrency, len(jobs)))]
+            results = []
+            for chunk, future in [(chunk, self._executor.submit(self._deliver, chunk)) for chunk in chunks]:
+                try:
+                    results.extend(zip(chunk, future.result()))
+                except Exception as e:
+                    results.extend((job, e) for job in chunk)
+
+            sent = []
+            cursor = conn.cursor()
+            for job, error in results:
+                if error is None:
+                    sent.append(job['id'])
+                    self.totals['max_delivery_lag_seconds'] = max(self.totals['max_delivery_lag_seconds'],
+                                                                  job['age_seconds'] or 0)
+                elif job['attempts'] >= self.max_attempts:
+                    outbox.mark_failed(cursor, job['id'], error)
+                    self.totals['failed'] += 1
+                    log_application_event("email_delivery_failed", level="error",
+                                          details={"outbox_id": job['id'], "attempts": job['attempts'],
+                                                   "error": str(error)})
+                else:
+                    outbox.mark_retry(cursor, job['id'],
+                                      outbox.retry_delay(job['attempts'], self.retry_base, self.retry_max), error)
+                    self.totals['retried'] += 1
+            outbox.mark_sent(cursor, sent)
+            conn.commit()
+            cursor.close()
+            self.totals['sent'] += len(sent)
+            return len(jobs)
+
+    def maintain(self):
+        """Reclaim expired leases, purge old sent rows and report queue metrics"""
+        with self.app.app_context():
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            reclaimed = outbox.reclaim_expired(cursor)
+            purged = outbox.purge_sent(cursor, self.retention_days)
+            conn.commit()
+            cursor.close()
+            log_application_event("email_outbox_metrics", details={
+                **outbox.outbox_stats(conn), **self.totals,
+                "reclaimed": reclaimed, "purged": purged,
+            })
+        self.totals['max_delivery_lag_seconds'] = 0
+        self._last_metrics = time.monotonic()
+
+    def run(self, once=False):
+        log_application_event("email_worker_started", details={
+            "pid": os.getpid(), "batch_size": self.batch_size, "concurrency": self.concurrency})
+        try:
+            while not self._stopping.is_set():
+                try:
+                    if time.monotonic() - self._last_metrics >= self.metrics_interval:
+                        self.maintain()
+                    claimed = self.run_batch()
+                except Exception as e:
+                    self.app.logger.error(f"Email outbox batch failed: {str(e)}")
+                    claimed = 0
+                if claimed < self.batch_size:
+                    if once:
+                        break
+                    # Queue drained; a full batch means more is waiting, so loop straight away
+                    self._stopping.wait(self.poll_interval)
+        finally:
+            self._executor.shutdown(wait=True)
+            log_application_event("email_worker_stopped", details={"pid": os.getpid(), **self.totals})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv('EMAIL_WORKER_BATCH_SIZE', 50)))
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('EMAIL_WORKER_CONCURRENCY', 4)),
+                        help='emails sent in parallel')
+    parser.add_argument('--poll-interval', type=float, default=float(os.getenv('EMAIL_WORKER_POLL_INTERVAL', 2)),
+                        help='seconds to sleep when the queue is empty')
+    parser.add_argument('--lease', type=int, default=int(os.getenv('EMAIL_WORKER_LEASE', 300)),
+                        help='seconds before a claimed but unsettled job is handed to another worker')
+    parser.add_argument('--max-attempts', type=int, default=int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 6)))
+    parser.add_argument('--retry-base', type=int, default=int(os.getenv('EMAIL_OUTBOX_RETRY_BASE', 30)),
+                        help='first retry delay in seconds; doubles per attempt')
+    parser.add_argument('--retry-max', type=int, default=int(os.getenv('EMAIL_OUTBOX_RETRY_MAX', 3600)))
+    parser.add_argument('--metrics-interval', type=float, default=float(os.getenv('EMAIL_WORKER_METRICS_INTERVAL', 60)))
+    parser.add_argument('--retention-days', type=int, default=int(os.getenv('EMAIL_OUTBOX_RETENTION_DAYS', 7)),
+                        help='days to keep sent rows')
+    parser.add_argument('--once', action='store_true', help='exit once no due emails remain')
+    args = parser.parse_args()
+
+    worker = EmailWorker(app, args.batch_size, args.concurrency, args.poll_interval, args.lease,
+                         args.max_attempts, args.retry_base, args.retry_max, args.metrics_interval,
+                         args.retention_days)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run(once=args.once)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+import glob
+import gzip
+import json
+import logging
+import os
+import select
+import socket
+import time
+
+from pygelf import gelf
+
+# Record attributes that are part of every LogRecord rather than event data
+_RECORD_ATTRS = set(gelf.SKIP_LIST) | {'stack_info', 'taskName'}
+
+
+class GelfTcpSpoolHandler(logging.Handler):
+    """GELF over one persistent TCP connection, spooling to disk while Graylog is down.
+
+    Frames are null-delimited JSON written in batches (handle_batch is fed
+    by the log shipper thread). If the connection drops, or no connection
+    can be made, frames are appended to a per-process spool file under
+    `spool_dir`, capped at `spool_max_bytes`. Once connected again, that
+    spool is replayed before new frames, together with spools left behind
+    by processes that have since exited. Delivery is at-least-once: a
+    replay cut short is retried from the start of the file.
+
+    Graylog's GELF TCP input only accepts uncompressed frames (compressed
+    bytes can contain the NUL delimiter), so `compress` applies to the
+    spool file, which is then written as gzip members.
+    """
+
+    def __init__(self, host, port, facility, spool_dir, spool_max_bytes=50 * 1024 * 1024,
+                 compress=True, timeout=2.0, reconnect_interval=5.0):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.facility = facility
+        self.spool_dir = spool_dir
+        self.spool_max_bytes = spool_max_bytes
+        self.compress = compress
+        self.timeout = timeout
+        self.reconnect_interval = reconnect_interval
+        self.domain = socket.gethostname()
+        self._sock = None
+        self._next_connect = 0.0
+        self.stats = {'sent': 0, 'spooled': 0, 'replayed': 0, 'spool_dropped': 0, 'reconnects': 0}
+        os.makedirs(spool_dir, exist_ok=True)
+
+    # ---- Encoding ----
+
+    def make_frame(self, record):
+        message = gelf.make(record, self.domain, False, '1.1', {'_facility': self.facility}, None)
+        for key, value in record.__dict__.items():
+            if key in _RECORD_ATTRS or key.startswith('_') or value is None:
+                continue
+            # GELF additional fields must be strings or numbers
+            if not isinstance(value, (str, int, float)):
+                value = json.dumps(value, default=str, separators=(',', ':'))
+            message[f'_{key}'] = value
+        return json.dumps(message, default=gelf.object_to_json, separators=(',', ':')).encode('utf-8') + b'\x00'
+
+    # ---- Connection ----
+
+    def _connect(self):
+        now = time.monotonic()
+        if now < self._next_connect:
+            return False
+        try:
+            self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        except OSError:
+            self._sock = None
+            self._next_connect = now + self.reconnect_interval
+            return False
+        self.stats['reconnects'] += 1
+        return True
+
+    def _peer_closed(self):
+        # Graylog never writes on a GELF TCP connection, so readable means closed.
+        # Checked before each batch: after a Graylog restart the first send on
+        # the old socket would otherwise "succeed" and the batch be lost.
+        try:
+            readable, _, _ = select.select([self._sock], [], [], 0)
+            return bool(readable) and self._sock.recv(1, socket.MSG_PEEK) == b''
+        except (OSError, ValueError):
+            return True
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._next_connect = time.monotonic() + self.reconnect_interval
+
+    # ---- Spool ----
+
+    def _spool_path(self, pid=None):
+        return os.path.join(self.spool_dir, f"gelf-{pid or os.getpid()}.spool")
+
+    def _spool(self, frames):
+        path = self._spool_path()
+        data = b''.join(frames)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size + len(data) > self.spool_max_bytes:
+            self.stats['spool_dropped'] += len(frames)
+            return
+        with open(path, 'ab') as f:
+            f.write(gzip.compress(data) if self.compress else data)
+        self.stats['spooled'] += len(frames)
+
+    def _pending_spools(self):
+        own = self._spool_path()
+        paths = [own] if os.path.exists(own) else []
+        for path in glob.glob(os.path.join(self.spool_dir, 'gelf-*.spool')):
+            if path == own:
+                continue
+            try:
+                pid = int(os.path.basename(path)[5:-6])
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                paths.append(path)  # left behind by a process that has exited
+            except (ValueError, OSError):
+                continue
+        return paths
+
+    def _replay(self):
+        for path in self._pending_spools():
+            # Claim the file first so a sibling process doesn't replay it too
+            claimed = f"{path}.replay-{os.getpid()}"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            with open(claimed, 'rb') as f:
+                raw = f.read()
+            try:
+                data = gzip.decompress(raw) if raw[:2] == b'\x1f\x8b' else raw
+                self._sock.sendall(data)
+            except OSError:
+                os.rename(claimed, path)
+                raise
+            except Exception:
+                # Unreadable spool: keep it aside for inspection rather than retrying forever
+                os.rename(claimed, f"{path}.corrupt")
+                continue
+            os.unlink(claimed)
+            self.stats['replayed'] += data.count(b'\x00')
+
+    # ---- Handler API ----
+
+    def handle_batch(self, records):
+        records = [r for r in records if r.levelno >= self.level]
+        if not records:
+            return
+        frames = []
+        for record in records:
+            try:
+                frames.append(self.make_frame(record))
+            except Exception:
+                self.handleError(record)
+        self.acquire()
+        try:
+            if self._sock is not None and self._peer_closed():
+                self._sock.close()
+                self._sock = None  # reconnect straight away rather than after reconnect_interval
+            if self._sock is None and not self._connect():
+                self._spool(frames)
+                return
+            try:
+                self._replay()
+                self._sock.sendall(b''.join(frames))
+                self.stats['sent'] += len(frames)
+            except OSError:
+                self._disconnect()
+                self._spool(frames)
+        finally:
+            self.release()
+
+    def emit(self, record):
+        self.handle_batch([record])
+
+    def after_fork(self):
+        # The parent's socket must not be shared; reconnect on the next batch
+        self._sock = None
+        self._next_connect = 0.0
+        self.stats = dict.fromkeys(self.stats, 0)
+
+    def get_stats(self):
+        own = self._spool_path()
+        stats = dict(self.stats)
+        stats['connected'] = self._sock is not None
+        stats['spool_bytes'] = os.path.getsize(own) if os.path.exists(own) else 0
+        return stats
+
+    def close(self):
+        self.acquire()
+        try:
+            self._disconnect()
+        finally:
+            self.release()
+        super().close()
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+
+from argon2 import PasswordHasher
+
+
+class HashingBusyError(Exception):
+    """Raised when a password hash cannot be admitted in time"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Password hashing unavailable: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class PasswordHashingExecutor:
+    """Runs Argon2 hash/verify calls under a per-process concurrency cap.
+
+    Each call needs memory_cost KiB of RAM while it runs, so at most
+    `max_concurrency` run at once. Up to `max_queue` more callers wait, each
+    for at most `queue_timeout` seconds; anything beyond that fails fast with
+    HashingBusyError so a login storm turns into quick 503s instead of
+    over-committing memory. argon2-cffi releases the GIL while hashing, so
+    admitted calls run on the caller's thread in parallel.
+    """
+
+    def __init__(self, hasher, max_concurrency=None, max_queue=None, queue_timeout=None):
+        self.hasher = hasher
+        self.max_concurrency = max_concurrency or int(os.getenv('HASH_MAX_CONCURRENCY', 4))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv('HASH_MAX_QUEUE', 32))
+        self.queue_timeout = queue_timeout if queue_timeout is not None else float(os.getenv('HASH_QUEUE_TIMEOUT', 2))
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._waiting = 0
+        self._running = 0
+        self._stats = {
+            'completed': 0,
+            'rejected_queue_full': 0,
+            'rejected_timeout': 0,
+            'queue_wait_seconds_total': 0.0,
+            'queue_wait_seconds_max': 0.0,
+            'hash_seconds_total': 0.0,
+            'hash_seconds_max': 0.0,
+        }
+
+    def _retry_after(self):
+        return max(1, int(self.queue_timeout))
+
+    def _run(self, fn, *args):
+        started = time.monotonic()
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                self._stats['rejected_queue_full'] += 1
+                raise HashingBusyError('queue full', self._retry_after())
+            self._waiting += 1
+        try:
+            admitted = self._slots.acquire(timeout=self.queue_timeout)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        if not admitted:
+            with self._lock:
+                self._stats['rejected_timeout'] += 1
+            raise HashingBusyError('queue timeout', self._retry_after())
+
+        waited = time.monotonic() - started
+        with self._lock:
+            self._running += 1
+        hash_started = time.monotonic()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.monotonic() - hash_started
+            self._slots.release()
+            with self._lock:
+                self._running -= 1
+                self._stats['completed'] += 1
+                self._stats['queue_wait_seconds_total'] += waited
+                self._stats['queue_wait_seconds_max'] = max(self._stats['queue_wait_seconds_max'], waited)
+                self._stats['hash_seconds_total'] += elapsed
+                self._stats['hash_seconds_max'] = max(self._stats['hash_seconds_max'], elapsed)
+
+    def hash(self, password):
+        return self._run(self.hasher.hash, password)
+
+    def verify(self, hashed, password):
+        return self._run(self.hasher.verify, hashed, password)
+
+    def check_needs_rehash(self, hashed):
+        # Only parses the hash string; no need to take a slot
+        return self.hasher.check_needs_rehash(hashed)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['waiting'] = self._waiting
+            stats['running'] = self._running
+        completed = stats['completed']
+        stats['queue_wait_seconds_avg'] = round(stats['queue_wait_seconds_total'] / completed, 4) if completed else 0.0
+        stats['hash_seconds_avg'] = round(stats['hash_seconds_total'] / completed, 4) if completed else 0.0
+        stats['max_concurrency'] = self.max_concurrency
+        stats['max_queue'] = self.max_queue
+        return stats
+
+
+def build_hasher(time_cost=None, memory_cost=None, parallelism=None):
+    """Argon2 hasher from explicit parameters or ARGON2_* settings.
+
+    Pick the values with calibrate_argon2.py. Stored hashes made with other
+    parameters still verify and are upgraded on the next login.
+    """
+    return PasswordHasher(
+        time_cost=time_cost or int(os.getenv('ARGON2_TIME_COST', 3)),  # number of iterations
+        memory_cost=memory_cost or int(os.getenv('ARGON2_MEMORY_COST', 65536)),  # memory usage in kibibytes (64 MB)
+        parallelism=parallelism or int(os.getenv('ARGON2_PARALLELISM', 4)),  # number of threads
+        hash_len=32,  # length of the hash
+        salt_len=16  # length of random salt
+    )
+
+
+password_hasher = PasswordHashingExecutor(build_hasher())
@@ -1,32 +1,17 @@
-import mysql.connector
+from db import get_db_connection
 from flask import (
     current_app
 )
 import datetime
+from reference_data import CATEGORY_ICONS, DEFAULT_CATEGORY_ICON
+from cache import report_details
 
-CATEGORY_ICONS = {
-    "Fires": "fa-solid fa-fire category-fires",
-    "Faulty Facilities/Equipment": "fa-solid fa-screwdriver-wrench category-faulty",
-    "Vandalism": "fa-solid fa-spray-can category-vandalism",
-    "Suspicious Activity": "fa-solid fa-user-secret category-suspicious",
-    "Others": "fa-solid fa-question-circle category-others"
-}
-
-def get_db_connection():
-    cfg = current_app.config
-    return mysql.connector.connect(
-        host=cfg['MYSQL_HOST'],
-        user=cfg['MYSQL_USER'],
-        password=cfg['MYSQL_PASSWORD'],
-        database=cfg['MYSQL_DB'],
-    )
-
-def get_report_by_id(report_id):
+def _load_report(report_id):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
         query = """
-        SELECT r.report_id, s.name AS status_name, r.category_name, r.is_anonymous, r.title, r.description, r.created_at 
+        SELECT r.*, s.name AS status_name
             FROM reports r
             JOIN status s ON r.status_id = s.status_id
             WHERE r.report_id = %s
@@ -35,15 +20,19 @@ def get_report_by_id(report_id):
         report = cursor.fetchone()
         # Convert string to datetime object
         if report and isinstance(report['created_at'], str):
-            report['created_at'] = datetime.strptime(report['created_at'], "%Y-%m-%d %H:%M:%S")
-        
-        report['category_icon'] = CATEGORY_ICONS.get(report['category_name'], "fa-solid fa-tag")
-        
+            report['created_at'] = datetime.datetime.strptime(report['created_at'], "%Y-%m-%d %H:%M:%S")
         return report
     finally:
         cursor.close()
         conn.close()
 
+def get_report_by_id(report_id):
+    """The report row with its status name (a copy from report_details), or None"""
+    report = report_details.get(report_id, _load_report)
+    if report:
+        report['category_icon'] = CATEGORY_ICONS.get(report['category_name'], DEFAULT_CATEGORY_ICON)
+    return report
+
 def get_report_attachments(report_id):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
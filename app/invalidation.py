@@ -0,0 +1,187 @@
+import struct
+import threading
+import zlib
+
+from shared_file import SUPPORTED, FileLock, instance_file, open_shared_map
+
+SLOTS = 512
+KEY_BUCKETS = 4096
+_COUNTER = struct.Struct('<Q')
+_SIZE = (SLOTS + KEY_BUCKETS) * _COUNTER.size
+
+
+def key_bucket(channel, key):
+    """Bucket that publish(channel, key) bumps; caches map their own keys with it"""
+    return zlib.crc32(f"{channel}:{key}".encode()) % KEY_BUCKETS
+
+
+class InvalidationBus:
+    """Cross-worker cache invalidation through shared generation counters.
+
+    Each channel (e.g. 'report_listings') maps to a 64-bit counter in a
+    small memory-mapped file that every worker process on the host opens.
+    publish() increments the channel's counter and drops this process's
+    entries straight away; every other worker notices the new generation
+    on its next request (poll() runs in before_request) and drops its own.
+    Reads are a struct unpack from shared memory, so polling costs next to
+    nothing; increments take a file lock. Channels hash to slots, so an
+    unlucky collision only means an extra invalidation.
+
+    publish(channel, key) also bumps one of KEY_BUCKETS per-key counters.
+    Handlers registered with register_keyed() then get the set of changed
+    buckets and drop only the entries whose key_bucket() is in it, instead
+    of everything on the channel; the bucket array is only compared when
+    the channel's own counter has moved. Buckets are shared by all
+    channels, so a keyed handler can be told about a few buckets another
+    channel bumped, which again only costs extra invalidations.
+
+    The counters are process-local until open() maps the shared file;
+    init_app() does that with INVALIDATION_BUS_PATH, or a file in the app's
+    instance folder, so all workers of one deployment must share either.
+    Without fcntl (Windows) the counters stay process-local.
+    """
+
+    def __init__(self):
+        self.path = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # fcntl locks don't exclude this process's own threads
+        self._handlers = {}
+        self._keyed_handlers = {}
+        self._seen = {}
+        self._seen_buckets = {}
+        self._seen_full = {}
+        self._stats = {'published': 0, 'received': 0}
+        self._file = None
+        self._map = bytearray(_SIZE)
+        self._buckets = memoryview(self._map)[SLOTS * _COUNTER.size:].cast('Q')
+
+    def open(self, path):
+        """Switch to the counter file at path, shared with the other workers"""
+        # MAP_SHARED, so forked workers and separately started ones see the same pages
+        file, shared = open_shared_map(path, _SIZE)
+        with self._lock:
+            with self._write_lock:
+                self.path = path
+                self._file, self._map = file, shared
+                self._buckets = memoryview(shared)[SLOTS * _COUNTER.size:].cast('Q')
+            # What registered so far saw was the local counters; start from the shared ones
+            for channel in self._seen:
+                if channel in self._keyed_handlers:
+                    self._seen[channel], self._seen_full[channel], self._seen_buckets[channel] = \
+                        self._read_keyed(channel)
+                else:
+                    self._seen[channel] = self.generation(channel)
+
+    def _locked(self):
+        return FileLock(self._write_lock, self._file)
+
+    @staticmethod
+    def _offset(channel):
+        return (zlib.crc32(channel.encode()) % SLOTS) * _COUNTER.size
+
+    def generation(self, channel):
+        return _COUNTER.unpack_from(self._map, self._offset(channel))[0]
+
+    def _full_generation(self, channel):
+        # Counts only channel-wide publishes, which keyed handlers can't narrow down
+        return _COUNTER.unpack_from(self._map, self._offset(channel + ':*'))[0]
+
+    def register(self, channel, on_change):
+        """Call on_change() in this process whenever any worker publishes to channel"""
+        with self._lock:
+            self._handlers.setdefault(channel, []).append(on_change)
+            self._seen[channel] = self.generation(channel)
+
+    def register_keyed(self, channel, on_change):
+        """Call on_change(buckets) on every publish to channel: the set of changed
+        key buckets, or None when the whole channel was invalidated"""
+        with self._lock:
+            self._keyed_handlers.setdefault(channel, []).append(on_change)
+            self._seen[channel], self._seen_full[channel], self._seen_buckets[channel] = self._read_keyed(channel)
+
+    def publish(self, channel, key=None, local=True):
+        """Invalidate channel (or just key on it) in every worker; this one
+        immediately, unless local is False (the caller updated its own copy)"""
+        offset = self._offset(channel)
+        bucket = None if key is None else key_bucket(channel, key)
+        with self._locked():
+            # Bucket first: a poll that sees the new channel generation also sees the bucket
+            if bucket is not None:
+                self._buckets[bucket] += 1
+                counted = self._buckets[bucket]
+            else:
+                full_offset = self._offset(channel + ':*')
+                counted = _COUNTER.unpack_from(self._map, full_offset)[0] + 1
+                _COUNTER.pack_into(self._map, full_offset, counted)
+            generation = _COUNTER.unpack_from(self._map, offset)[0] + 1
+            _COUNTER.pack_into(self._map, offset, generation)
+        with self._lock:
+            self._stats['published'] += 1
+            seen_buckets = self._seen_buckets.get(channel)
+            # Only skip our own publish in the next poll when nobody else published in between
+            if channel in self._seen and self._seen[channel] != generation - 1:
+                seen_buckets = None
+            elif channel in self._seen:
+                self._seen[channel] = generation
+            if seen_buckets is not None:
+                if bucket is None:
+                    self._seen_full[channel] = counted
+                else:
+                    seen_buckets[bucket] = counted
+            if not local:
+                return
+            handlers = list(self._handlers.get(channel, ()))
+            keyed_handlers = list(self._keyed_handlers.get(channel, ()))
+        changed = None if bucket is None else {bucket}
+        for handler in handlers:
+            handler()
+        for handler in keyed_handlers:
+            handler(changed)
+
+    def _read_keyed(self, channel):
+        with self._locked():
+            return self.generation(channel), self._full_generation(channel), self._buckets.tolist()
+
+    def poll(self):
+        """Run the handlers of every channel another worker has published to since the last poll"""
+        calls = []
+        with self._lock:
+            for channel, seen in self._seen.items():
+                generation = self.generation(channel)
+                if generation == seen:
+                    continue
+                keyed_handlers = self._keyed_handlers.get(channel)
+                if keyed_handlers:
+                    # Read the counters as of one publish boundary, or a bucket
+                    # bumped between the reads could be skipped for good
+                    generation, full, current = self._read_keyed(channel)
+                self._seen[channel] = generation
+                self._stats['received'] += 1
+                calls.extend((handler, ()) for handler in self._handlers.get(channel, ()))
+                if keyed_handlers:
+                    previous = self._seen_buckets[channel]
+                    self._seen_buckets[channel] = current
+                    if full != self._seen_full[channel]:
+                        self._seen_full[channel] = full
+                        buckets = None
+                    else:
+                        # May include other channels' buckets; that only drops a few extra entries
+                        buckets = {i for i, (old, new) in enumerate(zip(previous, current)) if old != new}
+                    calls.extend((handler, (buckets,)) for handler in keyed_handlers)
+        for handler, args in calls:
+            handler(*args)
+
+    def init_app(self, app):
+        if SUPPORTED:
+            self.open(instance_file(app, 'INVALIDATION_BUS_PATH', 'cache-generations'))
+        app.before_request(self.poll)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['generations'] = dict(self._seen)
+        stats['shared'] = self._file is not None
+        return stats
+
+
+invalidation_bus = InvalidationBus()
@@ -1,48 +1,308 @@
+import atexit
+import copy
 import logging
 import os
+import random
+import threading
+import time
+from collections import deque
+from logging.handlers import QueueHandler
 from pygelf import GelfUdpHandler
-import socket
-from datetime import datetime
-import re
+
+from gelf_transport import GelfTcpSpoolHandler
 
 # Global variable to store the Graylog handler
 _graylog_handler = None
+# Background pipeline feeding the Graylog handler (see setup_graylog_logging)
+_log_queue = None
+_log_listener = None
+
+
+class RingBufferQueue:
+    """Bounded log record buffer that drops the oldest record when full.
+
+    Logging must never block a request, so a burst that outruns the shipper
+    costs the oldest unsent records rather than request latency; every loss
+    is counted in `dropped`.
+    """
+
+    def __init__(self, maxsize):
+        self._records = deque(maxlen=maxsize)
+        self._ready = threading.Condition(threading.Lock())
+        self.enqueued = 0
+        self.dropped = 0
+
+    def put_nowait(self, record):
+        with self._ready:
+            if len(self._records) == self._records.maxlen:
+                self.dropped += 1
+            self._records.append(record)
+            self.enqueued += 1
+            self._ready.notify()
+
+    def get_batch(self, max_records, linger):
+        """Wait for a record, then up to `linger` seconds more to fill a batch"""
+        with self._ready:
+            while not self._records:
+                self._ready.wait()
+            deadline = time.monotonic() + linger
+            while len(self._records) < max_records:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._ready.wait(remaining):
+                    break
+            count = min(max_records, len(self._records))
+            return [self._records.popleft() for _ in range(count)]
+
+    def __len__(self):
+        return len(self._records)
+
+    def reset_lock(self):
+        # After a fork the lock may still be held by the parent's shipper thread
+        self._ready = threading.Condition(threading.Lock())
+
+
+class LogQueueHandler(QueueHandler):
+    """QueueHandler that keeps tracebacks in exc_text for the GELF full_message"""
+
+    _exc_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        # Resolve everything that is not safe to read on another thread later
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class BatchingQueueListener:
+    """Ships queued records to the real handlers from one background thread.
+
+    Records are taken in batches of up to `batch_size`, waiting at most
+    `flush_interval` seconds for a batch to fill. Handlers that implement
+    handle_batch(records) receive the whole batch at once.
+    """
+
+    _STOP = object()
+
+    def __init__(self, queue, handlers, batch_size=100, flush_interval=0.5):
+        self.queue = queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.shipped = 0
+        self.batches = 0
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='log-shipper', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = self.queue.get_batch(self.batch_size, self.flush_interval)
+            stop = self._STOP in batch
+            records = [r for r in batch if r is not self._STOP]
+            for handler in self.handlers:
+                try:
+                    if hasattr(handler, 'handle_batch'):
+                        handler.handle_batch(records)
+                    else:
+                        for record in records:
+                            if record.levelno >= handler.level:
+                                handler.handle(record)
+                except Exception:
+                    # Never let a broken transport kill the shipper thread
+                    pass
+            self.shipped += len(records)
+            self.batches += 1
+            if stop:
+                return
+
+    def stop(self, timeout=5):
+        """Flush what is queued and stop the thread"""
+        if self._thread is not None and self._thread.is_alive():
+            self.queue.put_nowait(self._STOP)
+            self._thread.join(timeout)
+
+
+# Control characters (incl. CR/LF) are stripped from logged values to prevent
+# log injection. str.translate with a prebuilt table beats a regex per value.
+_CONTROL_CHARS = dict.fromkeys([*range(0x00, 0x20), *range(0x7f, 0xa0)])
+
+# Values that cannot carry control characters are logged as-is
+_SAFE_TYPES = (int, float, bool)
+
+_VALID_LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+    'critical': logging.CRITICAL,
+}
+
+# Default sampling for high-volume INFO events: event_type -> (sample rate,
+# max kept per second). Security events and anything at WARNING or above
+# are never sampled. Override with LOG_SAMPLE_RULES.
+DEFAULT_SAMPLE_RULES = {
+    'request_received': (0.1, 50),
+    'index_accessed': (0.25, 20),
+    'report_viewed': (0.25, 20),
+    'file_served': (0.1, 20),
+    'report_page_accessed': (0.25, 20),
+    'profile_accessed': (0.25, 20),
+    'settings_accessed': (0.25, 20),
+    'login_page_accessed': (0.25, 20),
+    'register_page_accessed': (0.25, 20),
+    'api_report_details_accessed': (0.25, 20),
+    'api_report_details_success': (0.25, 20),
+    'user_reports_query': (0.25, 20),
+}
+
+_security_logger = logging.getLogger("security")
+_application_logger = logging.getLogger("application")
+_database_logger = logging.getLogger("database")
+
+
+class EventSampler:
+    """Per-event-type sampling with a token-bucket cap on top.
+
+    An event type with rule (rate, per_second) is kept with probability
+    `rate`, and at most `per_second` kept events per second are let through
+    (bursts up to the same number). Event types without a rule are always
+    kept. Dropped events are counted per type, and the counts are taken
+    every `report_interval` seconds so they can be logged as one summary
+    event; together with the sample_rate field on kept events this lets
+    dashboards reconstruct the real volumes.
+    """
+
+    def __init__(self, rules, report_interval=60):
+        self.rules = rules
+        self.report_interval = report_interval
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._suppressed = {}
+        self._next_report = time.monotonic() + report_interval
+
+    def allow(self, event_type):
+        rule = self.rules.get(event_type)
+        if rule is None:
+            return True
+        rate, per_second = rule
+        if rate < 1 and random.random() >= rate:
+            self._suppress(event_type, 'sampled')
+            return False
+        if per_second:
+            now = time.monotonic()
+            with self._lock:
+                tokens, last = self._buckets.get(event_type, (per_second, now))
+                tokens = min(per_second, tokens + (now - last) * per_second)
+                allowed = tokens >= 1
+                self._buckets[event_type] = (tokens - 1 if allowed else tokens, now)
+            if not allowed:
+                self._suppress(event_type, 'rate_limited')
+                return False
+        return True
+
+    def _suppress(self, event_type, reason):
+        with self._lock:
+            counts = self._suppressed.setdefault(event_type, {'sampled': 0, 'rate_limited': 0})
+            counts[reason] += 1
+
+    def take_report(self):
+        """Return and reset suppressed counts once per report interval, else None"""
+        now = time.monotonic()
+        if now < self._next_report:
+            return None
+        with self._lock:
+            if now < self._next_report:
+                return None
+            self._next_report = now + self.report_interval
+            suppressed, self._suppressed = self._suppressed, {}
+        return suppressed or None
+
+
+def parse_sample_rules(spec, defaults=DEFAULT_SAMPLE_RULES):
+    """Parse LOG_SAMPLE_RULES, e.g. "request_received=0.05:100,file_served=1:0".
+
+    Each entry is event_type=rate[:per_second]; a per_second of 0 means no
+    cap. Entries override the defaults; malformed entries are ignored.
+    """
+    rules = dict(defaults)
+    for entry in filter(None, (part.strip() for part in (spec or '').split(','))):
+        try:
+            event_type, value = entry.split('=', 1)
+            rate, _, per_second = value.partition(':')
+            rules[event_type.strip()] = (float(rate), float(per_second) if per_second else 0)
+        except ValueError:
+            continue
+    return rules
+
+
+_sampler = None if os.getenv('LOG_SAMPLING', 'on').lower() == 'off' else EventSampler(
+    parse_sample_rules(os.getenv('LOG_SAMPLE_RULES')),
+    report_interval=float(os.getenv('LOG_SAMPLE_REPORT_INTERVAL', 60)),
+)
+
+
+def _sampled_out(event_type, levelno):
+    """True if this INFO/DEBUG event should be dropped by the sampler"""
+    if _sampler is None or levelno >= logging.WARNING:
+        return False
+    report = _sampler.take_report()
+    if report:
+        _application_logger.info("Application event: %s", "log_events_suppressed", extra={
+            'event_type': "log_events_suppressed",
+            'user_id': None,
+            'details': {'interval_seconds': _sampler.report_interval, 'suppressed': report},
+        })
+    return not _sampler.allow(event_type)
+
+
+def _sample_rate(event_type):
+    rule = _sampler.rules.get(event_type) if _sampler else None
+    return rule[0] if rule else 1.0
 
 
 def sanitize_log_input(value):
     """Sanitize input to prevent log injection attacks"""
     if value is None:
         return None
-    
-    # Convert to string if not already
-    value_str = str(value)
-    
-    # Remove or escape potentially dangerous characters
-    # Remove newlines, carriage returns, and other control characters
-    value_str = re.sub(r'[\r\n\t\x00-\x1f\x7f-\x9f]', '', value_str)
-    
-    return value_str
+    if not isinstance(value, str):
+        value = str(value)
+    return value.translate(_CONTROL_CHARS)
 
 
 def sanitize_dict(data, sanitize_keys=False):
     """Recursively sanitize all string values in a dictionary"""
-    if data is None:
-        return None
-    
+    if data is None or isinstance(data, _SAFE_TYPES):
+        return data
+    if isinstance(data, str):
+        return data.translate(_CONTROL_CHARS)
     if isinstance(data, dict):
-        result = {}
-        for key, value in data.items():
-            # Sanitize keys if requested (for untrusted dictionary keys)
-            safe_key = sanitize_log_input(str(key)) if sanitize_keys else key
-            result[safe_key] = sanitize_dict(value, sanitize_keys)
-        return result
-    elif isinstance(data, list):
+        if sanitize_keys:
+            return {sanitize_log_input(key): sanitize_dict(value, True) for key, value in data.items()}
+        return {key: sanitize_dict(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
         return [sanitize_dict(item, sanitize_keys) for item in data]
-    elif isinstance(data, str):
-        return sanitize_log_input(data)
-    else:
-        # For non-string types (int, float, bool, etc.), convert to string and sanitize
-        return sanitize_log_input(str(data))
+    return sanitize_log_input(data)
+
+
+def _request_fields(request):
+    """Sanitized request attributes for security events"""
+    try:
+        return {
+            'ip_address': sanitize_log_input(request.remote_addr) if request.remote_addr else None,
+            'user_agent': sanitize_log_input(request.headers.get('User-Agent', '')),
+            'method': request.method,
+            'path': sanitize_log_input(request.path) if request.path else None,
+            'referrer': sanitize_log_input(request.referrer) if request.referrer else None,
+        }
+    except Exception:
+        # If any exception occurs while accessing request attributes, use safe defaults
+        return {'error': 'Failed to parse request data'}
 
 
 def setup_graylog_logging(app):
@@ -52,31 +312,45 @@ def setup_graylog_logging(app):
     # Get Graylog configuration from environment
     graylog_host = os.getenv('GRAYLOG_HOST', 'localhost')
     graylog_port = int(os.getenv('GRAYLOG_PORT', 12201))
+    graylog_transport = os.getenv('GRAYLOG_TRANSPORT', 'udp').lower()
     app_name = os.getenv('APP_NAME', 'SITSecure')
 
     try:
         # Create Graylog handler
-        _graylog_handler = GelfUdpHandler(
-            host=graylog_host,
-            port=graylog_port,
-            facility=app_name,
-            version='1.1'
-        )
+        if graylog_transport == 'tcp':
+            _graylog_handler = GelfTcpSpoolHandler(
+                host=graylog_host,
+                port=graylog_port,
+                facility=app_name,
+                spool_dir=os.getenv('GRAYLOG_SPOOL_DIR', os.path.join(os.path.dirname(__file__), 'log_spool')),
+                spool_max_bytes=int(os.getenv('GRAYLOG_SPOOL_MAX_MB', 50)) * 1024 * 1024,
+                compress=os.getenv('GRAYLOG_SPOOL_COMPRESS', 'on').lower() != 'off',
+            )
+        else:
+            _graylog_handler = GelfUdpHandler(
+                host=graylog_host,
+                port=graylog_port,
+                facility=app_name,
+                version='1.1'
+            )
+
+        # Loggers only enqueue; a background thread ships to Graylog in batches
+        queue_handler = _start_log_pipeline([_graylog_handler])
 
         # Configure Flask app logger
         app.logger.setLevel(logging.INFO)
-        app.logger.addHandler(_graylog_handler)
+        app.logger.addHandler(queue_handler)
 
         # Configure root logger to also send to Graylog
         root_logger = logging.getLogger()
         root_logger.setLevel(logging.INFO)
-        root_logger.addHandler(_graylog_handler)
+        root_logger.addHandler(queue_handler)
 
         # Configure specific loggers for security, application, database
         for logger_name in ['security', 'application', 'database']:
             logger = logging.getLogger(logger_name)
             logger.setLevel(logging.INFO)
-            logger.addHandler(_graylog_handler)
+            logger.addHandler(queue_handler)
             # Prevent duplicate messages
             logger.propagate = False
 
@@ -103,7 +377,7 @@ def setup_graylog_logging(app):
             'facility': app_name
         })
 
-        print(f"Graylog logging configured - {graylog_host}:{graylog_port}")
+        print(f"Graylog logging configured - {graylog_host}:{graylog_port} ({graylog_transport})")
 
     except Exception as e:
         print(f"Failed to configure Graylog logging: {e}")
@@ -118,58 +392,72 @@ def setup_graylog_logging(app):
         app.logger.addHandler(console_handler)
 
 
-def log_security_event(event_type, user_id=None, details=None, request=None):
-    """Log security events with standardized format"""
-    logger = logging.getLogger("security")
+def _start_log_pipeline(handlers):
+    """Start the ring buffer + shipper thread and return the handler loggers use"""
+    global _log_queue, _log_listener
 
-    # Sanitize all user-provided inputs
-    safe_event_type = sanitize_log_input(event_type)
-    safe_user_id = sanitize_log_input(user_id) if user_id else None
-    # Sanitize both keys and values for user-provided details
-    safe_details = sanitize_dict(details, sanitize_keys=True) if details else {}
-
-    log_data = {
-        "event_type": safe_event_type,
-        "timestamp": datetime.now().isoformat(),
-        "user_id": safe_user_id,
-        "details": safe_details,
-        "hostname": socket.gethostname()
+    _log_queue = RingBufferQueue(int(os.getenv('LOG_QUEUE_SIZE', 10000)))
+    _log_listener = BatchingQueueListener(
+        _log_queue, handlers,
+        batch_size=int(os.getenv('LOG_BATCH_SIZE', 100)),
+        flush_interval=float(os.getenv('LOG_FLUSH_INTERVAL', 0.5)),
+    )
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+    return LogQueueHandler(_log_queue)
+
+
+def _restart_log_listener():
+    # The shipper thread does not survive a fork (e.g. gunicorn --preload)
+    global _log_listener
+    if _log_listener is not None:
+        _log_queue.reset_lock()
+        for handler in _log_listener.handlers:
+            if hasattr(handler, 'after_fork'):
+                handler.after_fork()
+        _log_listener = BatchingQueueListener(_log_queue, _log_listener.handlers,
+                                              _log_listener.batch_size, _log_listener.flush_interval)
+        _log_listener.start()
+        atexit.register(_log_listener.stop)
+
+
+os.register_at_fork(after_in_child=_restart_log_listener)
+
+
+def get_logging_stats():
+    """Log pipeline counters for /health"""
+    if _log_queue is None:
+        return None
+    stats = {
+        'queued': len(_log_queue),
+        'enqueued': _log_queue.enqueued,
+        'dropped': _log_queue.dropped,
+        'shipped': _log_listener.shipped,
+        'batches': _log_listener.batches,
     }
+    if isinstance(_graylog_handler, GelfTcpSpoolHandler):
+        stats['transport'] = _graylog_handler.get_stats()
+    return stats
 
-    # Build safe request data if request is available
-    safe_request_data = {}
-    if request:
-        # Sanitize request data - be extra careful with request attributes
-        try:
-            safe_request_data = {
-                'ip_address': sanitize_log_input(str(request.remote_addr)) if hasattr(request, 'remote_addr') and request.remote_addr else None,
-                'user_agent': sanitize_log_input(str(request.headers.get('User-Agent', ''))) if hasattr(request, 'headers') else None,
-                'method': sanitize_log_input(str(request.method)) if hasattr(request, 'method') and request.method else None,
-                'path': sanitize_log_input(str(request.path)) if hasattr(request, 'path') and request.path else None,
-                'referrer': sanitize_log_input(str(request.referrer)) if hasattr(request, 'referrer') and request.referrer else None
-            }
-        except Exception:
-            # If any exception occurs while accessing request attributes, use safe defaults
-            safe_request_data = {'error': 'Failed to parse request data'}
-        
-        log_data.update({
-            "ip_address": safe_request_data.get('ip_address'),
-            "user_agent": safe_request_data.get('user_agent'),
-            "method": safe_request_data.get('method'),
-            "path": safe_request_data.get('path'),
-            "referrer": safe_request_data.get('referrer')
-        })
 
-    # Create extra dict with only safe, sanitized data
+def log_security_event(event_type, user_id=None, details=None, request=None):
+    """Log security events with standardized format (never sampled)"""
+    logger = _security_logger
+    # Nothing below is worth building if the record would be discarded
+    if not logger.isEnabledFor(logging.INFO):
+        return
+
+    # Sanitize all user-provided inputs
+    safe_event_type = sanitize_log_input(event_type)
     extra_data = {
         'event_type': safe_event_type,
-        'user_id': safe_user_id,
-        'details': safe_details
+        'user_id': sanitize_log_input(user_id) if user_id else None,
+        # Sanitize both keys and values for user-provided details
+        'details': sanitize_dict(details, sanitize_keys=True) if details else {},
     }
-    
     # Only add request_data if we have a request
     if request:
-        extra_data['request_data'] = safe_request_data
+        extra_data['request_data'] = _request_fields(request)
 
     # Log with extra fields for Graylog - use parameterized logging
     logger.info("Security event: %s", safe_event_type, extra=extra_data)
@@ -177,59 +465,34 @@ def log_security_event(event_type, user_id=None, details=None, request=None):
 
 def log_application_event(event_type, level="info", details=None, user_id=None):
     """Log application events with standardized format"""
-    logger = logging.getLogger("application")
-
-    # Sanitize all user-provided inputs
-    safe_event_type = sanitize_log_input(event_type)
-    safe_user_id = sanitize_log_input(user_id) if user_id else None
-    # Sanitize both keys and values for user-provided details
-    safe_details = sanitize_dict(details, sanitize_keys=True) if details else {}
-
-    log_data = {
-        "event_type": safe_event_type,
-        "timestamp": datetime.now().isoformat(),
-        "user_id": safe_user_id,
-        "details": safe_details,
-        "hostname": socket.gethostname()
-    }
-
+    logger = _application_logger
     # Validate log level to prevent injection through level parameter
-    valid_levels = ['debug', 'info', 'warning', 'error', 'critical']
-    safe_level = level.lower() if level and level.lower() in valid_levels else 'info'
-    log_method = getattr(logger, safe_level, logger.info)
+    levelno = _VALID_LEVELS.get(level.lower() if isinstance(level, str) else level, logging.INFO)
+    if not logger.isEnabledFor(levelno) or _sampled_out(event_type, levelno):
+        return
 
+    safe_event_type = sanitize_log_input(event_type)
     # Log with extra fields for Graylog - use parameterized logging
-    log_method("Application event: %s", safe_event_type, extra={
+    logger.log(levelno, "Application event: %s", safe_event_type, extra={
         'event_type': safe_event_type,
-        'user_id': safe_user_id,
-        'details': safe_details
+        'user_id': sanitize_log_input(user_id) if user_id else None,
+        'details': sanitize_dict(details, sanitize_keys=True) if details else {},
+        'sample_rate': _sample_rate(event_type) if levelno < logging.WARNING else 1.0
     })
 
 
 def log_database_event(event_type, table=None, user_id=None, details=None):
     """Log database events with standardized format"""
-    logger = logging.getLogger("database")
+    logger = _database_logger
+    if not logger.isEnabledFor(logging.INFO) or _sampled_out(event_type, logging.INFO):
+        return
 
-    # Sanitize all user-provided inputs
     safe_event_type = sanitize_log_input(event_type)
-    safe_table = sanitize_log_input(table) if table else None
-    safe_user_id = sanitize_log_input(user_id) if user_id else None
-    # Sanitize both keys and values for user-provided details
-    safe_details = sanitize_dict(details, sanitize_keys=True) if details else {}
-
-    log_data = {
-        "event_type": safe_event_type,
-        "timestamp": datetime.now().isoformat(),
-        "table": safe_table,
-        "user_id": safe_user_id,
-        "details": safe_details,
-        "hostname": socket.gethostname()
-    }
-
     # Log with extra fields for Graylog using parameterized logging
     logger.info("Database event: %s", safe_event_type, extra={
         'event_type': safe_event_type,
-        'table': safe_table,
-        'user_id': safe_user_id,
-        'details': safe_details
-    })
\ No newline at end of file
+        'table': sanitize_log_input(table) if table else None,
+        'user_id': sanitize_log_input(user_id) if user_id else None,
+        'details': sanitize_dict(details, sanitize_keys=True) if details else {},
+        'sample_rate': _sample_rate(event_type)
+    })
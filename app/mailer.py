@@ -0,0 +1,234 @@
+import atexit
+import os
+import smtplib
+import threading
+import time
+
+from flask import current_app
+
+# Errors after which a session is assumed dead and the send is retried once
+# on a fresh connection
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+
+class SMTPPoolExhaustedError(smtplib.SMTPException):
+    """Raised when no SMTP session frees up within the pool timeout"""
+
+
+class SMTPPool:
+    """Authenticated SMTP sessions kept open and reused across messages.
+
+    Opening a session costs a TCP connect, STARTTLS and LOGIN, which dwarfs
+    sending one message, so sessions go back to the pool after each send.
+    A session idle for longer than `noop_interval` seconds is checked with
+    NOOP before reuse; one that has sent `max_messages` messages or is older
+    than `max_age` seconds is retired. At most `size` sessions are open at
+    once per process.
+    """
+
+    def __init__(self, host, port, username=None, password=None, starttls=True, size=4,
+                 timeout=30, noop_interval=30, max_age=300, max_messages=100):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.size = size
+        self.timeout = timeout
+        self.noop_interval = noop_interval
+        self.max_age = max_age
+        self.max_messages = max_messages
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # Called on init and after a fork: a TLS session must never be shared
+        # between processes
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._pid = os.getpid()
+        self._stats = {
+            'sessions_opened': 0,
+            'sessions_closed': 0,
+            'messages_sent': 0,
+            'send_failures': 0,
+            'reconnects': 0,
+            'noop_failures': 0,
+        }
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.ehlo()
+            if self.starttls:
+                server.starttls()
+                server.ehlo()
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._count('sessions_opened')
+        # (session, opened_at, last_used, messages_sent)
+        return [server, time.monotonic(), time.monotonic(), 0]
+
+    def _discard(self, session):
+        try:
+            session[0].quit()
+        except Exception:
+            session[0].close()
+        self._count('sessions_closed')
+
+    def _healthy(self, session):
+        now = time.monotonic()
+        if now - session[1] > self.max_age or session[3] >= self.max_messages:
+            return False
+        if now - session[2] > self.noop_interval:
+            try:
+                if session[0].noop()[0] != 250:
+                    raise smtplib.SMTPServerDisconnected("NOOP rejected")
+            except Exception:
+                self._count('noop_failures')
+                return False
+        return True
+
+    def _acquire(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+        if not self._slots.acquire(timeout=self.timeout):
+            raise SMTPPoolExhaustedError(f"No SMTP session to {self.host} freed up within {self.timeout}s")
+
+    def _take_session(self):
+        while True:
+            with self._lock:
+                session = self._idle.pop() if self._idle else None
+            if session is None:
+                return self._connect()
+            if self._healthy(session):
+                return session
+            self._discard(session)
+
+    def _release(self, session):
+        if session is not None:
+            if session[3] >= self.max_messages:
+                self._discard(session)
+            else:
+                session[2] = time.monotonic()
+                with self._lock:
+                    self._idle.append(session)
+        self._slots.release()
+
+    def send_many(self, messages):
+        """Send messages over as few sessions as possible.
+
+        Returns one entry per message: None when it was accepted, otherwise
+        the exception. A dropped session is replaced and the message retried
+        once; a message the server rejects is not retried.
+        """
+        results = []
+        self._acquire()
+        session = None
+        try:
+            for msg in messages:
+                error = None
+                for _ in range(2):
+                    try:
+                        if session is None:
+                            session = self._take_session()
+                        session[0].send_message(msg)
+                        session[3] += 1
+                        error = None
+                        break
+                    except RECONNECT_ERRORS as e:
+                        error = e
+                        if session is not None:
+                            self._discard(session)
+                            session = None
+                            self._count('reconnects')
+                    except Exception as e:
+                        error = e
+                        if isinstance(e, smtplib.SMTPResponseException) and e.smtp_code == 421:
+                            # Server is closing the session; the next message gets a fresh one
+                            self._discard(session)
+                            session = None
+                        break
+
+                results.append(error)
+                if error is not None:
+                    self._count('send_failures')
+                    continue
+                self._count('messages_sent')
+                if session[3] >= self.max_messages:
+                    self._discard(session)
+                    session = None
+        finally:
+            self._release(session)
+        return results
+
+    def send(self, msg):
+        error = self.send_many([msg])[0]
+        if error is not None:
+            raise error
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for session in idle:
+            self._discard(session)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+        stats['size'] = self.size
+        return stats
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_smtp_pool(host, port, username=None, password=None, starttls=True, **options):
+    """Return the process-wide pool for one server and set of credentials"""
+    key = (host, port, username, password, starttls)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = SMTPPool(host, port, username, password, starttls, **options)
+    return pool
+
+
+def app_smtp_pool():
+    """Pool for the notification sender configured on the current app"""
+    cfg = current_app.config
+    return get_smtp_pool(
+        cfg['SMTP_SERVER'], cfg['SMTP_PORT'], cfg['SENDER_EMAIL'], cfg['SENDER_PASSWORD'],
+        starttls=cfg.get('SMTP_STARTTLS', True),
+        size=cfg.get('SMTP_POOL_SIZE', 4),
+        timeout=cfg.get('SMTP_TIMEOUT', 30),
+        noop_interval=cfg.get('SMTP_NOOP_INTERVAL', 30),
+        max_age=cfg.get('SMTP_SESSION_MAX_AGE', 300),
+        max_messages=cfg.get('SMTP_SESSION_MAX_MESSAGES', 100),
+    )
+
+
+def smtp_pool_stats():
+    with _pools_lock:
+        pools = list(_pools.items())
+    return [{'server': f"{key[0]}:{key[1]}", **pool.stats()} for key, pool in pools]
+
+
+@atexit.register
+def close_all():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
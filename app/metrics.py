@@ -0,0 +1,287 @@
+import atexit
+import bisect
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+
+from flask import g, request
+
+# Request latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = registry._lock
+        self._values = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        with self._lock:
+            return {json.dumps(key): value for key, value in self._values.items()}
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Point-in-time value.
+
+    Across processes, mode 'sum' adds the live processes' values together,
+    mode 'all' keeps one series per process with a `pid` label, and mode
+    'local' only reports the value held by the process serving the scrape
+    (for values read from shared state such as a database table).
+    """
+    kind = 'gauge'
+
+    def __init__(self, registry, name, documentation, labelnames=(), mode='all'):
+        super().__init__(registry, name, documentation, labelnames)
+        self.mode = mode
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; each series is [bucket counts..., +Inf count, sum]"""
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+
+class MetricsRegistry:
+    """In-process metrics with Prometheus text exposition.
+
+    Updates are a dict write under one lock. With a `multiproc_dir` (one
+    per host, shared by all gunicorn workers) each process writes its
+    snapshot there as metrics-<pid>.json at most every `flush_interval`
+    seconds, and render() merges every snapshot: counters and histograms
+    are summed, including those of exited processes so totals never go
+    backwards, while gauges only count processes that are still alive.
+    Clear the directory when the app is redeployed.
+    """
+
+    def __init__(self, multiproc_dir=None, flush_interval=1.0):
+        self.multiproc_dir = multiproc_dir
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = []
+        self._last_flush = 0.0
+        if multiproc_dir:
+            os.makedirs(multiproc_dir, exist_ok=True)
+            atexit.register(self.flush)
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), mode='all'):
+        return self._register(Gauge(self, name, documentation, labelnames, mode))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def add_collector(self, collect):
+        """Call collect() before every snapshot, e.g. to refresh gauges from stats()"""
+        self._collectors.append(collect)
+
+    def snapshot(self):
+        for collect in self._collectors:
+            try:
+                collect()
+            except Exception:
+                pass  # a failing source must not break the scrape
+        return {name: {'samples': metric.samples()} for name, metric in self._metrics.items()}
+
+    # ---- Multiprocess snapshots ----
+
+    def _snapshot_path(self, pid):
+        return os.path.join(self.multiproc_dir, f"metrics-{pid}.json")
+
+    def flush(self):
+        if not self.multiproc_dir:
+            return
+        self._last_flush = time.monotonic()
+        fd, tmp = tempfile.mkstemp(dir=self.multiproc_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp, self._snapshot_path(os.getpid()))
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+    def maybe_flush(self):
+        if self.multiproc_dir and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _load_snapshots(self):
+        """[(pid, alive, snapshot)] for every process that has written one"""
+        self.flush()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.multiproc_dir, 'metrics-*.json')):
+            try:
+                pid = int(os.path.basename(path)[8:-5])
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (ValueError, OSError):
+                continue
+            try:
+                os.kill(pid, 0)
+                alive = True
+            except ProcessLookupError:
+                alive = False
+            except OSError:
+                alive = True
+            snapshots.append((pid, alive, snapshot))
+        return snapshots
+
+    def _merged(self):
+        """{name: {label key tuple: value}} across every process"""
+        if not self.multiproc_dir:
+            snapshots = [(os.getpid(), True, self.snapshot())]
+        else:
+            snapshots = self._load_snapshots()
+
+        merged = {name: {} for name in self._metrics}
+        for pid, alive, snapshot in snapshots:
+            for name, data in snapshot.items():
+                metric = self._metrics.get(name)
+                if metric is None:
+                    continue
+                series = merged[name]
+                for raw_key, value in data['samples'].items():
+                    key = tuple(json.loads(raw_key))
+                    if metric.kind == 'gauge':
+                        if not alive or (metric.mode == 'local' and pid != os.getpid()):
+                            continue
+                        if metric.mode == 'all' and self.multiproc_dir:
+                            key = key + (str(pid),)
+                        series[key] = series.get(key, 0) + value
+                    elif metric.kind == 'histogram':
+                        current = series.get(key)
+                        series[key] = value if current is None else [a + b for a, b in zip(current, value)]
+                    else:
+                        series[key] = series.get(key, 0) + value
+        return merged
+
+    def render(self):
+        """Prometheus text exposition format (0.0.4)"""
+        lines = []
+        for name, series in self._merged().items():
+            metric = self._metrics[name]
+            labelnames = metric.labelnames
+            if metric.kind == 'gauge' and metric.mode == 'all' and self.multiproc_dir:
+                labelnames = labelnames + ('pid',)
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(series.items()):
+                labels = list(zip(labelnames, key))
+                if metric.kind != 'histogram':
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float('inf'),), value[:-1]):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else _format_value(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels + [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value[-1])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry(
+    multiproc_dir=os.getenv('METRICS_MULTIPROC_DIR') or None,
+    flush_interval=float(os.getenv('METRICS_FLUSH_INTERVAL', 1.0)),
+)
+
+http_requests = registry.counter(
+    'http_requests_total', 'HTTP requests by endpoint and status', ('method', 'endpoint', 'status'))
+http_request_duration = registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by endpoint', ('method', 'endpoint'))
+http_requests_in_progress = registry.gauge(
+    'http_requests_in_progress', 'HTTP requests currently being served', mode='sum')
+
+
+def init_app(app):
+    """Time every request and count it by endpoint and status"""
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_started = time.perf_counter()
+        http_requests_in_progress.inc()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('_metrics_started', None)
+        if started is None:
+            return response
+        http_requests_in_progress.dec()
+        # Endpoint names, not paths, so /api/report/<id> stays one series
+        endpoint = request.url_rule.endpoint if request.url_rule else 'unmatched'
+        http_request_duration.observe(time.perf_counter() - started, method=request.method, endpoint=endpoint)
+        http_requests.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+        registry.maybe_flush()
+        return response
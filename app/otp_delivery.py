@@ -0,0 +1,164 @@
+import hashlib
+import os
+import secrets
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from logging_config import log_application_event
+from shared_file import SUPPORTED, FileLock, instance_file, open_shared_map
+
+QUEUED = 'queued'
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+UNKNOWN = 'unknown'
+_STATUS_CODES = (UNKNOWN, QUEUED, SENDING, SENT, FAILED)
+
+# key digest, expiry (wall clock, shared across processes), status code
+_RECORD = struct.Struct('<16sdB7x')
+_PROBE = 8
+
+
+class SharedStatusTable:
+    """Delivery statuses readable by every worker process on the host.
+
+    The verify page's poll usually lands on a different gunicorn worker
+    than the one sending the email, so statuses live in a memory-mapped
+    file rather than in process memory once open() has mapped it. Each id
+    hashes to a run of `_PROBE` slots; a new id takes an expired slot
+    there, or else the one closest to expiry, so under extreme load an old
+    id may read 'unknown' early. Without fcntl (Windows) the table stays
+    process-local.
+    """
+
+    def __init__(self, slots=4096):
+        self.path = None
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._file = None
+        self._map = bytearray(slots * _RECORD.size)
+
+    def open(self, path):
+        """Switch to the table file at path, shared with the other workers"""
+        file, shared = open_shared_map(path, self.slots * _RECORD.size)
+        with self._lock:
+            self.path = path
+            self._file, self._map = file, shared
+
+    def _locked(self):
+        return FileLock(self._lock, self._file)
+
+    def _probe(self, key):
+        start = int.from_bytes(key[:4], 'little') % self.slots
+        return [(start + i) % self.slots * _RECORD.size for i in range(_PROBE)]
+
+    def set(self, delivery_id, status, ttl):
+        key = hashlib.blake2b(delivery_id.encode(), digest_size=16).digest()
+        now = time.time()
+        with self._locked():
+            records = [(offset, _RECORD.unpack_from(self._map, offset)) for offset in self._probe(key)]
+            target = next((offset for offset, (k, _, _) in records if k == key), None)
+            if target is None:
+                target = min(records, key=lambda record: record[1][1])[0]
+            _RECORD.pack_into(self._map, target, key, now + ttl, _STATUS_CODES.index(status))
+
+    def get(self, delivery_id):
+        key = hashlib.blake2b(delivery_id.encode(), digest_size=16).digest()
+        with self._locked():
+            for offset in self._probe(key):
+                k, expires, code = _RECORD.unpack_from(self._map, offset)
+                if k == key:
+                    return _STATUS_CODES[code] if expires >= time.time() else UNKNOWN
+        return UNKNOWN
+
+
+class OTPDeliveryQueue:
+    """Sends OTP emails off the request thread with bounded concurrency.
+
+    At most `workers` emails are in flight and at most `max_pending` are
+    waiting; beyond that a delivery is refused straight away (status
+    'failed') rather than queueing without bound behind a slow SMTP server.
+    Each delivery gets an opaque id whose status the verify page polls.
+    Statuses go to a SharedStatusTable, so any worker can answer the poll,
+    and expire after `status_ttl` seconds. init_app() maps the table to
+    OTP_STATUS_PATH, or otp-status in the app's instance folder.
+    """
+
+    def __init__(self, workers=None, max_pending=None, status_ttl=600, statuses=None):
+        self.workers = workers or int(os.getenv('OTP_SENDER_WORKERS', 4))
+        self.max_pending = max_pending or int(os.getenv('OTP_SENDER_MAX_PENDING', 200))
+        self.status_ttl = status_ttl
+        self._lock = threading.Lock()
+        self._statuses = statuses or SharedStatusTable()
+        self._pending = 0
+        self._executor = None
+        self._pid = None
+        self._stats = {'submitted': 0, 'sent': 0, 'failed': 0, 'rejected': 0}
+
+    def init_app(self, app):
+        if SUPPORTED:
+            self._statuses.open(instance_file(app, 'OTP_STATUS_PATH', 'otp-status'))
+
+    def _get_executor(self):
+        # Threads do not survive a fork, so each worker process starts its own
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='otp')
+                    self._pending = 0
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _set_status(self, delivery_id, status):
+        self._statuses.set(delivery_id, status, self.status_ttl)
+
+    def submit(self, send, *args):
+        """Queue send(*args) and return its delivery id"""
+        executor = self._get_executor()
+        delivery_id = secrets.token_urlsafe(16)
+        with self._lock:
+            self._stats['submitted'] += 1
+            accepted = self._pending < self.max_pending
+            if accepted:
+                self._pending += 1
+            else:
+                self._stats['rejected'] += 1
+        if not accepted:
+            self._set_status(delivery_id, FAILED)
+            log_application_event("otp_delivery_rejected", level="warning",
+                                  details={"pending": self.max_pending})
+            return delivery_id
+
+        self._set_status(delivery_id, QUEUED)
+        executor.submit(self._deliver, delivery_id, send, args)
+        return delivery_id
+
+    def _deliver(self, delivery_id, send, args):
+        self._set_status(delivery_id, SENDING)
+        try:
+            send(*args)
+            status = SENT
+        except Exception as e:
+            status = FAILED
+            log_application_event("otp_delivery_failed", level="error", details={"error": str(e)})
+        finally:
+            with self._lock:
+                self._pending -= 1
+        self._set_status(delivery_id, status)
+        with self._lock:
+            self._stats[status] += 1
+
+    def status(self, delivery_id):
+        return self._statuses.get(delivery_id)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = self._pending
+        stats['workers'] = self.workers
+        return stats
+
+
+otp_deliveries = OTPDeliveryQueue()
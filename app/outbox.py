@@ -0,0 +1,161 @@
+import json
+import random
+
+from mailer import app_smtp_pool
+from user_settings import build_email_notification as build_user_email
+from admin_settings import build_email_notification as build_admin_email
+
+# Builds the MIME message for each outbox audience
+EMAIL_BUILDERS = {
+    'user': build_user_email,
+    'admin': build_admin_email,
+}
+
+MAX_ERROR_LENGTH = 500
+
+
+def enqueue_report_emails(cursor, audience, recipients, report_id, report_title, report_description, report_category):
+    """Queue one new-report email per recipient in the caller's transaction.
+
+    Nothing is sent here; the rows become visible to app/email_worker.py only
+    once the report commits, and vanish with it on rollback.
+    """
+    payload = {
+        'report_id': report_id,
+        'title': report_title,
+        'description': report_description,
+        'category': report_category,
+    }
+    rows = [
+        (audience, r['email'], json.dumps({**payload, 'username': r['username']}))
+        for r in recipients if r['email']
+    ]
+    if rows:
+        cursor.executemany(
+            "INSERT INTO email_outbox (audience, recipient, payload) VALUES (%s, %s, %s)", rows)
+    return len(rows)
+
+
+def reclaim_expired(cursor):
+    """Return rows whose worker died mid-send to the pending queue"""
+    cursor.execute("""
+        UPDATE email_outbox
+        SET status = 'pending', locked_until = NULL
+        WHERE status = 'sending' AND locked_until < NOW()
+    """)
+    return cursor.rowcount
+
+
+def claim_batch(conn, batch_size, lease_seconds):
+    """Claim up to batch_size due emails for this worker.
+
+    SKIP LOCKED lets several workers claim concurrently without blocking on
+    each other's rows. Claimed rows move to 'sending' with a lease, and the
+    claim is committed before any email goes out.
+    """
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT id, audience, recipient, payload, attempts,
+                   TIMESTAMPDIFF(SECOND, created_at, NOW()) AS age_seconds
+            FROM email_outbox
+            WHERE status = 'pending' AND next_attempt_at <= NOW()
+            ORDER BY next_attempt_at, id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (batch_size,))
+        jobs = cursor.fetchall()
+        if jobs:
+            placeholders = ', '.join(['%s'] * len(jobs))
+            cursor.execute(f"""
+                UPDATE email_outbox
+                SET status = 'sending', attempts = attempts + 1,
+                    locked_until = NOW() + INTERVAL %s SECOND
+                WHERE id IN ({placeholders})
+            """, (lease_seconds, *[job['id'] for job in jobs]))
+        conn.commit()
+    finally:
+        cursor.close()
+
+    for job in jobs:
+        job['attempts'] += 1
+        if isinstance(job['payload'], (str, bytes, bytearray)):
+            job['payload'] = json.loads(job['payload'])
+    return jobs
+
+
+def mark_sent(cursor, job_ids):
+    if not job_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(job_ids))
+    cursor.execute(f"""
+        UPDATE email_outbox
+        SET status = 'sent', sent_at = NOW(), locked_until = NULL, last_error = NULL
+        WHERE id IN ({placeholders})
+    """, tuple(job_ids))
+
+
+def mark_retry(cursor, job_id, delay_seconds, error):
+    cursor.execute("""
+        UPDATE email_outbox
+        SET status = 'pending', locked_until = NULL, last_error = %s,
+            next_attempt_at = NOW() + INTERVAL %s SECOND
+        WHERE id = %s
+    """, (str(error)[:MAX_ERROR_LENGTH], int(delay_seconds), job_id))
+
+
+def mark_failed(cursor, job_id, error):
+    cursor.execute("""
+        UPDATE email_outbox
+        SET status = 'failed', locked_until = NULL, last_error = %s
+        WHERE id = %s
+    """, (str(error)[:MAX_ERROR_LENGTH], job_id))
+
+
+def purge_sent(cursor, retention_days):
+    cursor.execute("""
+        DELETE FROM email_outbox
+        WHERE status = 'sent' AND sent_at < NOW() - INTERVAL %s DAY
+    """, (retention_days,))
+    return cursor.rowcount
+
+
+def retry_delay(attempts, base_seconds, max_seconds):
+    """Exponential backoff with jitter so failed batches do not retry in lockstep"""
+    delay = min(max_seconds, base_seconds * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def outbox_stats(conn):
+    """Queue depth per status and the age of the oldest undelivered email"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT status, COUNT(*) AS count, TIMESTAMPDIFF(SECOND, MIN(created_at), NOW()) AS oldest_seconds
+        FROM email_outbox
+        WHERE status IN ('pending', 'sending', 'failed')
+        GROUP BY status
+    """)
+    rows = {row[0]: row[1:] for row in cursor.fetchall()}
+    cursor.close()
+    pending = rows.get('pending', (0, None))
+    sending = rows.get('sending', (0, None))
+    lags = [age for _, age in (pending, sending) if age is not None]
+    return {
+        'pending': pending[0],
+        'sending': sending[0],
+        'failed': rows.get('failed', (0, None))[0],
+        'depth': pending[0] + sending[0],
+        'lag_seconds': max(lags) if lags else 0,
+    }
+
+
+def build_message(job):
+    payload = job['payload']
+    return EMAIL_BUILDERS[job['audience']](
+        job['recipient'], payload['username'], payload['report_id'],
+        payload['title'], payload['description'], payload['category'])
+
+
+def send_messages(messages):
+    """Deliver messages over pooled SMTP sessions; returns one error (or None) per message"""
+    return app_smtp_pool().send_many(messages)
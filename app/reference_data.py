@@ -0,0 +1,121 @@
+"""Reference data shared by the blueprints: report categories and statuses.
+
+Categories are fixed in code; CATEGORIES is the one place that lists them
+with their form value, display name, icon and user_preferences column.
+Statuses live in the `status` table and are read through `statuses`, which
+loads them once per worker and refreshes after REFERENCE_DATA_TTL seconds or
+when any process publishes the 'reference_data' channel (run this module
+after editing the table: `cd app && python reference_data.py`).
+"""
+import os
+import threading
+import time
+
+from flask import Flask, current_app
+
+from db import get_db_connection
+from invalidation import invalidation_bus
+
+# (form value, display name, icon classes, user_preferences column)
+CATEGORIES = (
+    ('fires', 'Fires', 'fa-solid fa-fire category-fires', 'fire_hazard'),
+    ('faulty_facilities', 'Faulty Facilities/Equipment', 'fa-solid fa-screwdriver-wrench category-faulty',
+     'faulty_equipment'),
+    ('vandalism', 'Vandalism', 'fa-solid fa-spray-can category-vandalism', 'vandalism'),
+    ('suspicious_activity', 'Suspicious Activity', 'fa-solid fa-user-secret category-suspicious',
+     'suspicious_activity'),
+    ('other', 'Others', 'fa-solid fa-question-circle category-others', 'other_incident'),
+)
+DEFAULT_CATEGORY_ICON = "fa-solid fa-tag"
+
+# Form value -> display name (stored as reports.category_name)
+CATEGORY_DISPLAY_NAMES = {value: name for value, name, _, _ in CATEGORIES}
+# Display name -> icon classes
+CATEGORY_ICONS = {name: icon for _, name, icon, _ in CATEGORIES}
+# Display name -> user_preferences column
+CATEGORY_PREFERENCE_FIELDS = {name: field for _, name, _, field in CATEGORIES}
+
+CHANNEL = 'reference_data'
+
+
+class StatusRegistry:
+    """The `status` table, cached per worker process.
+
+    The first lookup loads it; later lookups are served from memory until
+    `ttl` seconds pass or the 'reference_data' channel is published. If a
+    refresh fails the previous rows keep being served.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl if ttl is not None else int(os.getenv('REFERENCE_DATA_TTL', 3600))
+        self._lock = threading.Lock()
+        self._rows = None
+        self._by_id = {}
+        self._by_name = {}
+        self._expires = 0.0
+        self._loads = 0
+        invalidation_bus.register(CHANNEL, self._invalidate)
+
+    def _invalidate(self):
+        with self._lock:
+            self._expires = 0.0
+
+    def _load(self):
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("SELECT status_id, name FROM status ORDER BY status_id")
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _current(self):
+        with self._lock:
+            if self._rows is not None and self._expires > time.monotonic():
+                return self._rows
+            try:
+                rows = self._load()
+            except Exception as e:
+                if self._rows is None:
+                    raise
+                current_app.logger.error(f"Status refresh failed, serving cached rows: {e}")
+                rows = self._rows
+            else:
+                self._loads += 1
+            self._rows = rows
+            self._by_id = {row['status_id']: row['name'] for row in rows}
+            self._by_name = {row['name']: row['status_id'] for row in rows}
+            self._expires = time.monotonic() + self.ttl
+            return rows
+
+    def all(self):
+        """Every status as {'status_id', 'name'} dicts, in status_id order"""
+        return [dict(row) for row in self._current()]
+
+    def is_valid_id(self, status_id):
+        self._current()
+        return status_id in self._by_id
+
+    def id_for(self, name):
+        """status_id of a status name, or None"""
+        self._current()
+        return self._by_name.get(name)
+
+    def refresh(self):
+        """Reload the table in every worker"""
+        invalidation_bus.publish(CHANNEL)
+
+    def snapshot(self):
+        with self._lock:
+            return {'statuses': len(self._by_id), 'loads': self._loads}
+
+
+statuses = StatusRegistry()
+
+
+if __name__ == '__main__':
+    # Same instance folder as app.py's Flask(__name__), so the same counter file
+    invalidation_bus.init_app(Flask('app'))
+    statuses.refresh()
+    print("Reference data refresh published")
@@ -6,28 +6,23 @@ from flask import (
     redirect, render_template, request, session, url_for
 )
 from werkzeug.utils import secure_filename
-import mysql.connector
+from db import get_db_connection
 from flask_wtf.csrf import validate_csrf
 from wtforms.validators import ValidationError
 from extensions import limiter
 from flask_limiter.errors import RateLimitExceeded
-from user_settings import send_notifications_for_new_report
-from admin_settings import send_admin_notifications_for_new_report
+from cache import notification_counts, report_listings
+from user_settings import create_user_notifications
+from admin_settings import create_admin_notifications
+from outbox import enqueue_report_emails
 from access_control import login_required, permission_required
+from reference_data import CATEGORY_DISPLAY_NAMES
 
 bp = Blueprint('reports', __name__, template_folder='templates')
 
 UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
-CATEGORY_DISPLAY_NAMES = {
-    'fires': 'Fires',
-    'faulty_facilities': 'Faulty Facilities/Equipment',
-    'vandalism': 'Vandalism',
-    'suspicious_activity': 'Suspicious Activity',
-    'other': 'Others'
-}
-
 MAX_TITLE_LENGTH = 255
 MAX_DESCRIPTION_LENGTH = 1000
 MAX_CATEGORY_DESCRIPTION_LENGTH = 255
@@ -59,15 +54,6 @@ def allowed_file(filename):
         filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
     )
 
-def get_db_connection():
-    cfg = current_app.config
-    return mysql.connector.connect(
-        host=cfg['MYSQL_HOST'],
-        user=cfg['MYSQL_USER'],
-        password=cfg['MYSQL_PASSWORD'],
-        database=cfg['MYSQL_DB'],
-    )
-
 @bp.route('/report', methods=['GET', 'POST'])
 @limiter.limit("5 per minute")
 @login_required
@@ -289,29 +275,14 @@ def submit_report():
                 VALUES (%s, %s, %s, %s)
             """, attachments)
 
-        conn.commit()
-
+        notified_user_ids = []
         if not is_anon and user_id:
-            try:
-                # Notify regular users who have preferences set
-                send_notifications_for_new_report(
-                    report_id,
-                    title,
-                    description,
-                    category_display_name,
-                    user_id
-                )
-                
-                # Also notify admins 
-                send_admin_notifications_for_new_report(
-                    report_id,
-                    title,
-                    description,
-                    category_display_name,
-                    user_id
-                )
-            except Exception as e:
-                current_app.logger.error(f"Error sending notifications for report {report_id}: %s", e)
+            notified_user_ids = fan_out_new_report(cursor, report_id, title, description,
+                                                   category_display_name, user_id)
+
+        conn.commit()
+        notification_counts.increment(notified_user_ids)
+        report_listings.bump()
 
         if is_ajax_request():
             return jsonify({"message": "Report submitted successfully!", "redirect": url_for('index')}), 200
@@ -336,6 +307,31 @@ def submit_report():
             cursor.close()
             conn.close()
 
+def fan_out_new_report(cursor, report_id, title, description, category_name, user_id):
+    """Write in-app notifications and queue emails for a new report.
+
+    Runs inside the report's transaction: both audiences get one
+    INSERT ... SELECT each, and their emails land in email_outbox for
+    email_worker.py to deliver, so nothing is sent from the request.
+    The fan-out sits behind a savepoint, so if it fails it is logged and
+    rolled back while the report itself still commits.
+    Returns the ids of the notified users.
+    """
+    cursor.execute("SAVEPOINT fan_out")
+    try:
+        users = create_user_notifications(cursor, report_id, title, category_name, user_id)
+        admins = create_admin_notifications(cursor, report_id, title, category_name, user_id)
+        queued = (enqueue_report_emails(cursor, 'user', users, report_id, title, description, category_name)
+                  + enqueue_report_emails(cursor, 'admin', admins, report_id, title, description, category_name))
+    except Exception as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT fan_out")
+        current_app.logger.error(f"Report {report_id}: notification fan-out failed, report kept: {e}")
+        return []
+    cursor.execute("RELEASE SAVEPOINT fan_out")
+    current_app.logger.info(f"Report {report_id}: notified {len(users)} users and {len(admins)} admins, "
+                            f"queued {queued} emails")
+    return [u['user_id'] for u in users + admins]
+
 @bp.errorhandler(RateLimitExceeded)
 def rate_limit_exceeded(e):
     retry_after = int(e.description.split(" ")[-1]) if "second" in str(e.description) else 60
@@ -0,0 +1,67 @@
+import mmap
+import os
+import stat
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: single process, no sharing needed
+    fcntl = None
+
+# Without fcntl the modules using this keep their tables in process memory
+SUPPORTED = fcntl is not None
+
+
+def instance_file(app, env_var, name):
+    """Path of a file shared by the app's worker processes: `env_var` if set,
+    else `name` in the app's instance folder (created owner-only)"""
+    path = os.getenv(env_var)
+    if path:
+        return path
+    os.makedirs(app.instance_path, mode=0o700, exist_ok=True)
+    return os.path.join(app.instance_path, name)
+
+
+def open_shared_map(path, size):
+    """Open (creating if needed) a `size`-byte file at path and map it shared.
+
+    Every worker process of the app maps the same file, so whoever can
+    write it can change what the workers see. It is therefore opened
+    without following symlinks, and refused unless it is a regular file
+    owned by this user and writable by nobody else.
+    Returns (file object, mmap).
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+    try:
+        st = os.fstat(fd)
+        if not stat.S_ISREG(st.st_mode) or st.st_uid != os.geteuid() or st.st_mode & 0o022:
+            raise PermissionError(f"{path} must be a regular file owned by this user and writable only by it")
+        file = os.fdopen(fd, 'r+b')
+    except BaseException:
+        os.close(fd)
+        raise
+    fcntl.lockf(file, fcntl.LOCK_EX)
+    try:
+        if os.fstat(fd).st_size < size:
+            file.truncate(size)
+    finally:
+        fcntl.lockf(file, fcntl.LOCK_UN)
+    return file, mmap.mmap(fd, size)
+
+
+class FileLock:
+    """A thread lock plus an fcntl lock on `file` (fcntl locks don't exclude
+    threads of the same process). `file` None means process-local."""
+
+    def __init__(self, lock, file=None):
+        self.lock = lock
+        self.file = file
+
+    def __enter__(self):
+        self.lock.acquire()
+        if self.file is not None:
+            fcntl.lockf(self.file, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        if self.file is not None:
+            fcntl.lockf(self.file, fcntl.LOCK_UN)
+        self.lock.release()
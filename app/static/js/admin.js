@@ -17,7 +17,6 @@ document.addEventListener("DOMContentLoaded", function () {
   // === State & References ===
   const csrfToken = document.querySelector('meta[name="csrf-token"]')?.getAttribute('content') || '';
   const tableBody = document.getElementById("reportsTableBody");
-  const originalRows = Array.from(tableBody.querySelectorAll("tr"));
   const rowsPerPage = 7;
   const CATEGORY_MAPPING = {
     'all': 'All',
@@ -34,7 +33,13 @@ document.addEventListener("DOMContentLoaded", function () {
     "desc-asc",
     "desc-desc"
   ];
-  const allRows = [...originalRows];
+  const ARROW_SVG = '<svg xmlns="http://www.w3.org/2000/svg" height="1em" viewBox="0 0 512 512" class="arrow"><path d="M233.4 406.6c12.5 12.5 32.8 12.5 45.3 0l192-192c12.5-12.5 12.5-32.8 0-45.3s-32.8-12.5-45.3 0L256 338.7 86.6 169.4c-12.5-12.5-32.8-12.5-45.3 0s-12.5 32.8 0 45.3l192 192z"></path></svg>';
+  const VIEW_BUTTON_HTML = '<svg xmlns="http://www.w3.org/2000/svg" class="arr-2" viewBox="0 0 24 24"><path d="M16.1716 10.9999L10.8076 5.63589L12.2218 4.22168L20 11.9999L12.2218 19.778L10.8076 18.3638L16.1716 12.9999H4V10.9999H16.1716Z"></path></svg><span class="text">View More Details</span><span class="circle"></span><svg xmlns="http://www.w3.org/2000/svg" class="arr-1" viewBox="0 0 24 24"><path d="M16.1716 10.9999L10.8076 5.63589L12.2218 4.22168L20 11.9999L12.2218 19.778L10.8076 18.3638L16.1716 12.9999H4V10.9999H16.1716Z"></path></svg>';
+  const BIN_BUTTON_HTML = '<svg class="bin-top" viewBox="0 0 39 7" fill="none" xmlns="http://www.w3.org/2000/svg"><line y1="5" x2="39" y2="5" stroke="white" stroke-width="4"></line><line x1="12" y1="1.5" x2="26.0357" y2="1.5" stroke="white" stroke-width="3"></line></svg><svg class="bin-bottom" viewBox="0 0 33 39" fill="none" xmlns="http://www.w3.org/2000/svg"><mask id="path-1-inside-1_8_19" fill="white"><path d="M0 0H33V35C33 37.2091 31.2091 39 29 39H4C1.79086 39 0 37.2091 0 35V0Z"></path></mask><path d="M0 0H33H0ZM37 35C37 39.4183 33.4183 43 29 43H4C-0.418278 43 -4 39.4183 -4 35H4H29H37ZM4 43C-0.418278 43 -4 39.4183 -4 35V0H4V35V43ZM37 0V35C37 39.4183 33.4183 43 29 43V35V0H37Z" fill="white" mask="url(#path-1-inside-1_8_19)"></path><path d="M12 6L12 29" stroke="white" stroke-width="4"></path><path d="M21 6V29" stroke="white" stroke-width="4"></path></svg>';
+  // Keyset pagination: cursors[i] fetches page i + 1 (page 1 has no cursor)
+  let cursors = [null];
+  let currentPage = 1;
+  let nextCursor = null;
   let currentStatusFilter = "all";
   let selectedReportId = null;
   let selectedRow = null;
@@ -44,10 +49,102 @@ document.addEventListener("DOMContentLoaded", function () {
   const filterCategory = document.getElementById("filterCategory");
   const paginationContainer = document.getElementById("paginationContainer");
 
+  const capitalize = text => text.charAt(0).toUpperCase() + text.slice(1);
+
+  // === Row Rendering ===
+  function buildStatusOptions(optionsDiv, reportId, currentStatus) {
+    optionsDiv.textContent = "";
+
+    ALL_STATUSES.forEach(status => {
+      if (status.name.toLowerCase() !== currentStatus.toLowerCase()) {
+        const div = document.createElement("div");
+        div.title = `option-${status.status_id}`;
+
+        const input = document.createElement("input");
+        input.type = "radio";
+        input.name = `option-${reportId}`;
+        input.id = `option-${status.status_id}-${reportId}`;
+
+        const label = document.createElement("label");
+        label.className = "option";
+        label.htmlFor = input.id;
+        label.dataset.txt = capitalize(status.name);
+
+        div.appendChild(input);
+        div.appendChild(label);
+        optionsDiv.appendChild(div);
+
+        input.addEventListener("change", handleStatusChange);
+      }
+    });
+  }
+
+  function buildRow(report) {
+    const tr = document.createElement("tr");
+    const status = report.status_name.toLowerCase();
+    Object.assign(tr.dataset, {
+      reportid: report.report_id,
+      title: report.title,
+      category: report.category_name,
+      username: report.username,
+      status: status,
+      description: report.description,
+      createdat: report.created_at
+    });
+
+    const idCell = document.createElement("td");
+    idCell.textContent = report.report_id;
+
+    const titleCell = document.createElement("td");
+    const titleDiv = document.createElement("div");
+    titleDiv.className = "ellipsis-admin-title";
+    titleDiv.textContent = report.title;
+    titleCell.appendChild(titleDiv);
+
+    const categoryCell = document.createElement("td");
+    categoryCell.textContent = report.category_name;
+
+    const statusCell = document.createElement("td");
+    const badge = document.createElement("span");
+    badge.className = `status-badge status-${status}`;
+    badge.textContent = capitalize(status);
+    statusCell.appendChild(badge);
+
+    const selectCell = document.createElement("td");
+    const select = document.createElement("div");
+    select.className = "select";
+    const selected = document.createElement("div");
+    selected.className = "selected";
+    selected.dataset.default = capitalize(status);
+    selected.innerHTML = ARROW_SVG;
+    selected.prepend(document.createTextNode(capitalize(status)));
+    const options = document.createElement("div");
+    options.className = "options";
+    buildStatusOptions(options, report.report_id, status);
+    select.appendChild(selected);
+    select.appendChild(options);
+    selectCell.appendChild(select);
+
+    const viewCell = document.createElement("td");
+    const viewButton = document.createElement("button");
+    viewButton.className = "animated-button";
+    viewButton.innerHTML = VIEW_BUTTON_HTML;
+    viewButton.addEventListener("click", showReportDetails);
+    viewCell.appendChild(viewButton);
+
+    const deleteCell = document.createElement("td");
+    const binButton = document.createElement("button");
+    binButton.className = "bin-button";
+    binButton.dataset.reportid = report.report_id;
+    binButton.innerHTML = BIN_BUTTON_HTML;
+    binButton.addEventListener("click", confirmDelete);
+    deleteCell.appendChild(binButton);
+
+    [idCell, titleCell, categoryCell, statusCell, selectCell, viewCell, deleteCell].forEach(td => tr.appendChild(td));
+    return tr;
+  }
+
   // === Status Update ===
-  document.querySelectorAll(".options input[type='radio']").forEach(radio => {
-    radio.addEventListener("change", handleStatusChange);
-  });
 
   function handleStatusChange(event) {
     const radio = event.target;
@@ -87,31 +184,8 @@ document.addEventListener("DOMContentLoaded", function () {
         badge.textContent = statusText;
         badge.className = `status-badge status-${statusText.toLowerCase()}`;
 
-        const optionsDiv = row.querySelector(".options");
-        optionsDiv.textContent = "";
-
-        ALL_STATUSES.forEach(status => {
-          if (status.name.toLowerCase() !== statusText.toLowerCase()) {
-            const div = document.createElement("div");
-            div.title = `option-${status.status_id}`;
-
-            const input = document.createElement("input");
-            input.type = "radio";
-            input.name = `option-${reportId}`;
-            input.id = `option-${status.status_id}-${reportId}`;
-
-            const label = document.createElement("label");
-            label.className = "option";
-            label.htmlFor = input.id;
-            label.dataset.txt = status.name.charAt(0).toUpperCase() + status.name.slice(1);
-
-            div.appendChild(input);
-            div.appendChild(label);
-            optionsDiv.appendChild(div);
-
-            input.addEventListener("change", handleStatusChange);
-          }
-        });
+        row.dataset.status = statusText.toLowerCase();
+        buildStatusOptions(row.querySelector(".options"), reportId, statusText);
         showFlashMessage("Status Updated Succesfully!", "success");
       })
       .catch(err => {
@@ -127,176 +201,165 @@ document.addEventListener("DOMContentLoaded", function () {
       document.querySelectorAll("#statusFilterSidebar a").forEach(l => l.classList.remove("active"));
       this.classList.add("active");
       currentStatusFilter = this.dataset.status.toLowerCase();
-      updateTable();
+      reloadReports();
     });
   });
 
 
   // === Search, Sort, Filter ===
+  // Search, sort, category and status are all applied server-side by
+  // /api/reports; each page is fetched on demand.
+  let searchTimer = null;
   searchInput.addEventListener("input", () => {
     let val = searchInput.value
       .slice(0, 100)
       .replace(/[^\w\s\-]/g, '')
       .trim();
     searchInput.value = val;
-    updateTable();
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(reloadReports, 300);
   });
 
-  sortSelect.addEventListener("change", updateTable);
-  filterCategory.addEventListener("change", updateTable);
+  sortSelect.addEventListener("change", reloadReports);
+  filterCategory.addEventListener("change", reloadReports);
 
-  function updateTable() {
-    const searchVal = searchInput.value.toLowerCase();
-    const sortVal = sortSelect.value;
-    const categoryVal = filterCategory.value;
-
-    if (!VALID_CATEGORY_OPTIONS.includes(categoryVal)) {
+  function reloadReports() {
+    if (!VALID_CATEGORY_OPTIONS.includes(filterCategory.value)) {
       showFlashMessage("Invalid Category Selected. Resetting to all.", "error");
-      categoryVal = "all";
-      filterCategory.value = categoryVal;
+      filterCategory.value = "all";
     }
-    if (!VALID_SORT_OPTIONS.includes(sortVal)) {
+    if (!VALID_SORT_OPTIONS.includes(sortSelect.value)) {
       showFlashMessage("Invalid Sort Selection. Resetting to default.", "error");
-      sortVal = "id-asc";
-      sortSelect.value = sortVal;
+      sortSelect.value = "id-asc";
     }
+    cursors = [null];
+    loadPage(1);
+  }
 
-    let filteredRows = originalRows.filter(row => {
-      const title = row.children[1].textContent.toLowerCase();
-      const categoryText = row.children[2]?.textContent.trim();
-      const category = Object.keys(CATEGORY_MAPPING).find(
-        key => CATEGORY_MAPPING[key] === categoryText
-      ) || '';
-
-      const status = row.dataset.status.toLowerCase();
+  async function loadPage(page) {
+    const params = new URLSearchParams({ limit: rowsPerPage, order: sortSelect.value });
+    const searchVal = searchInput.value.trim();
+    const categoryVal = filterCategory.value;
+    if (searchVal) params.set("q", searchVal);
+    if (categoryVal !== "all") params.set("category", CATEGORY_MAPPING[categoryVal]);
+    if (currentStatusFilter !== "all") params.set("status", currentStatusFilter);
+    if (cursors[page - 1]) params.set("cursor", cursors[page - 1]);
 
-      return (
-        title.includes(searchVal) &&
-        (categoryVal === "all" || category === categoryVal) &&
-        (currentStatusFilter === "all" || status === currentStatusFilter)
-      );
-    });
+    try {
+      const res = await fetch(`/api/reports?${params.toString()}`);
+      if (!res.ok) throw new Error("Failed to load reports");
+      const data = await res.json();
 
-    filteredRows.sort((a, b) => {
-      const getId = row => +row.children[0].textContent;
-      const getTitle = row => row.children[1].textContent;
-      switch (sortVal) {
-        case "id-asc": return getId(a) - getId(b);
-        case "id-desc": return getId(b) - getId(a);
-        case "desc-asc": return getTitle(a).localeCompare(getTitle(b));
-        case "desc-desc": return getTitle(b).localeCompare(getTitle(a));
-        default: return 0;
-      }
-    });
+      currentPage = page;
+      nextCursor = data.next_cursor;
+      if (nextCursor) cursors[page] = nextCursor;
 
-    tableBody.textContent = "";
-    filteredRows.forEach(row => tableBody.appendChild(row));
-    allRows.length = 0;
-    allRows.push(...filteredRows);
-    showPage(1);
+      tableBody.textContent = "";
+      data.reports.forEach(report => tableBody.appendChild(buildRow(report)));
+      renderPaginationButtons();
+    } catch (err) {
+      console.error("Report load error:", err);
+      showFlashMessage("Could not load reports. Please refresh and try again.", "error");
+    }
   }
 
   // === View More Modal ===
-  document.querySelectorAll(".animated-button").forEach(button => {
-    button.addEventListener("click", async function () {
-      const row = this.closest("tr");
-      const { title = "", category = "", status = "", description = "", username = "", createdat = "", reportid } = row.dataset;
-
-      if (!/^\d+$/.test(reportid)) return;
-
-      const modalContent = document.getElementById("modalContent");
-      modalContent.textContent = "";
-
-      let imgContainer = document.getElementById("modalImageContainer") || document.createElement("div");
-      imgContainer.id = "modalImageContainer";
-      imgContainer.textContent = "";
-      modalContent.prepend(imgContainer);
-
-      try {
-        const res = await fetch(`/admin/report_attachments/${reportid}`);
-        if (!res.ok) throw new Error("Failed to load attachments");
-        const attachments = await res.json();
-        if (Array.isArray(attachments)) {
-          attachments.forEach(att => {
-            const img = document.createElement("img");
-            img.src = `/uploads/${att.file_name}`;
-            Object.assign(img.style, {
-              maxHeight: "200px",
-              borderRadius: "8px",
-              objectFit: "contain",
-              cursor: "pointer",
-              marginRight: "1rem"
-            });
-            img.alt = "Report Attachment";
-            imgContainer.appendChild(img);
-          });
-        }
-      } catch (err) {
-        console.error("Attachment load error:", err);
-        showFlashMessage("Could not load attachments. Try again later.", "error");
-      }
+  async function showReportDetails() {
+    const row = this.closest("tr");
+    const { title = "", category = "", status = "", description = "", username = "", createdat = "", reportid } = row.dataset;
+
+    if (!/^\d+$/.test(reportid)) return;
+
+    const modalContent = document.getElementById("modalContent");
+    modalContent.textContent = "";
 
-      const infoSection = document.createElement('div');
-      infoSection.className = "info-section";
-
-      [
-        { label: 'Title', value: title },
-        { label: 'Category', value: category },
-        { label: 'Status', value: status.charAt(0).toUpperCase() + status.slice(1) },
-        { label: 'Description', value: description },
-        {label: 'Owner', value: username},
-        {
-        label: 'Created At',
-        value: (() => {
-          // Convert DB time (UTC) into proper ISO format
-          const rawDate = new Date(createdat.replace(" ", "T") + "Z");
-
-          // Format date like: July 9, 2025
-          const dateOptions = { year: "numeric", month: "long", day: "numeric" };
-          const formattedDate = rawDate.toLocaleDateString(undefined, dateOptions);
-
-          // Format time like: 12:02 PM
-          let hours = rawDate.getHours();
-          const minutes = rawDate.getMinutes().toString().padStart(2, "0");
-          const ampm = hours >= 12 ? "PM" : "AM";
-          hours = hours % 12 || 12;
-          const formattedTime = `${hours}:${minutes} ${ampm}`;
-
-          return `${formattedDate} at ${formattedTime}`;
-        })()
+    let imgContainer = document.getElementById("modalImageContainer") || document.createElement("div");
+    imgContainer.id = "modalImageContainer";
+    imgContainer.textContent = "";
+    modalContent.prepend(imgContainer);
+
+    try {
+      const res = await fetch(`/admin/report_attachments/${reportid}`);
+      if (!res.ok) throw new Error("Failed to load attachments");
+      const attachments = await res.json();
+      if (Array.isArray(attachments)) {
+        attachments.forEach(att => {
+          const img = document.createElement("img");
+          img.src = `/uploads/${att.file_name}`;
+          Object.assign(img.style, {
+            maxHeight: "200px",
+            borderRadius: "8px",
+            objectFit: "contain",
+            cursor: "pointer",
+            marginRight: "1rem"
+          });
+          img.alt = "Report Attachment";
+          imgContainer.appendChild(img);
+        });
       }
+    } catch (err) {
+      console.error("Attachment load error:", err);
+      showFlashMessage("Could not load attachments. Try again later.", "error");
+    }
 
-      ].forEach(field => {
-        const wrapper = document.createElement('div');
-        wrapper.className = 'info-field';
+    const infoSection = document.createElement('div');
+    infoSection.className = "info-section";
+
+    [
+      { label: 'Title', value: title },
+      { label: 'Category', value: category },
+      { label: 'Status', value: status.charAt(0).toUpperCase() + status.slice(1) },
+      { label: 'Description', value: description },
+      {label: 'Owner', value: username},
+      {
+      label: 'Created At',
+      value: (() => {
+        // created_at arrives from /api/reports as an HTTP date in UTC
+        const rawDate = new Date(createdat);
+
+        // Format date like: July 9, 2025
+        const dateOptions = { year: "numeric", month: "long", day: "numeric" };
+        const formattedDate = rawDate.toLocaleDateString(undefined, dateOptions);
+
+        // Format time like: 12:02 PM
+        let hours = rawDate.getHours();
+        const minutes = rawDate.getMinutes().toString().padStart(2, "0");
+        const ampm = hours >= 12 ? "PM" : "AM";
+        hours = hours % 12 || 12;
+        const formattedTime = `${hours}:${minutes} ${ampm}`;
+
+        return `${formattedDate} at ${formattedTime}`;
+      })()
+    }
 
-        const lbl = document.createElement('div');
-        lbl.className = 'info-label';
-        lbl.textContent = field.label;
+    ].forEach(field => {
+      const wrapper = document.createElement('div');
+      wrapper.className = 'info-field';
 
-        const val = document.createElement('div');
-        val.className = 'info-value';
-        val.textContent = field.value;
+      const lbl = document.createElement('div');
+      lbl.className = 'info-label';
+      lbl.textContent = field.label;
 
-        wrapper.appendChild(lbl);
-        wrapper.appendChild(val);
-        infoSection.appendChild(wrapper);
-      });
+      const val = document.createElement('div');
+      val.className = 'info-value';
+      val.textContent = field.value;
 
-      modalContent.appendChild(infoSection);
-      new bootstrap.Modal(document.getElementById("reportDetailsModal")).show();
+      wrapper.appendChild(lbl);
+      wrapper.appendChild(val);
+      infoSection.appendChild(wrapper);
     });
-  });
+
+    modalContent.appendChild(infoSection);
+    new bootstrap.Modal(document.getElementById("reportDetailsModal")).show();
+  }
 
   // === Delete Flow ===
-  document.querySelectorAll(".bin-button").forEach(button => {
-    button.addEventListener("click", function () {
-      selectedReportId = this.dataset.reportid;
-      selectedRow = this.closest("tr");
-      if (!/^\d+$/.test(selectedReportId)) return;
-      new bootstrap.Modal(document.getElementById("deleteConfirmModal")).show();
-    });
-  });
+  function confirmDelete() {
+    selectedReportId = this.dataset.reportid;
+    selectedRow = this.closest("tr");
+    if (!/^\d+$/.test(selectedReportId)) return;
+    new bootstrap.Modal(document.getElementById("deleteConfirmModal")).show();
+  }
 
   document.getElementById("confirmDeleteBtn").addEventListener("click", async function () {
     if (!/^\d+$/.test(selectedReportId)) return;
@@ -321,41 +384,22 @@ document.addEventListener("DOMContentLoaded", function () {
   });
 
   // === Pagination ===
-  function showPage(page) {
-    const totalPages = Math.ceil(allRows.length / rowsPerPage);
-    page = Math.min(Math.max(page, 1), totalPages);
-
-    const start = (page - 1) * rowsPerPage;
-    const end = start + rowsPerPage;
-
-    allRows.forEach((row, i) => {
-      row.style.display = i >= start && i < end ? "" : "none";
-    });
-
-    renderPaginationButtons(page);
-  }
-
-  function renderPaginationButtons(currentPage) {
-    const totalPages = Math.ceil(allRows.length / rowsPerPage);
-    const maxVisible = 5;
+  function renderPaginationButtons() {
     paginationContainer.innerHTML = "";
 
     const ul = document.createElement("ul");
     ul.className = "pagination";
 
-    const createPageItem = (text, page = null, disabled = false, active = false, isEllipsis = false, isIcon = false) => {
+    const createPageItem = (text, page = null, disabled = false, active = false, isIcon = false) => {
       const li = document.createElement("li");
       li.className = "page-item";
       if (disabled) li.classList.add("disabled");
       if (active) li.classList.add("active");
-      if (isEllipsis) li.classList.add("disabled");
 
       const btn = document.createElement("button");
       btn.className = "page-link";
 
-      if (isEllipsis) {
-        btn.textContent = "...";
-      } else if (isIcon) {
+      if (isIcon) {
         const icon = document.createElement("i");
         icon.className = text;
         btn.appendChild(icon);
@@ -363,41 +407,20 @@ document.addEventListener("DOMContentLoaded", function () {
         btn.textContent = text;
       }
 
-      if (!disabled && page !== null && !isEllipsis) {
-        btn.addEventListener("click", () => showPage(page));
+      if (!disabled && page !== null) {
+        btn.addEventListener("click", () => loadPage(page));
       }
 
       li.appendChild(btn);
       return li;
     };
 
-    ul.appendChild(createPageItem("fa-solid fa-chevron-left", currentPage - 1, currentPage === 1, false, false, true));
-
-    let startPage = Math.max(1, currentPage - Math.floor(maxVisible / 2));
-    let endPage = startPage + maxVisible - 1;
-    if (endPage > totalPages) {
-      endPage = totalPages;
-      startPage = Math.max(1, endPage - maxVisible + 1);
-    }
-
-    if (startPage > 1) {
-      ul.appendChild(createPageItem("1", 1));
-      if (startPage > 2) ul.appendChild(createPageItem("...", null, true, false, true));
-    }
-
-    for (let i = startPage; i <= endPage; i++) {
-      ul.appendChild(createPageItem(i, i, false, i === currentPage));
-    }
-
-    if (endPage < totalPages) {
-      if (endPage < totalPages - 1) ul.appendChild(createPageItem("...", null, true, false, true));
-      ul.appendChild(createPageItem(totalPages, totalPages));
-    }
-
-    ul.appendChild(createPageItem("fa-solid fa-chevron-right", currentPage + 1, currentPage === totalPages, false, false, true));
+    ul.appendChild(createPageItem("fa-solid fa-chevron-left", currentPage - 1, currentPage === 1, false, true));
+    ul.appendChild(createPageItem(currentPage, null, false, true));
+    ul.appendChild(createPageItem("fa-solid fa-chevron-right", currentPage + 1, !nextCursor, false, true));
 
     paginationContainer.appendChild(ul);
   }
 
-  showPage(1);
-});
\ No newline at end of file
+  loadPage(1);
+});
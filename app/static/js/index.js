@@ -7,37 +7,42 @@ const CATEGORY_STYLES = {
 };
 
 const rowsPerPage = 7;
-let currentPage = 1;
 let currentCategory = "";
 let currentDateSort = "";
 let currentStatus = "";
+// Keyset pagination: cursors[i] fetches page i + 1 (page 1 has no cursor)
+let cursors = [null];
+let currentPage = 1;
+let nextCursor = null;
+
+async function fetchPage(cursor) {
+  const params = new URLSearchParams({ limit: rowsPerPage, order: currentDateSort || "newest" });
+  if (currentCategory) params.set("category", currentCategory);
+  if (currentStatus) params.set("status", currentStatus);
+  if (cursor) params.set("cursor", cursor);
+
+  const res = await fetch(`/api/reports?${params.toString()}`);
+  if (!res.ok) throw new Error("Failed to load reports");
+  return res.json();
+}
 
-function renderTable(page) {
+async function renderTable(page) {
   const tableBody = document.querySelector("#reportTable tbody");
-  tableBody.innerHTML = "";
 
-  // Filter by category
-  let filteredData = home_reports.filter(row => {
-    const categoryMatch = !currentCategory || row.category_name === currentCategory;
-    const statusMatch = !currentStatus || row.status_name.toLowerCase() === currentStatus.toLowerCase();
-    return categoryMatch && statusMatch;
-  });
+  let data;
+  try {
+    data = await fetchPage(cursors[page - 1]);
+  } catch (err) {
+    console.error("Report load error:", err);
+    return;
+  }
 
-  // Sort by date
-  filteredData.sort((a, b) => {
-    if (currentDateSort === "oldest") {
-      return new Date(a.created_at) - new Date(b.created_at);
-    } else {
-      return new Date(b.created_at) - new Date(a.created_at); // newest first
-    }
-  });
+  currentPage = page;
+  nextCursor = data.next_cursor;
+  if (nextCursor) cursors[page] = nextCursor;
+  const pageData = data.reports;
 
-  // Paginate
-  const totalPages = Math.ceil(filteredData.length / rowsPerPage);
-  page = Math.min(Math.max(page, 1), totalPages);
-  const start = (page - 1) * rowsPerPage;
-  const end = start + rowsPerPage;
-  const pageData = filteredData.slice(start, end);
+  tableBody.innerHTML = "";
 
   pageData.forEach(row => {
     const tr = document.createElement("tr");
@@ -92,7 +97,6 @@ function renderTable(page) {
 
     const ownerCell = document.createElement("td");
     ownerCell.textContent = row.username || 'Anonymous';
-    console.log(row);
 
     // Append cells to the row
     tr.appendChild(titleCell);
@@ -110,26 +114,20 @@ function renderTable(page) {
     tableBody.appendChild(tr);
   });
 
-  renderPagination(filteredData.length);
+  renderPagination();
 }
 
-function renderPagination(dataLength) {
+function renderPagination() {
   const pagination = document.getElementById("pagination");
   pagination.innerHTML = "";
 
-  const totalPages = Math.ceil(dataLength / rowsPerPage);
-  const maxVisible = 5;
-
   const createButton = (text, page = null, disabled = false, active = false) => {
     const btn = document.createElement("button");
     btn.innerHTML = text;
     btn.disabled = disabled;
     if (active) btn.classList.add("active");
     if (page !== null) {
-      btn.addEventListener("click", () => {
-        currentPage = page;
-        renderTable(currentPage);
-      });
+      btn.addEventListener("click", () => renderTable(page));
     }
     return btn;
   };
@@ -137,39 +135,31 @@ function renderPagination(dataLength) {
   // Prev button
   pagination.appendChild(createButton('<i class="fa-solid fa-chevron-left"></i>', currentPage - 1, currentPage === 1));
 
-  let startPage = Math.max(1, currentPage - Math.floor(maxVisible / 2));
-  let endPage = startPage + maxVisible - 1;
-
-  if (endPage > totalPages) {
-    endPage = totalPages;
-    startPage = Math.max(1, endPage - maxVisible + 1);
-  }
-
-  for (let i = startPage; i <= endPage; i++) {
-    pagination.appendChild(createButton(i, i, false, i === currentPage));
-  }
+  pagination.appendChild(createButton(currentPage, null, false, true));
 
   // Next button
-  pagination.appendChild(createButton('<i class="fa-solid fa-chevron-right"></i>', currentPage + 1, currentPage === totalPages));
+  pagination.appendChild(createButton('<i class="fa-solid fa-chevron-right"></i>', currentPage + 1, !nextCursor));
+}
+
+function resetAndRender() {
+  cursors = [null];
+  renderTable(1);
 }
 
 // Initial render
-renderTable(currentPage);
+renderTable(1);
 
 document.getElementById("categoryFilter").addEventListener("change", (e) => {
   currentCategory = e.target.value;
-  currentPage = 1;
-  renderTable(currentPage);
+  resetAndRender();
 });
 
 document.getElementById("statusFilter").addEventListener("change", (e) => {
   currentStatus = e.target.value;
-  currentPage = 1;
-  renderTable(currentPage);
+  resetAndRender();
 });
 
 document.getElementById("dateFilter").addEventListener("change", (e) => {
   currentDateSort = e.target.value;
-  currentPage = 1;
-  renderTable(currentPage);
+  resetAndRender();
 });
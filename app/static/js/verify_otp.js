@@ -10,4 +10,48 @@ document.addEventListener('DOMContentLoaded', function() {
             }, 500);
         }, 5000);
     });
-});
\ No newline at end of file
+});
+// Poll the OTP email delivery so the user knows whether to wait or log in again.
+// The status box only gets its .alert class here, so the auto-hide above leaves it alone.
+document.addEventListener('DOMContentLoaded', function() {
+    const statusBox = document.getElementById('otp-delivery-status');
+    if (!statusBox) return;
+
+    const messages = {
+        queued: { text: 'Sending your code...', category: 'info' },
+        sending: { text: 'Sending your code...', category: 'info' },
+        sent: { text: 'Code sent. Check your inbox.', category: 'success' },
+        failed: { text: "We couldn't send your code. Please log in again to get a new one.", category: 'error' }
+    };
+    const maxPolls = 30;
+    let polls = 0;
+
+    function show(status) {
+        const message = messages[status];
+        if (!message) {
+            statusBox.style.display = 'none';
+            return;
+        }
+        statusBox.textContent = message.text;
+        statusBox.className = `alert alert-${message.category}`;
+        statusBox.style.display = '';
+    }
+
+    function poll() {
+        polls += 1;
+        fetch('/verify_otp/status', { headers: { 'Accept': 'application/json' }, credentials: 'same-origin' })
+            .then(response => response.ok ? response.json() : { status: 'unknown' })
+            .then(data => {
+                show(data.status);
+                // 'unknown' means another worker handled the login; keep trying briefly
+                if (data.status !== 'sent' && data.status !== 'failed' && polls < maxPolls) {
+                    setTimeout(poll, 1000);
+                }
+            })
+            .catch(() => {
+                if (polls < maxPolls) setTimeout(poll, 2000);
+            });
+    }
+
+    poll();
+});
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app modules import each other by bare name (run from app/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,176 @@
+import base64
+import datetime
+import json
+import sqlite3
+
+import pytest
+
+from admin_dashboard import (REPORT_ORDERINGS, build_report_listing_query, decode_report_cursor,
+                             encode_report_cursor, to_boolean_query)
+
+CREATED = [datetime.datetime(2024, 5, 1, 9, 30), datetime.datetime(2024, 5, 2, 14, 0)]
+TITLES = ['Broken lift', 'Fire alarm', 'Graffiti']
+
+
+def report_rows():
+    # Three reports per created_at and two per title, so every ordering hits ties on its first key
+    return [{'report_id': report_id, 'created_at': CREATED[report_id % 2], 'title': TITLES[report_id % 3]}
+            for report_id in range(1, 13)]
+
+
+@pytest.fixture
+def reports_db():
+    # The listing query without a search is plain SQL, so sqlite can run it
+    sqlite3.register_adapter(datetime.datetime, lambda value: value.strftime('%Y-%m-%d %H:%M:%S'))
+    db = sqlite3.connect(':memory:')
+    db.row_factory = sqlite3.Row
+    db.executescript("""
+        CREATE TABLE status (status_id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE users (user_id INTEGER PRIMARY KEY, username TEXT);
+        CREATE TABLE reports (report_id INTEGER PRIMARY KEY, title TEXT, description TEXT, category_name TEXT,
+                              created_at TEXT, status_id INTEGER, user_id INTEGER, is_anonymous INTEGER);
+        INSERT INTO status VALUES (1, 'unresolved'), (2, 'resolved');
+        INSERT INTO users VALUES (1, 'alice');
+    """)
+    db.executemany("INSERT INTO reports VALUES (?, ?, '', 'Fires', ?, ?, 1, ?)",
+                   [(row['report_id'], row['title'], row['created_at'], 1 + row['report_id'] % 2,
+                     row['report_id'] == 4) for row in report_rows()])
+    yield db
+    db.close()
+
+
+def fetch_page(db, **kwargs):
+    query, params = build_report_listing_query(**kwargs)
+    rows = db.execute(query.replace('%s', '?'), params).fetchall()
+    return [dict(row, created_at=datetime.datetime.strptime(row['created_at'], '%Y-%m-%d %H:%M:%S'))
+            for row in rows]
+
+
+def expected_order(order):
+    direction, keys = REPORT_ORDERINGS[order]
+    return [row['report_id'] for row in sorted(report_rows(), key=lambda row: [row[key] for key in keys],
+                                               reverse=direction == 'DESC')]
+
+
+@pytest.mark.parametrize('order', sorted(REPORT_ORDERINGS))
+def test_paging_with_cursors_visits_every_report_once_in_order(reports_db, order):
+    seen = []
+    after = None
+    for _ in range(10):
+        rows = fetch_page(reports_db, order=order, after=after, limit=5)
+        page, has_more = rows[:5], len(rows) > 5
+        seen.extend(row['report_id'] for row in page)
+        if not has_more:
+            break
+        after = decode_report_cursor(order, encode_report_cursor(order, page[-1]))
+        assert after is not None
+    assert seen == expected_order(order)
+
+
+@pytest.mark.parametrize('order', sorted(REPORT_ORDERINGS))
+def test_cursor_round_trips_for_every_ordering(order):
+    row = report_rows()[0]
+    values = decode_report_cursor(order, encode_report_cursor(order, row))
+    assert values == [row[key] for key in REPORT_ORDERINGS[order][1]]
+
+
+def test_cursor_is_rejected_for_another_ordering():
+    token = encode_report_cursor('newest', report_rows()[0])
+    assert decode_report_cursor('oldest', token) is None
+    assert decode_report_cursor('id-asc', token) is None
+
+
+def encode(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('token', [
+    encode(['oldest', ['2024-05-01 09:30:00', 3]]),   # claims another ordering
+    encode(['newest', ['2024-05-01 09:30:00']]),      # a sort key missing
+    encode(['newest', ['2024-05-01 09:30:00', 3, 4]]),  # an extra value
+    encode(['newest', ['yesterday', 3]]),              # not a timestamp
+    encode(['newest', ['2024-05-01 09:30:00', 'x']]),  # not an id
+    encode(['newest', ['2024-05-01 09:30:00', None]]),
+    encode(['newest']),
+    encode({'order': 'newest'}),
+])
+def test_tampered_cursor_is_rejected(token):
+    assert decode_report_cursor('newest', token) is None
+
+
+def test_tampered_title_cursor_is_rejected():
+    assert decode_report_cursor('desc-asc', encode(['desc-asc', [42, 3]])) is None
+
+
+@pytest.mark.parametrize('token', [
+    '!!not base64!!',
+    'e',  # truncated
+    base64.urlsafe_b64encode(b'not json').decode(),
+    base64.urlsafe_b64encode(b'\xff\xfe\x00').decode(),
+    '',
+])
+def test_malformed_cursor_returns_none(token):
+    assert decode_report_cursor('newest', token) is None
+
+
+def test_query_without_filters_orders_by_every_key():
+    query, params = build_report_listing_query(order='newest', limit=7)
+    assert 'WHERE' not in query
+    assert 'ORDER BY r.created_at DESC, r.report_id DESC' in query
+    assert params == [8]  # one extra row tells the caller there is a next page
+
+
+def test_query_with_filters_and_cursor():
+    after = [datetime.datetime(2024, 5, 1, 9, 30), 3]
+    query, params = build_report_listing_query(category='Fires', status='resolved', order='oldest',
+                                               after=after, limit=20)
+    assert ("WHERE r.category_name = %s AND r.status_id = (SELECT status_id FROM status WHERE name = %s) "
+            "AND (r.created_at > %s OR (r.created_at = %s AND r.report_id > %s))") in query
+    assert 'ORDER BY r.created_at ASC, r.report_id ASC' in query
+    assert params == ['Fires', 'resolved', after[0], after[0], 3, 21]
+
+
+def test_query_with_single_key_cursor():
+    query, params = build_report_listing_query(order='id-desc', after=[10], limit=5)
+    assert 'WHERE r.report_id < %s' in query
+    assert params == [10, 6]
+
+
+def test_search_uses_fulltext_or_falls_back_to_title_scan():
+    query, params = build_report_listing_query(search='broken lift')
+    assert 'MATCH(r.title, r.description) AGAINST (%s IN BOOLEAN MODE)' in query
+    assert params[0] == '+broken* +lift*'
+
+    query, params = build_report_listing_query(search='5%_')
+    assert 'r.title LIKE %s' in query
+    assert params[0] == '%5\\%\\_%'
+
+
+@pytest.mark.parametrize('search, expected', [
+    ('broken lift', '+broken* +lift*'),
+    ('+fire -alarm', '+fire* -alarm'),
+    ('"broken lift" -graffiti', '+"broken lift" -graffiti'),
+    ('-"broken lift" fire', '-"broken lift" +fire*'),
+    ('fire*', '+fire*'),
+    ('(fire) @lift ~alarm', '+fire* +lift* +alarm*'),
+    ('>fire <lift', '+fire* +lift*'),
+    ('"lift (B) @3" fire', '+"lift B 3" +fire*'),
+    ('lift @3', '+lift*'),
+    ('fire "', '+fire*'),
+])
+def test_boolean_query_keeps_words_and_drops_operators(search, expected):
+    assert to_boolean_query(search) == expected
+
+
+@pytest.mark.parametrize('search', [
+    '',
+    '   ',
+    'ab cd',        # shorter than FULLTEXT_MIN_TOKEN_LENGTH
+    '"a b"',        # a phrase of only short words
+    '""',
+    '+ - " * ( ) @ ~',
+    '-fire -alarm',  # nothing required, so nothing would match
+    '-"broken lift"',
+])
+def test_boolean_query_is_empty_when_nothing_searchable_is_left(search):
+    assert to_boolean_query(search) == ''
@@ -0,0 +1,127 @@
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+from gelf_transport import GelfTcpSpoolHandler
+
+TIMEOUT = 5
+
+
+class TcpSink:
+    """GELF TCP input stand-in on 127.0.0.1 that keeps every byte it receives"""
+
+    def __init__(self, port=0):
+        self.data = bytearray()
+        self.connections = []
+        self.received = threading.Condition()
+        sink = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                sink.connections.append(self.request)
+                while True:
+                    try:
+                        chunk = self.request.recv(65536)
+                    except OSError:
+                        return
+                    if not chunk:
+                        return
+                    with sink.received:
+                        sink.data += chunk
+                        sink.received.notify_all()
+
+        class Server(socketserver.ThreadingTCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        self.server = Server(('127.0.0.1', port), Handler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def messages(self, count):
+        with self.received:
+            assert self.received.wait_for(lambda: self.data.count(b'\x00') >= count, TIMEOUT)
+            frames = bytes(self.data).split(b'\x00')
+        assert frames[-1] == b''  # every frame is terminated
+        return [json.loads(frame) for frame in frames[:-1]]
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        for connection in self.connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            connection.close()
+
+
+def record(n):
+    return logging.makeLogRecord({'msg': f'event {n}', 'levelno': logging.INFO, 'levelname': 'INFO',
+                                  'event_type': 'test_event', 'sequence': n})
+
+
+@pytest.fixture
+def sink():
+    sink = TcpSink()
+    yield sink
+    sink.stop()
+
+
+def make_handler(port, spool_dir, **kwargs):
+    return GelfTcpSpoolHandler('127.0.0.1', port, 'test', str(spool_dir), timeout=1.0, reconnect_interval=0, **kwargs)
+
+
+def test_batch_arrives_as_null_delimited_frames(sink, tmp_path):
+    handler = make_handler(sink.port, tmp_path)
+    handler.handle_batch([record(n) for n in range(3)])
+
+    messages = sink.messages(3)
+    assert [m['short_message'] for m in messages] == ['event 0', 'event 1', 'event 2']
+    assert [m['_sequence'] for m in messages] == [0, 1, 2]
+    assert all(m['_facility'] == 'test' and m['version'] == '1.1' for m in messages)
+    assert handler.get_stats()['sent'] == 3
+    handler.close()
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_outage_spools_with_cap_then_replays_in_order(sink, tmp_path, compress):
+    frame_size = len(make_handler(sink.port, tmp_path).make_frame(record(0)))
+    handler = make_handler(sink.port, tmp_path, spool_max_bytes=frame_size * 5, compress=compress)
+    handler.handle_batch([record(0)])
+    sink.messages(1)
+
+    # (b) Graylog goes away: batches land in the spool until it is full
+    port = sink.port
+    sink.stop()
+    for n in range(1, 9):
+        handler.handle_batch([record(n)])
+    stats = handler.get_stats()
+    spool = os.path.join(str(tmp_path), f"gelf-{os.getpid()}.spool")
+    assert not stats['connected']
+    assert stats['sent'] == 1
+    assert stats['spooled'] > 0 and stats['spool_dropped'] > 0
+    assert stats['spooled'] + stats['spool_dropped'] == 8
+    assert 0 < os.path.getsize(spool) <= frame_size * 5
+
+    # (c) It comes back: the spool goes out first, in order, then the new batch
+    restarted = TcpSink(port)
+    try:
+        deadline = time.monotonic() + TIMEOUT
+        while not handler.get_stats()['connected'] and time.monotonic() < deadline:
+            handler.handle_batch([record(100)])
+        messages = restarted.messages(stats['spooled'] + 1)
+    finally:
+        restarted.stop()
+        handler.close()
+
+    sequences = [m['_sequence'] for m in messages]
+    assert sequences == list(range(1, stats['spooled'] + 1)) + [100]
+    assert not os.path.exists(spool)
+    assert handler.get_stats()['replayed'] == stats['spooled']
@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+from hashing import HashingBusyError, PasswordHashingExecutor
+
+TIMEOUT = 5
+
+
+class BlockingHasher:
+    """Argon2 stand-in whose hash() holds its slot until release is set"""
+
+    def __init__(self):
+        self.started = threading.Semaphore(0)
+        self.release = threading.Event()
+
+    def hash(self, password):
+        self.started.release()
+        assert self.release.wait(TIMEOUT)
+        return f"hashed:{password}"
+
+
+@pytest.fixture
+def hasher():
+    hasher = BlockingHasher()
+    yield hasher
+    hasher.release.set()
+
+
+def start_hash(executor, results):
+    thread = threading.Thread(target=lambda: results.append(executor.hash('secret')))
+    thread.start()
+    return thread
+
+
+def test_call_beyond_the_running_limit_times_out(hasher):
+    executor = PasswordHashingExecutor(hasher, max_concurrency=1, max_queue=4, queue_timeout=0.2)
+    results = []
+    running = start_hash(executor, results)
+    assert hasher.started.acquire(timeout=TIMEOUT)
+
+    started = time.monotonic()
+    with pytest.raises(HashingBusyError) as excinfo:
+        executor.hash('next')
+    assert time.monotonic() - started >= 0.2
+    assert excinfo.value.reason == 'queue timeout'
+    assert excinfo.value.retry_after == 1
+
+    hasher.release.set()
+    running.join(TIMEOUT)
+    assert results == ['hashed:secret']
+    stats = executor.stats()
+    assert stats['rejected_timeout'] == 1
+    assert stats['completed'] == 1
+    assert stats['running'] == stats['waiting'] == 0
+
+
+def test_call_beyond_the_queue_limit_fails_fast(hasher):
+    executor = PasswordHashingExecutor(hasher, max_concurrency=1, max_queue=1, queue_timeout=TIMEOUT)
+    results = []
+    threads = [start_hash(executor, results)]
+    assert hasher.started.acquire(timeout=TIMEOUT)
+    threads.append(start_hash(executor, results))
+    deadline = time.monotonic() + TIMEOUT
+    while executor.stats()['waiting'] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    started = time.monotonic()
+    with pytest.raises(HashingBusyError) as excinfo:
+        executor.hash('next')
+    assert time.monotonic() - started < 1
+    assert excinfo.value.reason == 'queue full'
+
+    hasher.release.set()
+    for thread in threads:
+        thread.join(TIMEOUT)
+    assert results == ['hashed:secret', 'hashed:secret']
+    assert executor.stats()['rejected_queue_full'] == 1
+
+
+@pytest.fixture(scope='module')
+def flask_app(tmp_path_factory):
+    # Keep the app's shared files out of the source tree
+    shared = tmp_path_factory.mktemp('shared')
+    with pytest.MonkeyPatch.context() as env:
+        env.setenv('INVALIDATION_BUS_PATH', str(shared / 'cache-generations'))
+        env.setenv('OTP_STATUS_PATH', str(shared / 'otp-status'))
+        from app import app
+    return app
+
+
+@pytest.mark.parametrize('path, template_field', [('/login', 'password'), ('/register', 'confirm_password')])
+def test_busy_error_handler_returns_503_with_retry_after(flask_app, path, template_field):
+    with flask_app.test_request_context(path, method='POST'):
+        response = flask_app.make_response(flask_app.handle_user_exception(HashingBusyError('queue full', 3)))
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '3'
+    assert template_field.encode() in response.get_data()
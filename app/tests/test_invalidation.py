@@ -0,0 +1,187 @@
+import multiprocessing
+import os
+
+import pytest
+
+TIMEOUT = 20
+
+
+def observe(bus_path, ready, published, results):
+    from cache import VersionedResponseCache
+    from invalidation import invalidation_bus
+    invalidation_bus.open(bus_path)
+
+    listings = VersionedResponseCache(channel='report_listings')
+    calls = []
+    invalidation_bus.register('report_listings', lambda: calls.append(os.getpid()))
+    listings.get_or_compute('page', lambda: b'before')
+
+    invalidation_bus.poll()
+    quiet = (len(calls), listings.version)
+    ready.set()
+    published.wait(TIMEOUT)
+
+    invalidation_bus.poll()
+    body = listings.get_or_compute('page', lambda: b'after')
+    results.put({'quiet': quiet, 'calls': len(calls), 'version': listings.version, 'body': body})
+
+
+def publish(bus_path, ready, published):
+    from invalidation import invalidation_bus
+    invalidation_bus.open(bus_path)
+
+    ready.wait(TIMEOUT)
+    invalidation_bus.publish('report_listings')
+    published.set()
+
+
+def test_publish_in_one_worker_invalidates_another(tmp_path):
+    # spawn, so each worker opens the counter file itself as separate gunicorn workers do
+    ctx = multiprocessing.get_context('spawn')
+    bus_path = str(tmp_path / 'generations')
+    ready, published, results = ctx.Event(), ctx.Event(), ctx.Queue()
+    workers = [
+        ctx.Process(target=observe, args=(bus_path, ready, published, results)),
+        ctx.Process(target=publish, args=(bus_path, ready, published)),
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        outcome = results.get(timeout=TIMEOUT)
+    finally:
+        for worker in workers:
+            worker.join(TIMEOUT)
+
+    assert outcome['quiet'] == (0, 0)  # nothing published yet, nothing dropped
+    assert outcome['calls'] == 1
+    assert outcome['version'] == 1
+    assert outcome['body'] == b'after'
+    assert all(worker.exitcode == 0 for worker in workers)
+
+
+def observe_record(bus_path, ready, published, results):
+    from cache import RecordCache
+    from invalidation import invalidation_bus
+    invalidation_bus.open(bus_path)
+
+    loads = []
+    users = RecordCache('users', ttl=300, max_entries=100)
+
+    def load(user_id):
+        loads.append(user_id)
+        return {'user_id': user_id}
+
+    users.get(1, load)
+    users.get(2, load)
+    ready.set()
+    published.wait(TIMEOUT)
+
+    invalidation_bus.poll()
+    users.get(1, load)
+    users.get(2, load)
+    results.put(loads)
+
+
+def invalidate_record(bus_path, ready, published):
+    from cache import user_records
+    from invalidation import invalidation_bus
+    invalidation_bus.open(bus_path)
+
+    ready.wait(TIMEOUT)
+    user_records.invalidate(1)
+    published.set()
+
+
+def test_keyed_invalidation_drops_only_that_row_in_another_worker(tmp_path):
+    ctx = multiprocessing.get_context('spawn')
+    bus_path = str(tmp_path / 'generations')
+    ready, published, results = ctx.Event(), ctx.Event(), ctx.Queue()
+    workers = [
+        ctx.Process(target=observe_record, args=(bus_path, ready, published, results)),
+        ctx.Process(target=invalidate_record, args=(bus_path, ready, published)),
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        loads = results.get(timeout=TIMEOUT)
+    finally:
+        for worker in workers:
+            worker.join(TIMEOUT)
+
+    assert loads == [1, 2, 1]
+    assert all(worker.exitcode == 0 for worker in workers)
+
+
+def test_refuses_a_symlinked_or_shared_counter_file(tmp_path):
+    from invalidation import InvalidationBus
+
+    target = tmp_path / 'elsewhere'
+    target.write_bytes(b'')
+    link = tmp_path / 'generations'
+    link.symlink_to(target)
+    with pytest.raises(OSError):
+        InvalidationBus().open(str(link))
+
+    writable = tmp_path / 'writable'
+    writable.write_bytes(b'')
+    writable.chmod(0o666)
+    with pytest.raises(PermissionError):
+        InvalidationBus().open(str(writable))
+
+
+def observe_counts(bus_path, ready, published, results):
+    from cache import notification_counts
+    from invalidation import invalidation_bus
+    invalidation_bus.open(bus_path)
+
+    loads = []
+
+    def count_unread(user_id):
+        loads.append(user_id)
+        return 5
+
+    notification_counts.get(1, count_unread)
+    notification_counts.get(2, count_unread)
+    ready.set()
+    published.wait(TIMEOUT)
+
+    invalidation_bus.poll()
+    counts = [notification_counts.get(1, count_unread), notification_counts.get(2, count_unread)]
+    results.put((loads, counts))
+
+
+def mark_read(bus_path, ready, published, results):
+    from cache import notification_counts
+    from invalidation import invalidation_bus
+    invalidation_bus.open(bus_path)
+
+    notification_counts.get(1, lambda user_id: 5)
+    ready.wait(TIMEOUT)
+    notification_counts.decrement(1, 2)
+    # The writer keeps its own adjusted counter instead of recounting
+    results.put(notification_counts.get(1, lambda user_id: 0))
+    published.set()
+
+
+def test_unread_count_write_drops_that_user_in_another_worker(tmp_path):
+    ctx = multiprocessing.get_context('spawn')
+    bus_path = str(tmp_path / 'generations')
+    ready, published = ctx.Event(), ctx.Event()
+    observed, written = ctx.Queue(), ctx.Queue()
+    workers = [
+        ctx.Process(target=observe_counts, args=(bus_path, ready, published, observed)),
+        ctx.Process(target=mark_read, args=(bus_path, ready, published, written)),
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        writer_count = written.get(timeout=TIMEOUT)
+        loads, counts = observed.get(timeout=TIMEOUT)
+    finally:
+        for worker in workers:
+            worker.join(TIMEOUT)
+
+    assert writer_count == 3
+    assert loads == [1, 2, 1]
+    assert counts == [5, 5]
+    assert all(worker.exitcode == 0 for worker in workers)
@@ -0,0 +1,73 @@
+import logging
+import random
+
+import pytest
+
+import logging_config
+from logging_config import EventSampler, log_application_event, log_security_event
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def captured():
+    handler = Capture()
+    loggers = [logging.getLogger(name) for name in ('security', 'application')]
+    levels = [logger.level for logger in loggers]
+    for logger in loggers:
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+    yield handler.records
+    for logger, level in zip(loggers, levels):
+        logger.removeHandler(handler)
+        logger.setLevel(level)
+
+
+def test_token_bucket_caps_a_flood_of_one_event():
+    sampler = EventSampler({'request_received': (1.0, 10)}, report_interval=0)
+    kept = sum(sampler.allow('request_received') for _ in range(1000))
+
+    # The burst allowance, plus whatever refilled while the loop ran
+    assert 10 <= kept < 20
+    report = sampler.take_report()
+    assert report == {'request_received': {'sampled': 0, 'rate_limited': 1000 - kept}}
+    assert sampler.take_report() is None
+
+
+def test_sample_rate_keeps_that_fraction():
+    random.seed(1234)
+    sampler = EventSampler({'index_accessed': (0.25, 0)})
+    kept = sum(sampler.allow('index_accessed') for _ in range(4000))
+    assert 850 < kept < 1150
+
+
+def test_events_without_a_rule_are_always_kept():
+    sampler = EventSampler({'request_received': (0.0, 1)})
+    assert all(sampler.allow('report_submitted') for _ in range(1000))
+
+
+def test_flood_of_info_events_is_limited_but_security_and_warnings_are_not(monkeypatch, captured):
+    rules = {'request_received': (1.0, 5), 'login_failed': (0.0, 1)}
+    monkeypatch.setattr(logging_config, '_sampler', EventSampler(rules, report_interval=3600))
+
+    for _ in range(200):
+        log_application_event('request_received')
+        log_application_event('request_received', level='warning')
+        # Even with a rule naming it, a security event is never sampled
+        log_security_event('login_failed', user_id=1)
+
+    info = [r for r in captured if r.name == 'application' and r.levelno == logging.INFO]
+    warnings = [r for r in captured if r.name == 'application' and r.levelno == logging.WARNING]
+    security = [r for r in captured if r.name == 'security']
+    assert 5 <= len(info) < 15
+    assert all(r.sample_rate == 1.0 for r in info)
+    assert len(warnings) == 200
+    assert len(security) == 200
+
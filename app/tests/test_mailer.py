@@ -0,0 +1,112 @@
+import socket
+import time
+from email.mime.text import MIMEText
+
+import pytest
+
+pytest.importorskip('aiosmtpd')
+from aiosmtpd.controller import Controller  # noqa: E402
+
+from mailer import SMTPPool  # noqa: E402
+
+
+class SinkHandler:
+    """SMTP server stand-in that records each session's EHLO, messages and QUIT"""
+
+    def __init__(self):
+        self.ehlos = 0
+        self.quits = 0
+        self.messages = []
+        self.reject_noop = False
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.ehlos += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_NOOP(self, server, session, envelope, arg):
+        return '421 Closing the session' if self.reject_noop else '250 OK'
+
+    async def handle_QUIT(self, server, session, envelope):
+        self.quits += 1
+        return '221 Bye'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope.content)
+        return '250 OK'
+
+
+@pytest.fixture
+def sink():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    handler = SinkHandler()
+    controller = Controller(handler, hostname='127.0.0.1', port=port)
+    controller.start()
+    yield handler, port
+    controller.stop()
+
+
+def message(n):
+    msg = MIMEText(f"message {n}")
+    msg['From'] = 'sender@example.invalid'
+    msg['To'] = f"user{n}@example.invalid"
+    msg['Subject'] = f"Test {n}"
+    return msg
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_sends_reuse_one_session(sink):
+    handler, port = sink
+    pool = SMTPPool('127.0.0.1', port, starttls=False, size=2, timeout=5)
+    for n in range(3):
+        pool.send(message(n))
+    assert pool.send_many([message(3), message(4)]) == [None, None]
+
+    assert len(handler.messages) == 5
+    assert handler.ehlos == 1
+    stats = pool.stats()
+    assert stats['sessions_opened'] == 1
+    assert stats['messages_sent'] == 5
+    assert stats['idle'] == 1
+    pool.close()
+
+
+def test_session_failing_noop_is_replaced(sink):
+    handler, port = sink
+    pool = SMTPPool('127.0.0.1', port, starttls=False, timeout=5, noop_interval=0)
+    pool.send(message(0))
+    handler.reject_noop = True
+    time.sleep(0.01)  # idle past noop_interval, so the next send checks the session
+
+    pool.send(message(1))
+
+    assert len(handler.messages) == 2
+    assert handler.ehlos == 2
+    stats = pool.stats()
+    assert stats['noop_failures'] == 1
+    assert stats['sessions_opened'] == 2
+    assert stats['sessions_closed'] == 1
+    assert stats['send_failures'] == 0
+    pool.close()
+
+
+def test_close_quits_idle_sessions(sink):
+    handler, port = sink
+    pool = SMTPPool('127.0.0.1', port, starttls=False, size=2, timeout=5)
+    assert pool.send_many([message(0)]) == [None]
+    assert pool.stats()['idle'] == 1
+
+    pool.close()
+
+    stats = pool.stats()
+    assert stats['idle'] == 0
+    assert stats['sessions_closed'] == 1
+    assert wait_for(lambda: handler.quits == 1)
@@ -0,0 +1,59 @@
+import multiprocessing
+import time
+
+import pytest
+
+TIMEOUT = 20
+
+
+def send_otp(status_path, release, ids, done):
+    from otp_delivery import OTPDeliveryQueue, SharedStatusTable
+
+    statuses = SharedStatusTable()
+    statuses.open(status_path)
+    deliveries = OTPDeliveryQueue(workers=1, max_pending=1, statuses=statuses)
+    ids.put(deliveries.submit(release.wait, TIMEOUT))
+    done.wait(TIMEOUT)
+
+
+def test_status_set_in_one_worker_is_read_in_another(tmp_path):
+    from otp_delivery import SENDING, SENT, UNKNOWN, SharedStatusTable
+
+    # spawn, so the sender maps the table file itself as a separate gunicorn worker does
+    ctx = multiprocessing.get_context('spawn')
+    status_path = str(tmp_path / 'otp-status')
+    release, done, ids = ctx.Event(), ctx.Event(), ctx.Queue()
+    sender = ctx.Process(target=send_otp, args=(status_path, release, ids, done))
+    sender.start()
+    try:
+        delivery_id = ids.get(timeout=TIMEOUT)
+        statuses = SharedStatusTable()
+        statuses.open(status_path)
+        assert wait_for_status(statuses, delivery_id, SENDING)
+        release.set()
+        assert wait_for_status(statuses, delivery_id, SENT)
+        assert statuses.get('never-submitted') == UNKNOWN
+    finally:
+        release.set()
+        done.set()
+        sender.join(TIMEOUT)
+    assert sender.exitcode == 0
+
+
+def wait_for_status(statuses, delivery_id, expected):
+    deadline = time.monotonic() + TIMEOUT
+    while time.monotonic() < deadline:
+        if statuses.get(delivery_id) == expected:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_refuses_a_status_file_writable_by_others(tmp_path):
+    from otp_delivery import SharedStatusTable
+
+    shared = tmp_path / 'otp-status'
+    shared.write_bytes(b'')
+    shared.chmod(0o622)
+    with pytest.raises(PermissionError):
+        SharedStatusTable().open(str(shared))
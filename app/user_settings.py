@@ -1,27 +1,15 @@
 from flask import Blueprint, request, jsonify, session, current_app
-import mysql.connector
-import smtplib
+from db import get_db_connection
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from threading import Thread
 from access_control import permission_required
 from flask_wtf.csrf import validate_csrf
 from wtforms.validators import ValidationError
 from extensions import limiter
+from reference_data import CATEGORY_PREFERENCE_FIELDS
 
 settings_bp = Blueprint('settings', __name__)
 
-# ===== DATABASE HELPER FUNCTIONS =====
-
-def get_db_connection():
-    """Get MySQL database connection using app config"""
-    return mysql.connector.connect(
-        host=current_app.config['MYSQL_HOST'],
-        user=current_app.config['MYSQL_USER'],
-        password=current_app.config['MYSQL_PASSWORD'],
-        database=current_app.config['MYSQL_DB']
-    )
-
 # ===== ROUTES =====
 
 @settings_bp.route('/api/settings', methods=['GET'])
@@ -161,171 +149,65 @@ def update_settings():
 
 # ===== NOTIFICATION SYSTEM =====
 
-def send_notifications_for_new_report(report_id, report_title, report_description, report_category_name, report_user_id):
-    """Send notifications to users who have enabled notifications for this report category"""
-    current_app.logger.info(f"\n=== STARTING NOTIFICATION PROCESS ===")
-    current_app.logger.info(f"Report ID: {report_id}, Category: {report_category_name}, Submitted by: {report_user_id}")
-    
-    # Map display names to preference field names
-    category_mapping = {
-        'Fires': 'fire_hazard',
-        'Faulty Facilities/Equipment': 'faulty_equipment',
-        'Vandalism': 'vandalism',
-        'Suspicious Activity': 'suspicious_activity',
-        'Others': 'other_incident'
-    }
-    
-    preference_field = category_mapping.get(report_category_name)
+def create_user_notifications(cursor, report_id, report_title, report_category_name, report_user_id):
+    """Insert in-app notifications for every subscriber of the report's category.
+
+    Runs one set-based INSERT ... SELECT however many subscribers there are,
+    then returns the notified users (user_id, username, email) for the email
+    fan-out. The caller owns the transaction.
+    """
+    preference_field = CATEGORY_PREFERENCE_FIELDS.get(report_category_name)
     if not preference_field:
         current_app.logger.error(f"Unknown report category: {report_category_name}")
-        current_app.logger.info("Available categories: %s", list(category_mapping.keys()))
-        return
-    
-    current_app.logger.info(f"Using preference field: {preference_field}")
-    
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # Get users who want notifications for this category AND have email notifications enabled
-        query = f'''
-            SELECT u.user_id, u.username, u.email, up.*
-            FROM users u
-            JOIN user_preferences up ON u.user_id = up.user_id
-            WHERE up.{preference_field} = 1 
-            AND up.email_notifications = 1
-            AND u.user_id != %s
-        '''
-        
-        current_app.logger.info("Executing query:\n%s\nWith params: %s", query, (report_user_id,))
-        cursor.execute(query, (report_user_id,))
-        users_to_notify = cursor.fetchall()
-        
-        current_app.logger.info(f"Found {len(users_to_notify)} users to notify")
-        
-        if not users_to_notify:
-            current_app.logger.info("No users found with notifications enabled for this category")
-            return
-            
-        for user in users_to_notify:
-            current_app.logger.info(f"Processing user {user['user_id']} ({user['email']})")
-            
-            # Create in-app notification
-            try:
-                cursor.execute('''
-                    INSERT INTO notification (user_id, report_id, message, is_read, created_at)
-                    VALUES (%s, %s, %s, 0, NOW())
-                ''', (
-                    user['user_id'],
-                    report_id,
-                    f"New {report_category_name} report: {report_title}"
-                ))
-                current_app.logger.info("Created in-app notification")
-            except Exception as e:
-                current_app.logger.error(f"Failed to create in-app notification: {str(e)}")
-                continue
-                
-            # Send email notification
-            if user['email_notifications'] and user['email']:
-                current_app.logger.info(f"Preparing email to {user['email']}")
-                try:
-                    app = current_app._get_current_object()
-                    thread = Thread(
-                        target=send_email_notification_with_context,
-                        args=(app, user['email'], user['username'], report_id, report_title, report_description, report_category_name)
-                    )
-                    thread.daemon = True
-                    thread.start()
-                    current_app.logger.info("Email thread started successfully")
-                except Exception as e:
-                    current_app.logger.error(f"Failed to start email thread: {str(e)}")
-            else:
-                current_app.logger.info("Email notifications disabled or no email address for user")
-        
-        conn.commit()
-        current_app.logger.info("Database changes committed")
-        
-    except Exception as e:
-        current_app.logger.error(f"Error in notification process: {str(e)}")
-    finally:
-        try:
-            if 'cursor' in locals():
-                cursor.close()
-            if 'conn' in locals() and conn.is_connected():
-                conn.close()
-        except Exception as e:
-            current_app.logger.error(f"Error closing DB connection: {str(e)}")
-        
-    current_app.logger.info("=== NOTIFICATION PROCESS COMPLETE ===\n")
+        return []
 
-def send_email_notification_with_context(app, email, username, report_id, report_title, report_description, report_category):
-    """Send email notification with app context"""
-    with app.app_context():
-        send_email_notification(email, username, report_id, report_title, report_description, report_category)
+    # preference_field comes from the fixed mapping in reference_data, never from input
+    audience = f'''
+        FROM users u
+        JOIN user_preferences up ON u.user_id = up.user_id
+        WHERE up.{preference_field} = 1
+        AND up.email_notifications = 1
+        AND u.user_id != %s
+    '''
+    cursor.execute(f'''
+        INSERT INTO notification (user_id, report_id, message, is_read, created_at)
+        SELECT u.user_id, %s, %s, 0, NOW()
+        {audience}
+    ''', (report_id, f"New {report_category_name} report: {report_title}", report_user_id))
 
-def send_email_notification(email, username, report_id, report_title, report_description, report_category):
-    """Send email notification to user"""
-    current_app.logger.info(f"\n=== STARTING EMAIL PROCESS ===")
-    current_app.logger.info(f"Preparing email to: {email}")
-    
-    try:
-        SMTP_SERVER = current_app.config.get('SMTP_SERVER', 'smtp.gmail.com')
-        SMTP_PORT = current_app.config.get('SMTP_PORT', 587)
-        SENDER_EMAIL = current_app.config.get('SENDER_EMAIL', 'sitsecure.notifications@gmail.com')
-        SENDER_PASSWORD = current_app.config.get('SENDER_PASSWORD', 'your-app-password')
-        APP_NAME = current_app.config.get('APP_NAME', 'SITSecure')
-        
-        current_app.logger.info(f"SMTP Server: {SMTP_SERVER}:{SMTP_PORT}")
-        current_app.logger.info(f"Sender: {SENDER_EMAIL}")
-        current_app.logger.info(f"Password configured: {'Yes' if SENDER_PASSWORD else 'No'}")
-        
-        msg = MIMEMultipart()
-        msg['From'] = f"{APP_NAME} <{SENDER_EMAIL}>"
-        msg['To'] = email
-        msg['Subject'] = f"🔔 New {report_category} Report Alert"
+    if not cursor.rowcount:
+        return []
+    cursor.execute(f"SELECT u.user_id, u.username, u.email {audience}", (report_user_id,))
+    return cursor.fetchall()
 
-        # Create HTML version
-        html = f"""
-        <html>
-        <body>
-            <p>Hi {username},</p>
-            <p>A new <strong>{report_category}</strong> report has been submitted:</p>
-            <h3>{report_title}</h3>
-            <p>{report_description}</p>
-            <p>
-                <a href="{current_app.config.get('BASE_URL', 'https://wesitsecure.zapto.org/login')}">
-                    View Report
-                </a>
-            </p>
-        </body>
-        </html>
-        """
 
-        # Attach message
-        msg.attach(MIMEText(html, 'html'))
+def build_email_notification(email, username, report_id, report_title, report_description, report_category):
+    """Build the new-report email for a user; sent later by the outbox worker"""
+    SENDER_EMAIL = current_app.config.get('SENDER_EMAIL', 'sitsecure.notifications@gmail.com')
+    APP_NAME = current_app.config.get('APP_NAME', 'SITSecure')
 
-        # Send email
-        try:
-            with smtplib.SMTP(current_app.config.get('SMTP_SERVER'), 
-                            current_app.config.get('SMTP_PORT')) as server:
-                server.starttls()
-                server.login(current_app.config.get('SENDER_EMAIL'), 
-                            current_app.config.get('SENDER_PASSWORD'))
-                server.send_message(msg)
-            current_app.logger.info(f"Email sent to {email}")
-        except Exception as e:
-            current_app.logger.error(f"Email failed to {email}: {str(e)}")
-            raise  
-        
-    except smtplib.SMTPAuthenticationError as e:
-        current_app.logger.error(f"SMTP Authentication failed: {str(e)}")
-        current_app.logger.error("Please verify:")
-        current_app.logger.error("1. SENDER_EMAIL is correct")
-        current_app.logger.error("2. SENDER_PASSWORD is an App Password (not regular password)")
-        current_app.logger.error("3. Less secure apps access is enabled if required")
-    except smtplib.SMTPException as e:
-        current_app.logger.error(f"SMTP Protocol error: {str(e)}")
-    except Exception as e:
-        current_app.logger.error(f"Unexpected error sending email: {str(e)}")
-    finally:
-        current_app.logger.info("=== EMAIL PROCESS COMPLETE ===\n")
\ No newline at end of file
+    msg = MIMEMultipart()
+    msg['From'] = f"{APP_NAME} <{SENDER_EMAIL}>"
+    msg['To'] = email
+    msg['Subject'] = f"🔔 New {report_category} Report Alert"
+
+    # Create HTML version
+    html = f"""
+    <html>
+    <body>
+        <p>Hi {username},</p>
+        <p>A new <strong>{report_category}</strong> report has been submitted:</p>
+        <h3>{report_title}</h3>
+        <p>{report_description}</p>
+        <p>
+            <a href="{current_app.config.get('BASE_URL', 'https://wesitsecure.zapto.org/login')}">
+                View Report
+            </a>
+        </p>
+    </body>
+    </html>
+    """
+
+    # Attach message
+    msg.attach(MIMEText(html, 'html'))
+    return msg
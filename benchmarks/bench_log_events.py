@@ -0,0 +1,166 @@
+"""Micro-benchmark: cost of the log_*_event helpers on the request thread.
+
+Compares the original helpers (copied below as legacy_*) with the current
+ones in app/logging_config.py, for a typical security event with request
+data and an application event with a small details dict. Records go to a
+no-op handler, so only event building and logging overhead is measured.
+A second pass turns the loggers off to show the cost of a disabled event.
+
+Usage:
+    python benchmarks/bench_log_events.py --events 200000
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import socket
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+import logging_config  # noqa: E402
+
+
+# ---- Original implementation, kept verbatim as the baseline ----
+
+def legacy_sanitize_log_input(value):
+    if value is None:
+        return None
+    value_str = str(value)
+    value_str = re.sub(r'[\r\n\t\x00-\x1f\x7f-\x9f]', '', value_str)
+    return value_str
+
+
+def legacy_sanitize_dict(data, sanitize_keys=False):
+    if data is None:
+        return None
+    if isinstance(data, dict):
+        result = {}
+        for key, value in data.items():
+            safe_key = legacy_sanitize_log_input(str(key)) if sanitize_keys else key
+            result[safe_key] = legacy_sanitize_dict(value, sanitize_keys)
+        return result
+    elif isinstance(data, list):
+        return [legacy_sanitize_dict(item, sanitize_keys) for item in data]
+    elif isinstance(data, str):
+        return legacy_sanitize_log_input(data)
+    else:
+        return legacy_sanitize_log_input(str(data))
+
+
+def legacy_log_security_event(event_type, user_id=None, details=None, request=None):
+    logger = logging.getLogger("security")
+    safe_event_type = legacy_sanitize_log_input(event_type)
+    safe_user_id = legacy_sanitize_log_input(user_id) if user_id else None
+    safe_details = legacy_sanitize_dict(details, sanitize_keys=True) if details else {}
+    log_data = {
+        "event_type": safe_event_type,
+        "timestamp": datetime.now().isoformat(),
+        "user_id": safe_user_id,
+        "details": safe_details,
+        "hostname": socket.gethostname()
+    }
+    safe_request_data = {}
+    if request:
+        try:
+            safe_request_data = {
+                'ip_address': legacy_sanitize_log_input(str(request.remote_addr)) if hasattr(request, 'remote_addr') and request.remote_addr else None,
+                'user_agent': legacy_sanitize_log_input(str(request.headers.get('User-Agent', ''))) if hasattr(request, 'headers') else None,
+                'method': legacy_sanitize_log_input(str(request.method)) if hasattr(request, 'method') and request.method else None,
+                'path': legacy_sanitize_log_input(str(request.path)) if hasattr(request, 'path') and request.path else None,
+                'referrer': legacy_sanitize_log_input(str(request.referrer)) if hasattr(request, 'referrer') and request.referrer else None
+            }
+        except Exception:
+            safe_request_data = {'error': 'Failed to parse request data'}
+        log_data.update({
+            "ip_address": safe_request_data.get('ip_address'),
+            "user_agent": safe_request_data.get('user_agent'),
+            "method": safe_request_data.get('method'),
+            "path": safe_request_data.get('path'),
+            "referrer": safe_request_data.get('referrer')
+        })
+    extra_data = {'event_type': safe_event_type, 'user_id': safe_user_id, 'details': safe_details}
+    if request:
+        extra_data['request_data'] = safe_request_data
+    logger.info("Security event: %s", safe_event_type, extra=extra_data)
+
+
+def legacy_log_application_event(event_type, level="info", details=None, user_id=None):
+    logger = logging.getLogger("application")
+    safe_event_type = legacy_sanitize_log_input(event_type)
+    safe_user_id = legacy_sanitize_log_input(user_id) if user_id else None
+    safe_details = legacy_sanitize_dict(details, sanitize_keys=True) if details else {}
+    log_data = {  # noqa: F841 - unused in the original too
+        "event_type": safe_event_type,
+        "timestamp": datetime.now().isoformat(),
+        "user_id": safe_user_id,
+        "details": safe_details,
+        "hostname": socket.gethostname()
+    }
+    valid_levels = ['debug', 'info', 'warning', 'error', 'critical']
+    safe_level = level.lower() if level and level.lower() in valid_levels else 'info'
+    log_method = getattr(logger, safe_level, logger.info)
+    log_method("Application event: %s", safe_event_type, extra={
+        'event_type': safe_event_type, 'user_id': safe_user_id, 'details': safe_details})
+
+
+# ---- Harness ----
+
+class FakeRequest:
+    remote_addr = '203.0.113.7'
+    headers = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/126.0 Safari/537.36'}
+    method = 'POST'
+    path = '/login'
+    referrer = 'https://example.org/login'
+
+
+SECURITY_DETAILS = {'username': 'alice', 'user_id': 42, 'attempts': 3}
+APPLICATION_DETAILS = {'method': 'GET', 'path': '/api/reports', 'status': 200, 'duration_ms': 12.5,
+                       'remote_addr': '203.0.113.7'}
+
+
+def run(security, application, events):
+    request = FakeRequest()
+    started = time.perf_counter()
+    for i in range(events // 2):
+        security("login_successful", user_id=42, details=SECURITY_DETAILS, request=request)
+        application("request_received", details=APPLICATION_DETAILS, user_id=42)
+    return events / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=200_000)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    for name in ('security', 'application'):
+        logger = logging.getLogger(name)
+        logger.handlers = [logging.NullHandler()]
+        logger.propagate = False
+
+    results = {}
+    for label, level in (('enabled', logging.INFO), ('disabled', logging.WARNING)):
+        for name in ('security', 'application'):
+            logging.getLogger(name).setLevel(level)
+        results[label] = {
+            'legacy_events_per_sec': round(run(legacy_log_security_event, legacy_log_application_event, args.events)),
+            'current_events_per_sec': round(run(logging_config.log_security_event,
+                                                logging_config.log_application_event, args.events)),
+        }
+
+    print(f"\n{args.events:,} events (half security with request data, half application)")
+    print(f"{'loggers':<10}{'legacy ev/s':>14}{'current ev/s':>15}{'speedup':>10}")
+    for label, r in results.items():
+        print(f"{label:<10}{r['legacy_events_per_sec']:>14,}{r['current_events_per_sec']:>15,}"
+              f"{r['current_events_per_sec'] / r['legacy_events_per_sec']:>9.1f}x")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
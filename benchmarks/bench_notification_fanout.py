@@ -0,0 +1,171 @@
+"""Report submission throughput vs. number of notification subscribers.
+
+Creates scratch users named `bench_fanout_<n>` subscribed to "Fires", then
+for each subscriber tier submits reports and fans them out with:
+
+  * loop     - the old approach: SELECT every subscriber, then one
+               INSERT INTO notification per subscriber
+  * set      - create_user_notifications/create_admin_notifications: one
+               INSERT ... SELECT per audience, committed together
+
+Each submission inserts the report and its notifications and commits, as
+submit_report does; emails are not sent. Subscribers that already exist in
+the database are notified too, so run against a scratch database for clean
+numbers. Bench users, their reports and notifications are deleted at the end.
+
+Usage (against the docker-compose MySQL on port 3307):
+    MYSQL_HOST=127.0.0.1 MYSQL_PORT=3307 MYSQL_USER=... MYSQL_PASSWORD=... \\
+        python benchmarks/bench_notification_fanout.py --tiers 10 100 1000 10000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import mysql.connector
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+from user_settings import create_user_notifications  # noqa: E402
+from admin_settings import create_admin_notifications  # noqa: E402
+
+CATEGORY = 'Fires'
+USER_PREFIX = 'bench_fanout_'
+
+
+def connect():
+    return mysql.connector.connect(
+        host=os.getenv('MYSQL_HOST', '127.0.0.1'),
+        port=int(os.getenv('MYSQL_PORT', 3307)),
+        user=os.getenv('MYSQL_USER', 'root'),
+        password=os.getenv('MYSQL_PASSWORD', ''),
+        database=os.getenv('MYSQL_DB', 'flask_db'),
+        buffered=True,
+    )
+
+
+def ensure_subscribers(conn, count, batch_size=1000):
+    """Grow the bench subscriber set to `count` users; returns the author id"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM users WHERE username LIKE %s", (USER_PREFIX + '%',))
+    existing = cursor.fetchone()[0]
+    for offset in range(existing, count + 1, batch_size):
+        names = [f"{USER_PREFIX}{n}" for n in range(offset, min(offset + batch_size, count + 1))]
+        cursor.executemany(
+            "INSERT INTO users (username, pwd, email, verified, role) VALUES (%s, '!', %s, 1, 'user')",
+            [(name, f"{name}@bench.invalid") for name in names])
+        cursor.execute("""
+            INSERT INTO user_preferences (user_id, fire_hazard, email_notifications)
+            SELECT user_id, 1, 1 FROM users
+            WHERE username LIKE %s
+            AND user_id NOT IN (SELECT user_id FROM user_preferences)
+        """, (USER_PREFIX + '%',))
+        conn.commit()
+    # bench_fanout_0 submits the reports, so it is never notified itself
+    cursor.execute("SELECT user_id FROM users WHERE username = %s", (USER_PREFIX + '0',))
+    author_id = cursor.fetchone()[0]
+    cursor.close()
+    return author_id
+
+
+def insert_report(cursor, author_id):
+    cursor.execute("""
+        INSERT INTO reports (user_id, category_name, is_anonymous, title, description)
+        VALUES (%s, %s, 0, 'Bench fan-out', 'Synthetic report for bench_notification_fanout')
+    """, (author_id, CATEGORY))
+    return cursor.lastrowid
+
+
+def submit_loop(conn, author_id):
+    cursor = conn.cursor(dictionary=True)
+    report_id = insert_report(cursor, author_id)
+    message = f"New {CATEGORY} report: Bench fan-out"
+    for query in ("""
+            SELECT u.user_id, u.username, u.email, up.* FROM users u
+            JOIN user_preferences up ON u.user_id = up.user_id
+            WHERE up.fire_hazard = 1 AND up.email_notifications = 1 AND u.user_id != %s
+        """, """
+            SELECT u.user_id, u.username, u.email, up.* FROM users u
+            JOIN admin_preferences up ON u.user_id = up.user_id
+            WHERE u.role = 'admin' AND up.email_notifications = 1 AND u.user_id != %s
+        """):
+        cursor.execute(query, (author_id,))
+        for user in cursor.fetchall():
+            cursor.execute("""
+                INSERT INTO notification (user_id, report_id, message, is_read, created_at)
+                VALUES (%s, %s, %s, 0, NOW())
+            """, (user['user_id'], report_id, message))
+    conn.commit()
+    cursor.close()
+
+
+def submit_set(conn, author_id):
+    cursor = conn.cursor(dictionary=True)
+    report_id = insert_report(cursor, author_id)
+    create_user_notifications(cursor, report_id, 'Bench fan-out', CATEGORY, author_id)
+    create_admin_notifications(cursor, report_id, 'Bench fan-out', CATEGORY, author_id)
+    conn.commit()
+    cursor.close()
+
+
+def throughput(fn, conn, author_id, submissions):
+    started = time.perf_counter()
+    for _ in range(submissions):
+        fn(conn, author_id)
+    elapsed = time.perf_counter() - started
+    return {
+        'submissions': submissions,
+        'seconds': round(elapsed, 3),
+        'submissions_per_sec': round(submissions / elapsed, 2),
+    }
+
+
+def cleanup(conn):
+    cursor = conn.cursor()
+    # notification rows cascade from reports; preferences cascade from users
+    cursor.execute("""
+        DELETE r FROM reports r JOIN users u ON r.user_id = u.user_id
+        WHERE u.username LIKE %s
+    """, (USER_PREFIX + '%',))
+    cursor.execute("DELETE FROM users WHERE username LIKE %s", (USER_PREFIX + '%',))
+    conn.commit()
+    cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tiers', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument('--submissions', type=int, default=20, help='reports submitted per tier and approach')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--keep', action='store_true', help='keep bench users and reports afterwards')
+    args = parser.parse_args()
+
+    conn = connect()
+    results = {'category': CATEGORY, 'tiers': {}}
+    try:
+        # The helpers log through current_app
+        with Flask(__name__).app_context():
+            for tier in sorted(args.tiers):
+                author_id = ensure_subscribers(conn, tier)
+                results['tiers'][tier] = {
+                    'loop': throughput(submit_loop, conn, author_id, args.submissions),
+                    'set': throughput(submit_set, conn, author_id, args.submissions),
+                }
+    finally:
+        if not args.keep:
+            cleanup(conn)
+        conn.close()
+
+    print(f"\n{'subscribers':>12}{'loop subm/s':>14}{'set subm/s':>14}{'speedup':>10}")
+    for tier, r in results['tiers'].items():
+        loop, bulk = r['loop']['submissions_per_sec'], r['set']['submissions_per_sec']
+        print(f"{tier:>12,}{loop:>14.1f}{bulk:>14.1f}{bulk / loop:>9.1f}x")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
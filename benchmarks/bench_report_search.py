@@ -0,0 +1,170 @@
+"""Report search latency: FULLTEXT search vs. loading every report.
+
+Seeds a scratch `bench_reports` table (same shape as `reports`, plus the
+FULLTEXT index from sql_import/report_search_fulltext.sql) with synthetic
+rows, then times:
+
+  * load-all  - the old approach: SELECT every report and substring-filter
+                in Python (what the admin page did in the browser)
+  * fulltext  - one page of the MATCH ... AGAINST query used by
+                /api/reports/search
+
+Usage (against the docker-compose MySQL on port 3307):
+    MYSQL_HOST=127.0.0.1 MYSQL_PORT=3307 MYSQL_USER=... MYSQL_PASSWORD=... \\
+        python benchmarks/bench_report_search.py --rows 1000000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+import mysql.connector
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+from admin_dashboard import to_boolean_query  # noqa: E402
+
+WORDS = ("fire alarm smoke corridor lift broken door window glass light flicker leak water pipe "
+         "ceiling toilet graffiti wall bench stolen bicycle suspicious person loitering carpark "
+         "stairwell projector aircon noise cable socket sparks laboratory library canteen").split()
+CATEGORIES = ["Fires", "Faulty Facilities/Equipment", "Vandalism", "Suspicious Activity", "Others"]
+QUERIES = ["fire alarm", "broken door", "water leak ceiling", "graffiti", "suspicious carpark"]
+
+
+def connect():
+    return mysql.connector.connect(
+        host=os.getenv('MYSQL_HOST', '127.0.0.1'),
+        port=int(os.getenv('MYSQL_PORT', 3307)),
+        user=os.getenv('MYSQL_USER', 'root'),
+        password=os.getenv('MYSQL_PASSWORD', ''),
+        database=os.getenv('MYSQL_DB', 'flask_db'),
+    )
+
+
+def seed(conn, rows, batch_size=5000):
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS bench_reports (
+          report_id int NOT NULL AUTO_INCREMENT,
+          user_id int DEFAULT NULL,
+          status_id int NOT NULL DEFAULT '1',
+          category_name varchar(50) NOT NULL,
+          is_anonymous tinyint NOT NULL DEFAULT '0',
+          title varchar(255) NOT NULL,
+          description text NOT NULL,
+          created_at timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+          PRIMARY KEY (report_id)
+        ) ENGINE=InnoDB
+    """)
+    cursor.execute("SELECT COUNT(*) FROM bench_reports")
+    existing = cursor.fetchone()[0]
+    if existing >= rows:
+        print(f"bench_reports already has {existing} rows")
+        return
+
+    rng = random.Random(42)
+    print(f"Seeding {rows - existing} rows...")
+    started = time.perf_counter()
+    for offset in range(existing, rows, batch_size):
+        count = min(batch_size, rows - offset)
+        values = [(
+            rng.randint(1, 5000),
+            rng.randint(1, 5),
+            rng.choice(CATEGORIES),
+            int(rng.random() < 0.2),
+            " ".join(rng.choices(WORDS, k=rng.randint(3, 8))),
+            " ".join(rng.choices(WORDS, k=rng.randint(15, 60))),
+        ) for _ in range(count)]
+        cursor.executemany(
+            "INSERT INTO bench_reports (user_id, status_id, category_name, is_anonymous, title, description) "
+            "VALUES (%s, %s, %s, %s, %s, %s)", values)
+        conn.commit()
+    print(f"Seeded in {time.perf_counter() - started:.1f}s; building FULLTEXT index...")
+
+    cursor.execute("SHOW INDEX FROM bench_reports WHERE Key_name = 'ft_bench_title_description'")
+    if not cursor.fetchall():
+        cursor.execute("ALTER TABLE bench_reports ADD FULLTEXT KEY ft_bench_title_description (title, description)")
+    cursor.close()
+
+
+def time_runs(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def load_all(conn, query):
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT report_id, title, description, category_name, is_anonymous, created_at FROM bench_reports")
+    needle = query.lower()
+    matches = [r for r in cursor.fetchall() if needle in r['title'].lower()]
+    cursor.close()
+    return matches
+
+
+def fulltext(conn, query, limit=20):
+    boolean_query = to_boolean_query(query)
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT report_id, title, category_name, created_at,
+               MATCH(title, description) AGAINST (%s IN BOOLEAN MODE) AS relevance
+        FROM bench_reports
+        WHERE MATCH(title, description) AGAINST (%s IN BOOLEAN MODE)
+        ORDER BY relevance DESC, report_id DESC
+        LIMIT %s
+    """, (boolean_query, boolean_query, limit))
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def summarise(samples):
+    ordered = sorted(samples)
+    return {
+        'runs': len(samples),
+        'p50_ms': round(statistics.median(ordered), 2),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        'max_ms': round(ordered[-1], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--runs', type=int, default=50, help='runs per query for the FULLTEXT search')
+    parser.add_argument('--baseline-runs', type=int, default=3, help='runs per query for load-all')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--drop', action='store_true', help='drop bench_reports afterwards')
+    args = parser.parse_args()
+
+    conn = connect()
+    seed(conn, args.rows)
+
+    results = {'rows': args.rows, 'queries': {}}
+    for query in QUERIES:
+        results['queries'][query] = {
+            'load_all': summarise(time_runs(lambda: load_all(conn, query), args.baseline_runs)),
+            'fulltext': summarise(time_runs(lambda: fulltext(conn, query), args.runs)),
+        }
+
+    print(f"\n{args.rows:,} reports")
+    print(f"{'query':<22}{'load-all p50':>14}{'fulltext p50':>14}{'fulltext p95':>14}")
+    for query, r in results['queries'].items():
+        print(f"{query:<22}{r['load_all']['p50_ms']:>12.1f}ms{r['fulltext']['p50_ms']:>12.1f}ms"
+              f"{r['fulltext']['p95_ms']:>12.1f}ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.drop:
+        conn.cursor().execute("DROP TABLE bench_reports")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""SMTP throughput: a fresh session per message vs. the pooled sessions in app/mailer.py.
+
+Starts a local aiosmtpd sink that accepts and discards everything, then
+sends the same messages with:
+
+  * fresh   - the old approach: connect, EHLO, (STARTTLS, LOGIN), send, QUIT
+              for every message
+  * pooled  - SMTPPool.send_many, one chunk per sender thread
+
+A local sink has no TLS or auth, so --handshake-ms adds a delay to every
+EHLO to stand in for the STARTTLS + LOGIN round trips of a real provider
+(~150-400ms against smtp.gmail.com). --host/--port point the run at an
+existing server instead of the built-in sink.
+
+Usage:
+    pip install aiosmtpd
+    python benchmarks/bench_smtp_pool.py --messages 500 --concurrency 1 4 8 --handshake-ms 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import smtplib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+from mailer import SMTPPool  # noqa: E402
+
+
+class SinkHandler:
+    def __init__(self, handshake_ms):
+        self.handshake = handshake_ms / 1000
+        self.received = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        if self.handshake:
+            await asyncio.sleep(self.handshake)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return '250 OK'
+
+
+def start_sink(port, handshake_ms):
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        sys.exit("aiosmtpd is required for the built-in sink: pip install aiosmtpd")
+    handler = SinkHandler(handshake_ms)
+    controller = Controller(handler, hostname='127.0.0.1', port=port)
+    controller.start()
+    return controller, handler
+
+
+def make_messages(count):
+    messages = []
+    for i in range(count):
+        msg = MIMEText(f"<p>Benchmark message {i}</p>", 'html')
+        msg['From'] = 'bench@example.invalid'
+        msg['To'] = f"user{i}@example.invalid"
+        msg['Subject'] = f"Bench {i}"
+        messages.append(msg)
+    return messages
+
+
+def send_fresh(host, port, messages, concurrency):
+    def send_one(msg):
+        with smtplib.SMTP(host, port, timeout=30) as server:
+            server.ehlo()
+            server.send_message(msg)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send_one, messages))
+
+
+def send_pooled(host, port, messages, concurrency):
+    pool = SMTPPool(host, port, starttls=False, size=concurrency, max_messages=len(messages) + 1)
+    chunks = [messages[i::concurrency] for i in range(concurrency)]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = [error for chunk in executor.map(pool.send_many, chunks) for error in chunk]
+    pool.close()
+    failures = [e for e in results if e is not None]
+    if failures:
+        raise failures[0]
+    return pool.stats()
+
+
+def measure(fn, *args):
+    started = time.perf_counter()
+    extra = fn(*args)
+    elapsed = time.perf_counter() - started
+    return elapsed, extra
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--handshake-ms', type=float, default=100,
+                        help='delay added to every EHLO by the built-in sink')
+    parser.add_argument('--host', help='send to this server instead of the built-in sink')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    controller = None
+    host = args.host
+    if host is None:
+        controller, _ = start_sink(args.port, args.handshake_ms)
+        host = '127.0.0.1'
+
+    messages = make_messages(args.messages)
+    results = {'messages': args.messages, 'handshake_ms': args.handshake_ms, 'runs': {}}
+    try:
+        for concurrency in args.concurrency:
+            fresh_s, _ = measure(send_fresh, host, args.port, messages, concurrency)
+            pooled_s, stats = measure(send_pooled, host, args.port, messages, concurrency)
+            results['runs'][concurrency] = {
+                'fresh_msgs_per_sec': round(args.messages / fresh_s, 1),
+                'pooled_msgs_per_sec': round(args.messages / pooled_s, 1),
+                'pooled_sessions_opened': stats['sessions_opened'],
+            }
+    finally:
+        if controller is not None:
+            controller.stop()
+
+    print(f"\n{args.messages} messages, {args.handshake_ms:g}ms handshake")
+    print(f"{'threads':>8}{'fresh msg/s':>14}{'pooled msg/s':>15}{'sessions':>10}")
+    for concurrency, r in results['runs'].items():
+        print(f"{concurrency:>8}{r['fresh_msgs_per_sec']:>14.1f}{r['pooled_msgs_per_sec']:>15.1f}"
+              f"{r['pooled_sessions_opened']:>10}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,418 @@
+"""End-to-end load test of the main user journeys.
+
+Each virtual user runs the real flows over HTTP, the way a browser would,
+scraping CSRF tokens from the pages it loads:
+
+  register      GET /register, POST /register
+  login         GET /login, POST /login (lands on /verify_otp)
+  otp_delivery  wait for the OTP email to reach the built-in SMTP sink
+  verify_otp    POST the captured OTP
+  index         GET /, then the first page of /api/reports it loads (--iterations times)
+  submit_report POST /report with --attachments generated PNGs
+
+An admin account (--admin-username/--admin-password, role 'admin') then
+logs in the same way and runs, for every report the users submitted:
+
+  update_status POST /update_status
+  delete_report DELETE /admin/delete_report/<id>
+
+Every step reports throughput, p50/p95/p99 latency and error rate; --json
+writes the same numbers for comparing runs.
+
+The app must send OTP emails to the sink and not rate-limit the load
+generator, so start it (against the docker-compose MySQL or any local
+MySQL with sql_import loaded) with:
+
+    RATELIMIT_ENABLED=false OTP_SMTP_SERVER=127.0.0.1 OTP_SMTP_PORT=8025 \\
+        OTP_SMTP_STARTTLS=false OTP_SENDER_PASSWORD= flask --app app run --debug
+
+then:
+
+    pip install aiosmtpd
+    python benchmarks/loadtest.py --base-url http://127.0.0.1:5000 --users 50 --concurrency 10 \\
+        --admin-username admin --admin-password '...' --json loadtest-before.json
+
+Users are named lt<run tag>_<n> with @loadtest.invalid addresses, so a
+run's accounts are easy to find and delete afterwards.
+"""
+import argparse
+import email
+import http.cookiejar
+import json
+import math
+import re
+import secrets
+import ssl
+import struct
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import zlib
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+PASSWORD = 'Loadtest-Pass1'
+CSRF_INPUT_RE = re.compile(r'name="csrf_token"\s+value="([^"]+)"')
+CSRF_META_RE = re.compile(r'name="csrf-token"\s+content="([^"]+)"')
+OTP_RE = re.compile(r'<b>(\d{6})</b>')
+LOCAL_HOSTS = {'127.0.0.1', 'localhost', '::1'}
+
+
+# ---- OTP capture ----
+
+class OTPSink:
+    """aiosmtpd handler that keeps the latest OTP sent to each address"""
+
+    def __init__(self):
+        self._otps = {}
+        self._cond = threading.Condition()
+
+    async def handle_DATA(self, server, session, envelope):
+        message = email.message_from_bytes(envelope.content)
+        for part in message.walk():
+            payload = part.get_payload(decode=True)
+            match = OTP_RE.search(payload.decode('utf-8', 'replace')) if payload else None
+            if match:
+                with self._cond:
+                    for rcpt in envelope.rcpt_tos:
+                        self._otps[rcpt.lower()] = (match.group(1), time.monotonic())
+                    self._cond.notify_all()
+                break
+        return '250 OK'
+
+    def wait_for(self, address, since, timeout):
+        """OTP for `address` received after monotonic time `since`"""
+        deadline = time.monotonic() + timeout
+        address = address.lower()
+        with self._cond:
+            while True:
+                entry = self._otps.get(address)
+                if entry and entry[1] >= since:
+                    return entry[0]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"no OTP for {address} within {timeout:g}s")
+                self._cond.wait(remaining)
+
+
+def start_sink(host, port):
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        sys.exit("aiosmtpd is required for the OTP sink: pip install aiosmtpd")
+    sink = OTPSink()
+    controller = Controller(sink, hostname=host, port=port)
+    controller.start()
+    return controller, sink
+
+
+# ---- HTTP client ----
+
+class LocalCookiePolicy(http.cookiejar.DefaultCookiePolicy):
+    """Send Secure session cookies to a plain-HTTP app on this machine"""
+
+    def return_ok_secure(self, cookie, request):
+        if urllib.parse.urlsplit(request.get_full_url()).hostname in LOCAL_HOSTS:
+            return True
+        return super().return_ok_secure(cookie, request)
+
+
+class Client:
+    """One browser session: its own cookie jar, redirects followed"""
+
+    def __init__(self, base_url, insecure=False, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        handlers = [urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar(LocalCookiePolicy()))]
+        if insecure:
+            handlers.append(urllib.request.HTTPSHandler(context=ssl._create_unverified_context()))
+        self.opener = urllib.request.build_opener(*handlers)
+
+    def request(self, method, path, data=None, headers=None):
+        """(status, final path, body text); HTTP errors are returned, not raised"""
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers or {}, method=method)
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                return response.status, urllib.parse.urlsplit(response.geturl()).path, response.read().decode()
+        except urllib.error.HTTPError as e:
+            return e.code, urllib.parse.urlsplit(e.geturl()).path, e.read().decode(errors='replace')
+
+    def get(self, path):
+        return self.request('GET', path)
+
+    def post_form(self, path, fields):
+        return self.request('POST', path, urllib.parse.urlencode(fields).encode(),
+                            {'Content-Type': 'application/x-www-form-urlencoded'})
+
+    def post_multipart(self, path, fields, files, headers=None):
+        boundary = secrets.token_hex(16)
+        body = bytearray()
+        for name, value in fields.items():
+            body += (f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+                     f'{value}\r\n').encode()
+        for name, filename, content_type, content in files:
+            body += (f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+                     f'filename="{filename}"\r\nContent-Type: {content_type}\r\n\r\n').encode()
+            body += content + b'\r\n'
+        body += f'--{boundary}--\r\n'.encode()
+        return self.request('POST', path, bytes(body),
+                            {'Content-Type': f'multipart/form-data; boundary={boundary}', **(headers or {})})
+
+    def csrf_token(self, path):
+        status, _, html = self.get(path)
+        match = CSRF_INPUT_RE.search(html) or CSRF_META_RE.search(html)
+        if status != 200 or not match:
+            raise StepFailed(f"no CSRF token on {path} (HTTP {status})")
+        return match.group(1)
+
+
+def make_png(size_kb):
+    """Valid PNG of roughly size_kb KiB (random pixels so it doesn't compress away)"""
+    width = 256
+    height = max(1, size_kb * 1024 // (width * 3))
+    raw = b''.join(b'\x00' + secrets.token_bytes(width * 3) for _ in range(height))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(raw, 1)) + chunk(b'IEND', b'')
+
+
+# ---- Measurements ----
+
+class StepFailed(Exception):
+    pass
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(list)
+        self._errors = defaultdict(Counter)
+        self._window = {}
+
+    def step(self, name, fn, *args):
+        """Run fn(*args) as one timed step; a StepFailed or any exception counts as an error"""
+        started = time.perf_counter()
+        error = None
+        result = None
+        try:
+            result = fn(*args)
+        except StepFailed as e:
+            error = str(e)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finished = time.perf_counter()
+        with self._lock:
+            self._latencies[name].append(finished - started)
+            first, _ = self._window.get(name, (started, finished))
+            self._window[name] = (min(first, started), finished)
+            if error:
+                self._errors[name][error] += 1
+        if error:
+            raise StepFailed(error)
+        return result
+
+    def summary(self):
+        steps = {}
+        for name, samples in self._latencies.items():
+            samples = sorted(samples)
+            errors = sum(self._errors[name].values())
+            first, last = self._window[name]
+            steps[name] = {
+                'count': len(samples),
+                'errors': errors,
+                'error_rate': round(errors / len(samples), 4),
+                'throughput_per_sec': round(len(samples) / max(last - first, 1e-9), 2),
+                'p50_ms': percentile(samples, 50),
+                'p95_ms': percentile(samples, 95),
+                'p99_ms': percentile(samples, 99),
+                'mean_ms': round(sum(samples) / len(samples) * 1000, 1),
+                'top_errors': dict(self._errors[name].most_common(5)),
+            }
+        return steps
+
+
+def percentile(sorted_samples, pct):
+    # Nearest-rank
+    index = min(len(sorted_samples) - 1, max(0, math.ceil(pct / 100 * len(sorted_samples)) - 1))
+    return round(sorted_samples[index] * 1000, 1)
+
+
+# ---- Journeys ----
+
+def expect(condition, message):
+    if not condition:
+        raise StepFailed(message)
+
+
+def log_in(args, recorder, sink, client, username, address):
+    def login():
+        token = client.csrf_token('/login')
+        submitted_at = time.monotonic()
+        status, path, _ = client.post_form('/login', {'csrf_token': token, 'username': username,
+                                                      'password': args.password_for(username)})
+        expect(status == 200 and path == '/verify_otp', f"login ended on {path} (HTTP {status})")
+        return submitted_at
+
+    # The email is sent in the background, so this is the wait after the login response
+    submitted_at = recorder.step('login', login)
+    otp = recorder.step('otp_delivery', sink.wait_for, address, submitted_at, args.otp_timeout)
+
+    def verify():
+        token = client.csrf_token('/verify_otp')
+        status, path, _ = client.post_form('/verify_otp', {'csrf_token': token, 'otp': otp})
+        expect(status == 200 and path not in ('/verify_otp', '/login'), f"OTP verify ended on {path} (HTTP {status})")
+
+    recorder.step('verify_otp', verify)
+
+
+def user_journey(args, recorder, sink, attachment, n):
+    client = Client(args.base_url, args.insecure)
+    username = f"{args.tag}_{n}"
+    address = f"{username}@loadtest.invalid"
+
+    def register():
+        token = client.csrf_token('/register')
+        status, path, _ = client.post_form('/register', {
+            'csrf_token': token, 'username': username, 'email': address,
+            'password': PASSWORD, 'confirm_password': PASSWORD,
+        })
+        expect(status == 200 and path == '/login', f"register ended on {path} (HTTP {status})")
+
+    def index():
+        status, _, _ = client.get('/')
+        expect(status == 200, f"index page HTTP {status}")
+        status, _, body = client.get('/api/reports')
+        expect(status == 200 and 'reports' in json.loads(body), f"report listing HTTP {status}")
+
+    def submit_report(i):
+        token = client.csrf_token('/report')
+        files = [('attachments', f"photo{j}.png", 'image/png', attachment) for j in range(args.attachments)]
+        status, _, body = client.post_multipart('/report', {
+            'csrf_token': token,
+            'title': f"Loadtest {args.tag} report {n} {i}",
+            'description': f"Broken light in corridor {i}, reported by load test run {args.tag}.",
+            'category': 'faulty_facilities',
+        }, files, headers={'X-Requested-With': 'XMLHttpRequest'})
+        expect(status == 200, f"submit HTTP {status}: {body[:200]}")
+
+    try:
+        recorder.step('register', register)
+        log_in(args, recorder, sink, client, username, address)
+        for _ in range(args.iterations):
+            recorder.step('index', index)
+        for i in range(args.reports_per_user):
+            recorder.step('submit_report', submit_report, i)
+    except StepFailed:
+        pass  # recorded; the rest of this user's journey depends on the failed step
+
+
+def admin_journey(args, recorder, sink):
+    client = Client(args.base_url, args.insecure)
+    try:
+        log_in(args, recorder, sink, client, args.admin_username, args.admin_email)
+        token = client.csrf_token('/admin')
+    except StepFailed:
+        return
+
+    # Every report this run submitted; the run tag is a searchable title word
+    report_ids = []
+    cursor = ''
+    while True:
+        query = urllib.parse.urlencode({'q': args.tag, 'limit': 100, 'cursor': cursor})
+        status, _, body = client.get(f"/api/reports?{query}")
+        if status != 200:
+            print(f"Could not list this run's reports (HTTP {status}); skipping admin steps")
+            return
+        page = json.loads(body)
+        report_ids += [r['report_id'] for r in page['reports'] if args.tag in r.get('title', '')]
+        cursor = page.get('next_cursor')
+        if not cursor:
+            break
+
+    headers = {'X-CSRFToken': token, 'Content-Type': 'application/json'}
+
+    def update_status(report_id):
+        data = json.dumps({'report_id': report_id, 'status_id': args.status_id}).encode()
+        status, _, body = client.request('POST', '/update_status', data, headers)
+        expect(status == 200 and json.loads(body).get('success'), f"update_status HTTP {status}: {body[:200]}")
+
+    def delete_report(report_id):
+        status, _, body = client.request('DELETE', f"/admin/delete_report/{report_id}", headers=headers)
+        expect(status == 204, f"delete HTTP {status}: {body[:200]}")
+
+    def manage(report_id):
+        try:
+            recorder.step('update_status', update_status, report_id)
+            recorder.step('delete_report', delete_report, report_id)
+        except StepFailed:
+            pass
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(manage, report_ids))
+
+
+# ---- Main ----
+
+def print_summary(steps, elapsed):
+    print(f"\n{'step':<15}{'count':>7}{'err%':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, s in steps.items():
+        print(f"{name:<15}{s['count']:>7}{s['error_rate'] * 100:>7.1f}{s['throughput_per_sec']:>9.1f}"
+              f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}")
+        for error, count in s['top_errors'].items():
+            print(f"    {count} x {error}")
+    print(f"\nTotal {elapsed:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--insecure', action='store_true', help='skip TLS verification (self-signed nginx cert)')
+    parser.add_argument('--users', type=int, default=20, help='virtual users, each registering a new account')
+    parser.add_argument('--concurrency', type=int, default=5, help='users running at once')
+    parser.add_argument('--iterations', type=int, default=5, help='index visits per user')
+    parser.add_argument('--reports-per-user', type=int, default=1)
+    parser.add_argument('--attachments', type=int, default=2, help='PNG attachments per report (max 5)')
+    parser.add_argument('--attachment-kb', type=int, default=200)
+    parser.add_argument('--admin-username', help='existing admin account; admin steps are skipped without it')
+    parser.add_argument('--admin-password')
+    parser.add_argument('--admin-email', help="the admin account's email (where its OTP is sent)")
+    parser.add_argument('--status-id', type=int, default=2, help='status the admin moves reports to')
+    parser.add_argument('--smtp-host', default='127.0.0.1')
+    parser.add_argument('--smtp-port', type=int, default=8025, help='port of the built-in OTP sink')
+    parser.add_argument('--otp-timeout', type=float, default=30)
+    parser.add_argument('--tag', default=f"lt{secrets.token_hex(3)}", help='run tag used in usernames and titles')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+    if args.admin_username and not (args.admin_password and args.admin_email):
+        parser.error('--admin-username needs --admin-password and --admin-email')
+    args.password_for = lambda username: args.admin_password if username == args.admin_username else PASSWORD
+
+    controller, sink = start_sink(args.smtp_host, args.smtp_port)
+    recorder = Recorder()
+    attachment = make_png(args.attachment_kb)
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(lambda n: user_journey(args, recorder, sink, attachment, n), range(args.users)))
+        if args.admin_username:
+            admin_journey(args, recorder, sink)
+    finally:
+        controller.stop()
+    elapsed = time.perf_counter() - started
+
+    steps = recorder.summary()
+    print_summary(steps, elapsed)
+    if args.json:
+        config = {k: v for k, v in vars(args).items() if k not in ('admin_password', 'password_for', 'json')}
+        with open(args.json, 'w') as f:
+            json.dump({'config': config, 'elapsed_seconds': round(elapsed, 2), 'steps': steps}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
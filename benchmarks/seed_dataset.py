@@ -0,0 +1,286 @@
+"""Bulk-load a synthetic dataset at production-like scale.
+
+Generates users (with user_preferences / admin_preferences subscription
+mixes), reports across every category and status spread over two years,
+report_attachments rows and in-app notifications, and loads them with
+multi-row INSERTs in batches. Scale tiers:
+
+    tier   reports   users   admins
+    10k     10,000   2,000       20
+    100k   100,000  20,000       50
+    1m   1,000,000  200,000     100
+
+Seeded users are named seed_<n> (password Seed-Pass1, already verified),
+admins seed_admin_<n>, so the load test and benchmarks can log in as them.
+Attachment rows point at files that are not created. Runs are
+reproducible for a given --seed.
+
+Load into a scratch database with the sql_import schema (including
+report_listing_indexes.sql and report_search_fulltext.sql). --truncate
+first empties the report, notification and preference tables (and
+email_outbox, where the schema has it) and removes earlier seed users;
+other accounts are kept.
+
+Usage (against the docker-compose MySQL on port 3307):
+    MYSQL_HOST=127.0.0.1 MYSQL_PORT=3307 MYSQL_USER=... MYSQL_PASSWORD=... \\
+        python benchmarks/seed_dataset.py --tier 100k --truncate
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import mysql.connector
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+from reference_data import CATEGORY_DISPLAY_NAMES, CATEGORY_PREFERENCE_FIELDS  # noqa: E402
+from hashing import build_hasher  # noqa: E402
+
+TIERS = {
+    '10k': {'reports': 10_000, 'users': 2_000, 'admins': 20},
+    '100k': {'reports': 100_000, 'users': 20_000, 'admins': 50},
+    '1m': {'reports': 1_000_000, 'users': 200_000, 'admins': 100},
+}
+PASSWORD = 'Seed-Pass1'
+USER_PREFIX = 'seed_'
+
+# Share of reports per category, and of users subscribed to each category
+CATEGORY_WEIGHTS = {
+    'Fires': 0.10,
+    'Faulty Facilities/Equipment': 0.45,
+    'Vandalism': 0.15,
+    'Suspicious Activity': 0.15,
+    'Others': 0.15,
+}
+SUBSCRIPTION_RATES = {
+    'Fires': 0.45,
+    'Faulty Facilities/Equipment': 0.30,
+    'Vandalism': 0.15,
+    'Suspicious Activity': 0.25,
+    'Others': 0.05,
+}
+STATUS_WEIGHTS = {'unresolved': 0.35, 'pending': 0.20, 'reviewing': 0.15, 'emergency': 0.03, 'resolved': 0.27}
+PREFERENCES_RATE = 0.6  # users who ever saved their settings
+ANONYMOUS_RATE = 0.1
+ATTACHMENT_RATE = 0.3
+READ_RATE = 0.7
+
+WORDS = ("fire alarm smoke corridor lift broken door window glass light flicker leak water pipe "
+         "ceiling toilet graffiti wall bench stolen bicycle suspicious person loitering carpark "
+         "stairwell projector aircon noise cable socket sparks laboratory library canteen level "
+         "block lecture theatre hostel room basement gym field printer vending machine").split()
+PLACES = ["Block A", "Block B", "Block C", "Library", "Canteen", "Hostel", "Sports Hall", "Carpark"]
+OTHER_DESCRIPTIONS = ["Lost item", "Pest sighting", "Noise complaint", "Blocked drain", "Bad smell"]
+
+
+def connect():
+    return mysql.connector.connect(
+        host=os.getenv('MYSQL_HOST', '127.0.0.1'),
+        port=int(os.getenv('MYSQL_PORT', 3307)),
+        user=os.getenv('MYSQL_USER', 'root'),
+        password=os.getenv('MYSQL_PASSWORD', ''),
+        database=os.getenv('MYSQL_DB', 'flask_db'),
+    )
+
+
+class Loader:
+    """Multi-row INSERTs with per-table progress"""
+
+    def __init__(self, conn, batch_size):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.cursor = conn.cursor()
+        self.counts = {}
+        self.next_ids = {}
+        self.started = time.perf_counter()
+
+    def _allocate_ids(self, table, id_column, count):
+        # Explicit ids rather than trusting AUTO_INCREMENT to hand out a
+        # consecutive run per INSERT, which innodb_autoinc_lock_mode,
+        # auto_increment_increment and replication settings don't guarantee
+        if table not in self.next_ids:
+            self.cursor.execute(f"SELECT COALESCE(MAX({id_column}), 0) + 1 FROM {table}")
+            self.next_ids[table] = self.cursor.fetchone()[0]
+        start = self.next_ids[table]
+        self.next_ids[table] = start + count
+        return list(range(start, start + count))
+
+    def insert(self, table, columns, rows, id_column=None):
+        """Insert rows in batches of one multi-row INSERT each.
+
+        With id_column, the rows get explicit ids above the table's current
+        maximum, which are returned in row order.
+        """
+        ids = []
+        if id_column:
+            ids = self._allocate_ids(table, id_column, len(rows))
+            columns = (id_column, *columns)
+            rows = [(row_id, *row) for row_id, row in zip(ids, rows)]
+        placeholders = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        prefix = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+        for offset in range(0, len(rows), self.batch_size):
+            batch = rows[offset:offset + self.batch_size]
+            self.cursor.execute(prefix + ', '.join([placeholders] * len(batch)),
+                                [value for row in batch for value in row])
+            self.conn.commit()
+            self.counts[table] = self.counts.get(table, 0) + len(batch)
+        return ids
+
+    def progress(self):
+        elapsed = time.perf_counter() - self.started
+        loaded = ', '.join(f"{table} {count:,}" for table, count in self.counts.items())
+        print(f"\r  {elapsed:6.1f}s  {loaded}", end='', flush=True)
+
+
+def truncate(conn):
+    cursor = conn.cursor()
+    # email_outbox only exists once its migration has been loaded
+    cursor.execute("SELECT table_name FROM information_schema.tables WHERE table_schema = DATABASE()")
+    existing = {name.lower() for (name,) in cursor.fetchall()}
+    for table in ('notification', 'report_attachments', 'reports', 'email_outbox',
+                  'user_preferences', 'admin_preferences'):
+        if table in existing:
+            cursor.execute(f"TRUNCATE TABLE {table}")
+        else:
+            print(f"  {table}: not in this schema, skipped")
+    cursor.execute("DELETE FROM users WHERE username LIKE %s", (USER_PREFIX.replace('_', '\\_') + '%',))
+    conn.commit()
+    cursor.close()
+
+
+def weighted(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def seed_users(loader, rng, tier):
+    """Insert users, admins and their preferences; returns (user ids, admin ids, {category: subscriber ids})"""
+    pwd = build_hasher().hash(PASSWORD)
+    user_ids = loader.insert('users', ('username', 'pwd', 'email', 'verified', 'role'), [
+        (f"{USER_PREFIX}{n}", pwd, f"{USER_PREFIX}{n}@seed.invalid", 1, 'user') for n in range(tier['users'])
+    ], id_column='user_id')
+    admin_ids = loader.insert('users', ('username', 'pwd', 'email', 'verified', 'role'), [
+        (f"{USER_PREFIX}admin_{n}", pwd, f"{USER_PREFIX}admin_{n}@seed.invalid", 1, 'admin')
+        for n in range(tier['admins'])
+    ], id_column='user_id')
+
+    subscribers = {category: [] for category in CATEGORY_PREFERENCE_FIELDS}
+    preference_rows = []
+    for user_id in user_ids:
+        if rng.random() >= PREFERENCES_RATE:
+            continue
+        flags = [int(rng.random() < SUBSCRIPTION_RATES[category]) for category in CATEGORY_PREFERENCE_FIELDS]
+        preference_rows.append((user_id, *flags, int(rng.random() < 0.7)))
+        for category, subscribed in zip(CATEGORY_PREFERENCE_FIELDS, flags):
+            if subscribed:
+                subscribers[category].append(user_id)
+    loader.insert('user_preferences', ('user_id', *CATEGORY_PREFERENCE_FIELDS.values(), 'email_notifications'),
+                  preference_rows)
+    loader.insert('admin_preferences', ('user_id', 'email_notifications'),
+                  [(admin_id, int(rng.random() < 0.8)) for admin_id in admin_ids])
+    loader.progress()
+    return user_ids, admin_ids, subscribers
+
+
+def make_report(rng, user_ids, status_ids, created_at):
+    category = weighted(rng, CATEGORY_WEIGHTS)
+    words = rng.sample(WORDS, 2)
+    title = f"{words[0].capitalize()} {words[1]} at {rng.choice(PLACES)}"
+    description = ' '.join(rng.choices(WORDS, k=rng.randint(12, 60))).capitalize() + '.'
+    anonymous = rng.random() < ANONYMOUS_RATE
+    return (
+        None if anonymous else rng.choice(user_ids),
+        status_ids[weighted(rng, STATUS_WEIGHTS)],
+        category,
+        rng.choice(OTHER_DESCRIPTIONS) if category == 'Others' else None,
+        int(anonymous),
+        title,
+        description,
+        created_at,
+        created_at + timedelta(hours=rng.randint(0, 72)),
+    )
+
+
+def seed_reports(loader, rng, tier, user_ids, admin_ids, subscribers, notifications_per_report):
+    cursor = loader.conn.cursor()
+    cursor.execute("SELECT name, status_id FROM status")
+    status_ids = dict(cursor.fetchall())
+    cursor.close()
+    missing = set(STATUS_WEIGHTS) - set(status_ids)
+    if missing:
+        sys.exit(f"status table is missing {sorted(missing)}; load sql_import/flask_db_report_tables.sql first")
+
+    # Oldest first over the last two years, so ids and created_at rise together as in production
+    now = datetime.now().replace(microsecond=0)
+    span = int(timedelta(days=730).total_seconds())
+    offsets = sorted(rng.randrange(span) for _ in range(tier['reports']))
+
+    # Generated a batch at a time so the 1m tier doesn't hold every row in memory
+    for start in range(0, len(offsets), loader.batch_size):
+        reports = [make_report(rng, user_ids, status_ids, now - timedelta(seconds=span - offset))
+                   for offset in offsets[start:start + loader.batch_size]]
+        report_ids = loader.insert('reports', (
+            'user_id', 'status_id', 'category_name', 'category_description', 'is_anonymous',
+            'title', 'description', 'created_at', 'updated_at'), reports, id_column='report_id')
+
+        attachments = []
+        notifications = []
+        for report_id, (author, _, category, _, _, title, _, created_at, _) in zip(report_ids, reports):
+            if rng.random() < ATTACHMENT_RATE:
+                for n in range(rng.randint(1, 3)):
+                    name = f"{report_id}_photo{n}.jpg"
+                    attachments.append((report_id, name, f"uploads/{name}", 'image/jpeg', created_at))
+            if author is None:
+                continue  # anonymous reports notify nobody
+            audience = subscribers[category]
+            recipients = rng.sample(audience, min(notifications_per_report, len(audience)))
+            recipients += rng.sample(admin_ids, min(2, len(admin_ids)))
+            message = f"New {category} report: {title}"
+            notifications += [(user_id, report_id, message, int(rng.random() < READ_RATE), created_at)
+                              for user_id in recipients if user_id != author]
+
+        loader.insert('report_attachments', ('report_id', 'file_name', 'file_path', 'file_type', 'uploaded_at'),
+                      attachments)
+        loader.insert('notification', ('user_id', 'report_id', 'message', 'is_read', 'created_at'), notifications)
+        loader.progress()
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tier', choices=TIERS, default='10k')
+    parser.add_argument('--notifications-per-report', type=int, default=5,
+                        help='subscribers notified per report (plus two admins)')
+    parser.add_argument('--batch-size', type=int, default=5000, help='rows per multi-row INSERT')
+    parser.add_argument('--seed', type=int, default=2216)
+    parser.add_argument('--truncate', action='store_true', help='empty the report tables and drop seed users first')
+    args = parser.parse_args()
+
+    if not set(CATEGORY_WEIGHTS) == set(CATEGORY_DISPLAY_NAMES.values()) == set(CATEGORY_PREFERENCE_FIELDS):
+        sys.exit("CATEGORY_WEIGHTS is out of date with the app's categories")
+    tier = TIERS[args.tier]
+    rng = random.Random(args.seed)
+    conn = connect()
+    # Rows reference each other correctly by construction, so skip per-row FK checks
+    cursor = conn.cursor()
+    cursor.execute("SET SESSION foreign_key_checks = 0")
+    cursor.close()
+
+    if args.truncate:
+        truncate(conn)
+    print(f"Seeding tier {args.tier}: {tier['reports']:,} reports, {tier['users']:,} users, {tier['admins']} admins")
+    loader = Loader(conn, args.batch_size)
+    user_ids, admin_ids, subscribers = seed_users(loader, rng, tier)
+    seed_reports(loader, rng, tier, user_ids, admin_ids, subscribers, args.notifications_per_report)
+
+    cursor = conn.cursor()
+    cursor.execute("ANALYZE TABLE users, user_preferences, admin_preferences, reports, report_attachments, notification")
+    cursor.fetchall()
+    cursor.close()
+    conn.close()
+    print(f"Done in {time.perf_counter() - loader.started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
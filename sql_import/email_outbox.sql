@@ -0,0 +1,23 @@
+-- Durable outbox for notification emails. submit_report writes one row per
+-- recipient in the same transaction as the report; app/email_worker.py
+-- claims pending rows with SELECT ... FOR UPDATE SKIP LOCKED and sends them.
+-- A row stuck in 'sending' past locked_until (worker crashed mid-batch) is
+-- claimed again. Apply once to an existing flask_db:
+--   docker exec -i mysql_db mysql -u {username} -p{password} flask_db < sql_import/email_outbox.sql
+
+CREATE TABLE IF NOT EXISTS `email_outbox` (
+  `id` bigint NOT NULL AUTO_INCREMENT,
+  `audience` enum('user','admin') NOT NULL,
+  `recipient` varchar(100) NOT NULL,
+  `payload` json NOT NULL,
+  `status` enum('pending','sending','sent','failed') NOT NULL DEFAULT 'pending',
+  `attempts` int NOT NULL DEFAULT '0',
+  `next_attempt_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `locked_until` timestamp NULL DEFAULT NULL,
+  `last_error` varchar(500) DEFAULT NULL,
+  `created_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `sent_at` timestamp NULL DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_outbox_claim` (`status`, `next_attempt_at`),
+  KEY `idx_outbox_lease` (`status`, `locked_until`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,19 @@
+-- Indexes backing the keyset-paginated report listing (/api/reports).
+-- Each one ends in (created_at, report_id) so a page is a single index
+-- range scan whatever filter is applied.
+-- Apply once to an existing flask_db:
+--   docker exec -i mysql_db mysql -u {username} -p{password} flask_db < sql_import/report_listing_indexes.sql
+
+ALTER TABLE `reports`
+  ADD KEY `idx_reports_created` (`created_at`, `report_id`),
+  ADD KEY `idx_reports_category_created` (`category_name`, `created_at`, `report_id`),
+  ADD KEY `idx_reports_status_created` (`status_id`, `created_at`, `report_id`);
+
+-- Admin dashboard sort orders (report id / title), alone or combined with a
+-- category or status filter. InnoDB appends report_id to every secondary
+-- index, so these also serve as the (key, report_id) keyset.
+ALTER TABLE `reports`
+  ADD KEY `idx_reports_title` (`title`),
+  ADD KEY `idx_reports_category` (`category_name`),
+  ADD KEY `idx_reports_category_title` (`category_name`, `title`),
+  ADD KEY `idx_reports_status_title` (`status_id`, `title`);
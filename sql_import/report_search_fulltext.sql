@@ -0,0 +1,8 @@
+-- FULLTEXT index backing report search (/api/reports/search and the admin
+-- dashboard search box). Words shorter than innodb_ft_min_token_size (3)
+-- are not indexed; the app falls back to a title LIKE scan for those.
+-- Apply once to an existing flask_db:
+--   docker exec -i mysql_db mysql -u {username} -p{password} flask_db < sql_import/report_search_fulltext.sql
+
+ALTER TABLE `reports`
+  ADD FULLTEXT KEY `ft_reports_title_description` (`title`, `description`);